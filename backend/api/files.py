@@ -3,9 +3,10 @@ File Upload API endpoints for Promptly
 Handles secure file uploads with MinIO integration
 """
 
+import os
 import uuid
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, BinaryIO
 from datetime import datetime, timezone
 
 from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File, status
@@ -16,22 +17,50 @@ from bson import ObjectId
 from backend.auth import current_active_user
 from backend.models.user import User
 from backend.core.database import get_database
-from backend.core.ratelimit import limiter, DEFAULT_RATE_LIMIT
+from backend.core.ratelimit import TokenBucketLimiter, DEFAULT_RATE_LIMIT
 from backend.services.storage import (
     get_minio_client, 
+    MinIOClient,
     StorageError, 
     sanitize_filename, 
-    validate_file_type
+    validate_file_type,
+    guess_content_type,
+    DEFAULT_CONTENT_TYPE,
+    SNIFF_BYTES
 )
 
 router = APIRouter(prefix="/files", tags=["files"])
 logger = logging.getLogger(__name__)
 
+# Per-route token buckets (async Redis, one EVALSHA per check)
+upload_file_limiter = TokenBucketLimiter(DEFAULT_RATE_LIMIT, scope="files:upload_file")
+get_file_info_limiter = TokenBucketLimiter(DEFAULT_RATE_LIMIT, scope="files:get_file_info")
+
 # File upload limits
 MAX_FILE_SIZE = 20 * 1024 * 1024  # 20 MB
 ALLOWED_UPLOAD_SIZE = MAX_FILE_SIZE
 
 
+def _upload_and_sign(
+    storage_client: MinIOClient,
+    object_key: str,
+    data: BinaryIO,
+    size: int,
+    content_type: str
+) -> str:
+    """Upload a file and return its presigned URL (blocking; run in a worker thread)"""
+    storage_client.upload_file(object_key, data, size, content_type)
+    return storage_client.get_presigned_url(object_key)
+
+
+def _stream_size(stream: BinaryIO) -> int:
+    """Size of a seekable stream, leaving it positioned at the start"""
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+    return size
+
+
 class FileUploadResponse:
     """Response model for file upload"""
     def __init__(self, file_id: str, url: str, size: int, mime: str):
@@ -71,9 +100,9 @@ class FileUploadResponse:
         413: {"description": "File size exceeds 20 MB limit"},
         422: {"description": "No file provided"},
         429: {"description": "Rate limit exceeded"}
-    }
+    },
+    dependencies=[Depends(upload_file_limiter)]
 )
-@limiter.limit(DEFAULT_RATE_LIMIT)
 async def upload_file(
     request: Request,
     file: UploadFile = File(..., description="File to upload (max 20 MB)"),
@@ -116,8 +145,11 @@ async def upload_file(
         )
     
     # Validate file type
-    content_type = file.content_type or "application/octet-stream"
     filename = file.filename or "uploaded_file"
+    content_type = file.content_type
+    if not content_type or content_type == DEFAULT_CONTENT_TYPE:
+        # Missing or generic type from the client: infer from the extension
+        content_type = guess_content_type(filename)
     
     if not validate_file_type(content_type, filename):
         raise HTTPException(
@@ -153,9 +185,11 @@ async def upload_file(
         object_key = f"user-{current_user.id}/{file_id}-{safe_filename}"
     
     try:
-        # Read file content
-        file_content = await file.read()
-        file_size = len(file_content)
+        # Stream from the spooled upload rather than copying it into memory;
+        # the size is tracked by the multipart parser
+        file_size = file.size
+        if file_size is None:
+            file_size = await run_in_threadpool(_stream_size, file.file)
         
         # Double-check size after reading
         if file_size > MAX_FILE_SIZE:
@@ -164,27 +198,29 @@ async def upload_file(
                 detail=f"File exceeds {MAX_FILE_SIZE // (1024*1024)} MB limit"
             )
         
+        # Reject content that sniffs as executable whatever it claims to be
+        await file.seek(0)
+        head = await file.read(SNIFF_BYTES)
+        await file.seek(0)
+        if not validate_file_type(content_type, filename, head):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"File type not allowed: {content_type}"
+            )
+        
         # Get MinIO client
         storage_client = get_minio_client()
         
-        # Upload file using thread pool (MinIO SDK is blocking)
-        from io import BytesIO
-        file_stream = BytesIO(file_content)
-        
-        await run_in_threadpool(
-            storage_client.upload_file,
+        # Upload and sign in one worker hop rather than two
+        presigned_url = await run_in_threadpool(
+            _upload_and_sign,
+            storage_client,
             object_key,
-            file_stream,
+            file.file,
             file_size,
             content_type
         )
         
-        # Generate presigned URL
-        presigned_url = await run_in_threadpool(
-            storage_client.get_presigned_url,
-            object_key
-        )
-        
         # Create file metadata
         file_metadata = {
             "file_id": file_id,
@@ -284,9 +320,9 @@ async def link_file_to_session(
 @router.get(
     "/{file_id}",
     summary="Get file information",
-    description="Get file metadata and download URL by file ID"
+    description="Get file metadata and download URL by file ID",
+    dependencies=[Depends(get_file_info_limiter)]
 )
-@limiter.limit(DEFAULT_RATE_LIMIT)
 async def get_file_info(
     request: Request,
     file_id: str,
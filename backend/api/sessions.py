@@ -6,30 +6,31 @@ Handles session creation and retrieval with authentication
 import time
 import logging
 from datetime import datetime, timezone
-from typing import Dict, Any, List, Optional
+from typing import Annotated, Dict, Any, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query
 from bson import ObjectId
 from bson.errors import InvalidId
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 
 from backend.auth import current_active_user
 from backend.models.user import User
 from backend.models.session import Session, SessionCreate, SessionRead
+from backend.models.node import NodeRead, encode_node_cursor, NODE_CONTENT_MAX_LENGTH
 from backend.core.database import get_database
-from backend.core.ratelimit import limiter, DEFAULT_RATE_LIMIT
+from backend.core.ratelimit import TokenBucketLimiter, DEFAULT_RATE_LIMIT
 from backend.services.qa_loop import (
     QALoopError,
-    get_session_with_validation,
-    validate_node_ownership,
-    check_stop_conditions,
+    get_session_doc_with_validation,
+    get_node_doc_with_validation,
+    prepare_turn,
     build_context_chain,
     truncate_context_for_tokens,
     parse_ai_response,
-    insert_user_answer_node,
-    insert_ai_node,
+    build_user_answer_node,
+    build_ai_node,
+    commit_turn,
     update_session_status
 )
 from backend.services.ai_internal import ask_gemini, GeminiServiceError
@@ -37,14 +38,32 @@ from backend.services.ai_internal import ask_gemini, GeminiServiceError
 router = APIRouter(prefix="/sessions", tags=["sessions"])
 logger = logging.getLogger(__name__)
 
+# Documents per getMore when streaming a session's nodes
+NODE_BATCH_SIZE = 256
+
+# Per-route token buckets (async Redis, one EVALSHA per check)
+create_session_limiter = TokenBucketLimiter(DEFAULT_RATE_LIMIT, scope="sessions:create_session")
+answer_question_limiter = TokenBucketLimiter(DEFAULT_RATE_LIMIT, scope="sessions:answer_question")
+get_session_limiter = TokenBucketLimiter(DEFAULT_RATE_LIMIT, scope="sessions:get_session")
+list_session_nodes_limiter = TokenBucketLimiter(DEFAULT_RATE_LIMIT, scope="sessions:list_session_nodes")
+list_sessions_limiter = TokenBucketLimiter(DEFAULT_RATE_LIMIT, scope="sessions:list_sessions")
+
 
 class AnswerRequest(BaseModel):
     """Schema for answering a question in a session"""
     nodeId: str = Field(..., description="ObjectId of the node being answered")
-    selected: List[str] = Field(..., min_items=1, description="User's selected answer(s) - single item for single/ranking, multiple for multi")
+    selected: List[Annotated[str, Field(max_length=NODE_CONTENT_MAX_LENGTH)]] = Field(..., min_items=1, description="User's selected answer(s) - single item for single/ranking, multiple for multi")
     isCustomAnswer: Optional[bool] = Field(False, description="Whether this is a custom user answer vs predefined option")
     cancel: Optional[bool] = Field(False, description="Whether to cancel the session")
 
+    @field_validator('selected')
+    @classmethod
+    def validate_answer_length(cls, v):
+        """Bound the stored answer (items joined with '; ') to the node content limit"""
+        if sum(map(len, v)) + 2 * (len(v) - 1) > NODE_CONTENT_MAX_LENGTH:
+            raise ValueError(f"Answer exceeds {NODE_CONTENT_MAX_LENGTH} characters")
+        return v
+
 
 class QuestionResponse(BaseModel):
     """Schema for AI question response"""
@@ -66,9 +85,9 @@ class FinalPromptResponse(BaseModel):
     response_model=SessionRead,
     status_code=status.HTTP_201_CREATED,
     summary="Create a new session",
-    description="Create a new AI prompt crafting session for the authenticated user"
+    description="Create a new AI prompt crafting session for the authenticated user",
+    dependencies=[Depends(create_session_limiter)]
 )
-@limiter.limit(DEFAULT_RATE_LIMIT)
 async def create_session(
     request: Request,
     session_data: SessionCreate,
@@ -101,7 +120,7 @@ async def create_session(
         starter_prompt=session_data.starter_prompt,
         max_questions=session_data.max_questions,
         target_model=session_data.target_model,
-        settings=session_data.settings,
+        settings=session_data.settings.model_dump(exclude_unset=True),
         status="active",
         created_at=datetime.now(timezone.utc),
         updated_at=datetime.now(timezone.utc)
@@ -110,25 +129,15 @@ async def create_session(
     # Insert into database
     collection = db["sessions"]
     try:
-        result = await collection.insert_one(session.model_dump(by_alias=True))
+        await collection.insert_one(session.to_mongo())
         
-        # Retrieve the created session
-        created_session = await collection.find_one({"_id": result.inserted_id})
-        if not created_session:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to retrieve created session"
-            )
-        
-        # Convert to response model
-        session_response = SessionRead(**created_session)
-        
-        # Create response with Location header
-        response = JSONResponse(
-            content=session_response.model_dump(),
-            status_code=status.HTTP_201_CREATED
+        # Respond from the inserted model: one serializer pass, no re-read
+        response = Response(
+            content=session.to_api(),
+            status_code=status.HTTP_201_CREATED,
+            media_type="application/json"
         )
-        response.headers["Location"] = f"/sessions/{session_response.id}"
+        response.headers["Location"] = f"/sessions/{session.id}"
         
         return response
         
@@ -154,9 +163,9 @@ async def create_session(
 @router.post(
     "/{session_id}/answer",
     summary="Answer a question in the session",
-    description="Submit an answer to continue the iterative Q&A loop"
+    description="Submit an answer to continue the iterative Q&A loop",
+    dependencies=[Depends(answer_question_limiter)]
 )
-@limiter.limit(DEFAULT_RATE_LIMIT)
 async def answer_question(
     request: Request,
     session_id: str,
@@ -201,10 +210,10 @@ async def answer_question(
         # Start database transaction for consistency
         async with await db.client.start_session() as db_session:
             async with db_session.start_transaction():
-                # 1. Validate session ownership
+                # 1. Validate session ownership and evaluate stop conditions
                 try:
-                    session = await get_session_with_validation(
-                        db, session_object_id, ObjectId(current_user.id)
+                    session, should_stop, stop_reason = await prepare_turn(
+                        db, session_object_id, ObjectId(current_user.id), answer_data.cancel
                     )
                 except QALoopError as e:
                     if "not found" in str(e):
@@ -214,15 +223,13 @@ async def answer_question(
                 
                 # 2. Validate node ownership
                 try:
-                    node = await validate_node_ownership(db, node_object_id, session_object_id)
+                    await get_node_doc_with_validation(
+                        db, node_object_id, session_object_id, {"_id": 1}
+                    )
                 except QALoopError as e:
                     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
                 
-                # 3. Check stop conditions
-                should_stop, stop_reason = await check_stop_conditions(
-                    db, session, answer_data.cancel
-                )
-                
+                # 3. Act on stop conditions
                 if should_stop:
                     # Update session status and commit before returning error
                     if stop_reason == "cancelled":
@@ -247,16 +254,22 @@ async def answer_question(
                             detail=f"Session cannot continue: {stop_reason}"
                         )
                 
-                # 4. Insert user answer node
+                # 4. Build user answer node (written with the AI node below)
                 answer_type = "custom_answer" if answer_data.isCustomAnswer else "answer"
                 # Convert list to string for storage
                 answer_content = "; ".join(answer_data.selected) if len(answer_data.selected) > 1 else answer_data.selected[0]
-                user_node = await insert_user_answer_node(
-                    db, db_session, session_object_id, node_object_id, answer_content, answer_type
+                user_node = build_user_answer_node(
+                    session_object_id, node_object_id, answer_content, answer_type
                 )
                 
-                # 5. Build context chain
-                context_chain = await build_context_chain(db, session_object_id, user_node.id)
+                # 5. Build context chain up to the answered node, then the answer
+                context_chain = await build_context_chain(db, session_object_id, node_object_id)
+                context_chain.append({
+                    "role": user_node["role"],
+                    "content": user_node["content"],
+                    "type": user_node["type"],
+                    "created_at": user_node["created_at"]
+                })
                 context_string = truncate_context_for_tokens(context_chain, session.starter_prompt)
                 
                 # 6. Make AI call
@@ -323,7 +336,7 @@ If you have sufficient information, provide a complete, expertly-crafted prompt
 
 ## Target Configuration
 - **Model**: {session.target_model}
-- **Settings**: {session.settings}
+- **Settings**: {session.settings or {}}
 - **User Requirements**: Consider tone, length, style, and specific constraints mentioned
 
 ## Decision Criteria
@@ -355,17 +368,18 @@ Respond with **only** the JSON format - no additional text or explanations."""
                     )
                 
                 # 7. Parse AI response
-                question, options, selection_method, allow_custom_answer, final_prompt = await parse_ai_response(raw_response)
+                question, options, selection_method, allow_custom_answer, final_prompt = parse_ai_response(raw_response)
                 
                 if question and options:
                     # AI provided a question
                     custom_info = "\nAllows custom answer: Yes" if allow_custom_answer else "\nAllows custom answer: No"
                     selection_info = f"\nSelection method: {selection_method}"
                     question_content = f"Question: {question}\nOptions: {', '.join(options)}{selection_info}{custom_info}"
-                    ai_node = await insert_ai_node(
-                        db, db_session, session_object_id, user_node.id,
+                    ai_node = build_ai_node(
+                        session_object_id, user_node["_id"],
                         question_content, "question", raw_response
                     )
+                    await commit_turn(db, db_session, session_object_id, [user_node, ai_node])
                     
                     elapsed_time = time.time() - start_time
                     logger.info(f"Q&A loop iteration completed in {elapsed_time:.2f}s")
@@ -375,40 +389,44 @@ Respond with **only** the JSON format - no additional text or explanations."""
                         options=options,
                         selectionMethod=selection_method or "single",
                         allowCustomAnswer=allow_custom_answer or True,
-                        nodeId=str(ai_node.id)
+                        nodeId=str(ai_node["_id"])
                     )
                 
                 elif final_prompt:
                     # AI provided final prompt
-                    ai_node = await insert_ai_node(
-                        db, db_session, session_object_id, user_node.id,
+                    ai_node = build_ai_node(
+                        session_object_id, user_node["_id"],
                         final_prompt, "final", raw_response
                     )
                     
                     # Mark session as completed
-                    await update_session_status(db, db_session, session_object_id, "completed")
+                    await commit_turn(
+                        db, db_session, session_object_id, [user_node, ai_node], status="completed"
+                    )
                     
                     elapsed_time = time.time() - start_time
                     logger.info(f"Q&A loop completed with final prompt in {elapsed_time:.2f}s")
                     
                     return FinalPromptResponse(
                         finalPrompt=final_prompt,
-                        nodeId=str(ai_node.id)
+                        nodeId=str(ai_node["_id"])
                     )
                 
                 else:
                     # Fallback - treat as final prompt
                     fallback_prompt = "Unable to generate a proper response. Please try again."
-                    ai_node = await insert_ai_node(
-                        db, db_session, session_object_id, user_node.id,
+                    ai_node = build_ai_node(
+                        session_object_id, user_node["_id"],
                         fallback_prompt, "final", raw_response
                     )
                     
-                    await update_session_status(db, db_session, session_object_id, "completed")
+                    await commit_turn(
+                        db, db_session, session_object_id, [user_node, ai_node], status="completed"
+                    )
                     
                     return FinalPromptResponse(
                         finalPrompt=fallback_prompt,
-                        nodeId=str(ai_node.id)
+                        nodeId=str(ai_node["_id"])
                     )
     
     except HTTPException:
@@ -427,9 +445,9 @@ Respond with **only** the JSON format - no additional text or explanations."""
     "/{session_id}",
     response_model=SessionRead,
     summary="Get session by ID",
-    description="Retrieve a specific session by its ID (only accessible by owner)"
+    description="Retrieve a specific session by its ID (only accessible by owner)",
+    dependencies=[Depends(get_session_limiter)]
 )
-@limiter.limit(DEFAULT_RATE_LIMIT)
 async def get_session(
     request: Request,
     session_id: str,
@@ -481,13 +499,65 @@ async def get_session(
     return SessionRead(**session_doc)
 
 
+@router.get(
+    "/{session_id}/nodes",
+    response_model=List[NodeRead],
+    summary="List session nodes",
+    description="Get all nodes of a session in creation order (only accessible by owner)",
+    dependencies=[Depends(list_session_nodes_limiter)]
+)
+async def list_session_nodes(
+    request: Request,
+    session_id: str,
+    current_user: User = Depends(current_active_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    List every node in a session.
+    
+    Documents are encoded straight to JSON with msgspec (NodeReadMsg),
+    bypassing per-node pydantic validation.
+    
+    **Path Parameters:**
+    - **session_id**: MongoDB ObjectId of the session
+    
+    **Response:**
+    - **200**: Nodes retrieved successfully
+    - **401**: Authentication required
+    - **403**: Access denied (not session owner)
+    - **404**: Session not found
+    - **422**: Invalid session ID format
+    - **429**: Rate limit exceeded
+    """
+    try:
+        session_object_id = ObjectId(session_id)
+    except InvalidId:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Invalid session ID format"
+        )
+    
+    try:
+        await get_session_doc_with_validation(
+            db, session_object_id, ObjectId(current_user.id), {"_id": 1}
+        )
+    except QALoopError as e:
+        if "not found" in str(e):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
+    
+    cursor = db["nodes"].find({"session_id": session_object_id}).sort("created_at", 1).batch_size(NODE_BATCH_SIZE)
+    
+    return Response(content=await encode_node_cursor(cursor), media_type="application/json")
+
+
 @router.get(
     "",
     response_model=List[SessionRead],
     summary="List user sessions",
-    description="Get all sessions for the authenticated user, ordered by creation time (latest first)"
+    description="Get all sessions for the authenticated user, ordered by creation time (latest first)",
+    dependencies=[Depends(list_sessions_limiter)]
 )
-@limiter.limit(DEFAULT_RATE_LIMIT)
 async def list_sessions(
     request: Request,
     current_user: User = Depends(current_active_user),
@@ -518,7 +588,7 @@ async def list_sessions(
         ("created_at", -1)  # Latest first
     ]).skip(skip).limit(limit)
     
-    sessions = await cursor.to_list(length=None)
+    sessions = await cursor.to_list(length=limit)
     
     # Convert to response models
     return [SessionRead(**session) for session in sessions] 
\ No newline at end of file
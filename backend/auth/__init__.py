@@ -16,6 +16,7 @@ from fastapi_users.authentication.strategy import JWTStrategy
 from httpx_oauth.clients.google import GoogleOAuth2
 from httpx_oauth.clients.github import GitHubOAuth2
 
+from backend.auth.strategy import CachingJWTStrategy
 from backend.core.database import get_user_db
 from backend.models.user import User, UserCreate, UserRead, UserUpdate
 
@@ -32,7 +33,7 @@ ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", "
 
 def get_jwt_strategy() -> JWTStrategy:
     """Get JWT strategy configuration"""
-    return JWTStrategy(
+    return CachingJWTStrategy(
         secret=JWT_SECRET,
         lifetime_seconds=ACCESS_TOKEN_EXPIRE_MINUTES * 60,
         algorithm=JWT_ALGORITHM,
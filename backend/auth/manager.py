@@ -8,9 +8,10 @@ import uuid
 from typing import Optional
 
 from fastapi import Depends, Request
-from fastapi_users import BaseUserManager, StringIDMixin
+from fastapi.security import OAuth2PasswordRequestForm
+from fastapi_users import BaseUserManager, StringIDMixin, exceptions
 
-from backend.models.user import User, UserCreate
+from backend.models.user import User, UserCreate, password_manager
 from backend.core.database import get_user_db
 
 
@@ -55,9 +56,8 @@ class UserManager(StringIDMixin, BaseUserManager[User, str]):
         user_dict = user_create.model_dump()
         password = user_dict.pop("password")
         
-        # Use the password manager from models
-        from backend.models.user import password_manager
-        user_dict["hashed_password"] = password_manager.hash_password(password)
+        # Use the password manager from models (hashes off the event loop)
+        user_dict["hashed_password"] = await password_manager.hash_password_async(password)
         user_dict["id"] = str(uuid.uuid4())
         
         # Add timestamps
@@ -70,4 +70,32 @@ class UserManager(StringIDMixin, BaseUserManager[User, str]):
         
         await self.on_after_register(created_user, request)
         
-        return created_user 
\ No newline at end of file
+        return created_user
+
+    async def authenticate(
+        self, credentials: OAuth2PasswordRequestForm
+    ) -> Optional[User]:
+        """
+        Authenticate with the Argon2 password manager used at registration
+        
+        Hashing and verification run on the Argon2 thread pool; outdated
+        hashes are upgraded after a successful login.
+        """
+        try:
+            user = await self.get_by_email(credentials.username)
+        except exceptions.UserNotExists:
+            # Hash anyway so unknown emails take as long as wrong passwords
+            await password_manager.hash_password_async(credentials.password)
+            return None
+
+        verified = await password_manager.verify_password_async(
+            credentials.password, user.hashed_password
+        )
+        if not verified:
+            return None
+
+        if password_manager.needs_rehash(user.hashed_password):
+            new_hash = await password_manager.hash_password_async(credentials.password)
+            await self.user_db.update(user, {"hashed_password": new_hash})
+
+        return user
\ No newline at end of file
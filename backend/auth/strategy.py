@@ -0,0 +1,91 @@
+"""
+JWT strategy for Promptly
+Caches verified token claims so repeat requests skip signature checks
+"""
+
+import os
+import time
+import hashlib
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import jwt
+from fastapi_users import exceptions, models
+from fastapi_users.authentication.strategy import JWTStrategy
+from fastapi_users.jwt import decode_jwt
+from fastapi_users.manager import BaseUserManager
+
+
+# Verified-token cache configuration
+JWT_CACHE_TTL = float(os.getenv("JWT_CACHE_TTL_SECONDS", "5"))
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", "10000"))
+
+# token digest -> (user id, wall-clock time the entry stops being valid)
+_verified_tokens: "OrderedDict[bytes, Tuple[str, float]]" = OrderedDict()
+
+
+def _token_key(token: str) -> bytes:
+    """Cache key for a token that doesn't keep the raw credential in memory"""
+    return hashlib.sha256(token.encode("utf-8")).digest()[:16]
+
+
+def clear_token_cache() -> None:
+    """Forget all cached token verifications"""
+    _verified_tokens.clear()
+
+
+class CachingJWTStrategy(JWTStrategy[models.UP, models.ID]):
+    """
+    JWT strategy that remembers successfully verified tokens for a short TTL.
+
+    Only the signature/claims check is cached; the user is still loaded on
+    every request, so deactivated or deleted users are rejected immediately.
+    Entries never outlive the token's own ``exp`` claim.
+    """
+
+    def _verify(self, token: str) -> Optional[str]:
+        """Return the token's subject, from cache when recently verified"""
+        key = _token_key(token)
+        now = time.time()
+        cached = _verified_tokens.get(key)
+        if cached is not None:
+            user_id, expires_at = cached
+            if now < expires_at:
+                _verified_tokens.move_to_end(key)
+                return user_id
+            del _verified_tokens[key]
+
+        try:
+            data = decode_jwt(
+                token, self.decode_key, self.token_audience, algorithms=[self.algorithm]
+            )
+        except jwt.PyJWTError:
+            return None
+        user_id = data.get("sub")
+        if user_id is None:
+            return None
+
+        expires_at = now + JWT_CACHE_TTL
+        if "exp" in data:
+            expires_at = min(expires_at, float(data["exp"]))
+        if JWT_CACHE_SIZE > 0 and expires_at > now:
+            _verified_tokens[key] = (user_id, expires_at)
+            if len(_verified_tokens) > JWT_CACHE_SIZE:
+                _verified_tokens.popitem(last=False)
+        return user_id
+
+    async def read_token(
+        self, token: Optional[str], user_manager: BaseUserManager[models.UP, models.ID]
+    ) -> Optional[models.UP]:
+        if token is None:
+            return None
+
+        user_id = self._verify(token)
+        if user_id is None:
+            return None
+
+        try:
+            parsed_id = user_manager.parse_id(user_id)
+            return await user_manager.get(parsed_id)
+        except (exceptions.UserNotExists, exceptions.InvalidID):
+            return None
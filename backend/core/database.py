@@ -4,11 +4,17 @@ Provides MongoDB async client configuration and dependency injection
 """
 
 import os
+import asyncio
 from typing import AsyncGenerator, Optional, Any
 
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from fastapi import Depends
 
+# Connection pool sizing (per worker process)
+MONGODB_MAX_POOL_SIZE = int(os.getenv("MONGODB_MAX_POOL_SIZE", str(2 * (os.cpu_count() or 1) + 1)))
+MONGODB_MIN_POOL_SIZE = int(os.getenv("MONGODB_MIN_POOL_SIZE", "5"))
+MONGODB_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "3000"))
+
 
 class DatabaseManager:
     """Database manager for MongoDB connections"""
@@ -26,7 +32,10 @@ class DatabaseManager:
         try:
             self.client = AsyncIOMotorClient(
                 mongodb_url,
-                uuidRepresentation="standard"
+                uuidRepresentation="standard",
+                maxPoolSize=MONGODB_MAX_POOL_SIZE,
+                minPoolSize=MONGODB_MIN_POOL_SIZE,
+                serverSelectionTimeoutMS=MONGODB_SERVER_SELECTION_TIMEOUT_MS
             )
             
             database_name = os.getenv("MONGODB_DATABASE", "promptly")
@@ -41,6 +50,22 @@ class DatabaseManager:
             self.database = None
             raise
     
+    async def warm_pool(self):
+        """
+        Open the minimum pool size up front
+        
+        Issues concurrent pings so each one checks out its own connection,
+        moving the TCP/TLS/auth handshakes out of the first requests.
+        """
+        if not self.client:
+            return
+        
+        await asyncio.gather(*(
+            self.client.admin.command('ping')
+            for _ in range(MONGODB_MIN_POOL_SIZE)
+        ))
+        print(f"🔥 Warmed MongoDB pool with {MONGODB_MIN_POOL_SIZE} connections")
+    
     async def disconnect(self):
         """Close database connection"""
         if self.client:
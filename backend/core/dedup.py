@@ -0,0 +1,93 @@
+"""
+Request Deduplication Middleware
+Collapses concurrent identical GET/HEAD requests into a single handler call
+"""
+
+import os
+import asyncio
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp
+
+logger = logging.getLogger(__name__)
+
+# Paths eligible for deduplication. Rate-limited and per-user routes are
+# deliberately excluded: followers would skip the limiter and share a response.
+DEDUP_PATHS = [
+    path.strip()
+    for path in os.getenv("DEDUP_PATHS", "/ping,/").split(",")
+    if path.strip()
+]
+
+DEDUP_METHODS = frozenset({"GET", "HEAD"})
+
+# (status_code, raw_headers, body) of a completed response
+CachedResponse = Tuple[int, List[Tuple[bytes, bytes]], bytes]
+
+
+class DedupMiddleware(BaseHTTPMiddleware):
+    """
+    Share one in-flight response between identical concurrent requests.
+
+    The first request for a (method, path, query) key runs the handler;
+    requests arriving while it is in flight await the same future and get
+    their own copy of the buffered response. Nothing is cached once the
+    leader finishes.
+    """
+
+    def __init__(self, app: ASGIApp, paths: Optional[Iterable[str]] = None):
+        super().__init__(app)
+        self.paths = frozenset(DEDUP_PATHS if paths is None else paths)
+        self._inflight: Dict[Tuple[str, str, str], asyncio.Future] = {}
+
+    def _is_dedupable(self, request: Request) -> bool:
+        """Only anonymous, body-less requests to allow-listed paths"""
+        return (
+            request.method in DEDUP_METHODS
+            and request.url.path in self.paths
+            and "authorization" not in request.headers
+            and "cookie" not in request.headers
+        )
+
+    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
+        if not self._is_dedupable(request):
+            return await call_next(request)
+
+        key = (request.method, request.url.path, request.url.query)
+        future = self._inflight.get(key)
+        if future is not None:
+            await asyncio.wait([future])
+            if future.cancelled():
+                # Leader went away before finishing - serve this one directly
+                return await call_next(request)
+            return _build_response(future.result())
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            response = await call_next(request)
+            body = b"".join([chunk async for chunk in response.body_iterator])
+            cached = (response.status_code, list(response.raw_headers), body)
+            future.set_result(cached)
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else is waiting
+            raise
+        finally:
+            if not future.done():
+                future.cancel()
+            self._inflight.pop(key, None)
+
+        return _build_response(cached)
+
+
+def _build_response(cached: CachedResponse) -> Response:
+    """Create a fresh Response from a buffered one"""
+    status_code, raw_headers, body = cached
+    response = Response(content=body, status_code=status_code)
+    response.raw_headers = list(raw_headers)
+    return response
@@ -1,14 +1,24 @@
 """
-Rate Limiting Configuration using SlowAPI
-Implements user-based rate limiting with Redis backend
+Rate Limiting Configuration
+Implements user-based rate limiting with Redis backend:
+an atomic Lua token bucket (redis.asyncio) used as a per-route dependency,
+plus the SlowAPI limiter for decorator-based limits
 """
 
 import os
+import math
+import time
 import logging
+from typing import Dict, Optional, Tuple
+
 from fastapi import Request
+from limits import parse
+from redis.exceptions import NoScriptError, RedisError
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
+from backend.core.cache import get_redis
+
 logger = logging.getLogger(__name__)
 
 
@@ -57,4 +67,225 @@ limiter = Limiter(
 )
 
 # Default rate limit from environment
-DEFAULT_RATE_LIMIT = os.getenv("RATE_LIMIT", "60/minute") 
\ No newline at end of file
+DEFAULT_RATE_LIMIT = os.getenv("RATE_LIMIT", "60/minute")
+
+# Locally admitted requests per key between Redis syncs
+RATE_LIMIT_SYNC_EVERY = int(os.getenv("RATE_LIMIT_SYNC_EVERY", "10"))
+
+
+# Atomic token bucket evaluated server-side in a single round-trip.
+# KEYS[1] = bucket hash key
+# ARGV = capacity, refill rate (tokens/second), now (seconds), tokens
+#        requested, tokens already spent (hits admitted locally since the
+#        last sync - always charged, capped at what is left)
+# Returns {allowed, retry_after, shortfall}; shortfall counts spent tokens
+# the bucket could not cover
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local requested = tonumber(ARGV[4])
+local spent = tonumber(ARGV[5]) or 0
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1])
+local ts = tonumber(bucket[2])
+if tokens == nil or ts == nil then
+    tokens = capacity
+    ts = now
+end
+
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local charged = math.min(tokens, spent)
+local shortfall = math.ceil(spent - charged)
+tokens = tokens - charged
+
+local allowed = 0
+local retry_after = 0
+if tokens >= requested then
+    tokens = tokens - requested
+    allowed = 1
+else
+    retry_after = math.ceil((requested - tokens) / rate)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, retry_after, shortfall}
+"""
+
+
+class TokenBucketExceeded(Exception):
+    """Raised when a token bucket has no tokens left for the request"""
+
+    def __init__(self, retry_after: int):
+        self.retry_after = retry_after
+        super().__init__(f"Rate limit exceeded, retry after {retry_after}s")
+
+
+class LocalTokenBucket:
+    """
+    Per-process in-memory token bucket.
+
+    Only touched from the event loop thread, so no locking is needed.
+    Each entry tracks (tokens, last_refill, unsynced_hits) for a key.
+    """
+
+    def __init__(self, capacity: float, rate: float, max_keys: int = 10000):
+        self.capacity = capacity
+        self.rate = rate
+        self.max_keys = max_keys
+        self._buckets: Dict[str, Tuple[float, float, int]] = {}
+
+    def take(self, key: str) -> Tuple[bool, float, int]:
+        """
+        Try to take one token for a key.
+
+        Args:
+            key: Rate limit key
+
+        Returns:
+            Tuple of (allowed, tokens_left, unsynced_hits)
+        """
+        now = time.monotonic()
+        tokens, last, pending = self._buckets.get(key, (self.capacity, now, 0))
+        tokens = min(self.capacity, tokens + (now - last) * self.rate)
+
+        if tokens < 1:
+            self._buckets[key] = (tokens, now, pending)
+            return False, tokens, pending
+
+        if key not in self._buckets and len(self._buckets) >= self.max_keys:
+            self._prune(now)
+        tokens -= 1
+        pending += 1
+        self._buckets[key] = (tokens, now, pending)
+        return True, tokens, pending
+
+    def mark_synced(self, key: str) -> None:
+        """Reset the unsynced hit counter after reporting to Redis"""
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            self._buckets[key] = (bucket[0], bucket[1], 0)
+
+    def retry_after(self, tokens: float) -> int:
+        """Seconds until one token is available again"""
+        return max(1, math.ceil((1 - tokens) / self.rate))
+
+    def _prune(self, now: float) -> None:
+        """Drop buckets that have refilled completely"""
+        self._buckets = {
+            key: bucket for key, bucket in self._buckets.items()
+            if bucket[0] + (now - bucket[1]) * self.rate < self.capacity
+        }
+        if len(self._buckets) >= self.max_keys:
+            self._buckets.clear()
+
+
+class TokenBucketLimiter:
+    """
+    Redis-backed token bucket rate limiter.
+
+    Each check is a single EVALSHA of TOKEN_BUCKET_LUA, so refill, decrement
+    and write-back happen atomically on the Redis server in one round-trip.
+    A LocalTokenBucket in front of it rejects over-limit clients without
+    touching Redis and batches admitted hits into one sync every
+    ``sync_every`` requests. Instances are used as FastAPI dependencies.
+    """
+
+    _script_sha: Optional[str] = None
+
+    def __init__(
+        self,
+        limit: str = DEFAULT_RATE_LIMIT,
+        scope: str = "default",
+        sync_every: int = RATE_LIMIT_SYNC_EVERY
+    ):
+        item = parse(limit)
+        self.limit = limit
+        self.scope = scope
+        self.capacity = float(item.amount)
+        self.rate = item.amount / item.get_expiry()  # tokens per second
+        self.sync_every = max(1, sync_every)
+        self.local = LocalTokenBucket(self.capacity, self.rate)
+
+    @classmethod
+    async def load_script(cls) -> str:
+        """
+        Load the token bucket script into Redis (SCRIPT LOAD).
+
+        Returns:
+            str: SHA1 of the loaded script
+        """
+        cls._script_sha = await get_redis().script_load(TOKEN_BUCKET_LUA)
+        return cls._script_sha
+
+    async def hit(self, key: str, cost: int = 1, spent: int = 0) -> Tuple[bool, int]:
+        """
+        Consume tokens from the bucket for a key.
+
+        Args:
+            key: Rate limit key (see get_rate_limit_key)
+            cost: Number of tokens the current request needs
+            spent: Tokens already used by locally admitted hits; charged
+                unconditionally (down to an empty bucket) before ``cost``
+                is checked
+
+        Returns:
+            Tuple of (allowed, retry_after_seconds) for ``cost``
+        """
+        redis = get_redis()
+        bucket_key = f"{{bucket:{self.scope}:{key}}}"
+        args = (self.capacity, self.rate, time.time(), cost, spent)
+
+        if TokenBucketLimiter._script_sha is None:
+            await self.load_script()
+        try:
+            allowed, retry_after, shortfall = await redis.evalsha(
+                TokenBucketLimiter._script_sha, 1, bucket_key, *args
+            )
+        except NoScriptError:
+            # Script cache was flushed (e.g. Redis restart) - reload once
+            await self.load_script()
+            allowed, retry_after, shortfall = await redis.evalsha(
+                TokenBucketLimiter._script_sha, 1, bucket_key, *args
+            )
+        if shortfall:
+            logger.debug(f"Rate limit {bucket_key}: {shortfall} locally admitted hits over the shared limit")
+        return bool(allowed), int(retry_after)
+
+    async def __call__(self, request: Request) -> None:
+        """
+        FastAPI dependency enforcing the limit for the current request.
+
+        Raises:
+            TokenBucketExceeded: If the bucket for this client is empty
+        """
+        key = get_rate_limit_key(request)
+
+        allowed, tokens, pending = self.local.take(key)
+        if not allowed:
+            raise TokenBucketExceeded(self.local.retry_after(tokens))
+
+        # Defer the Redis round-trip until enough hits have accumulated,
+        # or sync every request once the local bucket is running low
+        if pending < self.sync_every and tokens >= self.sync_every:
+            return
+
+        # Earlier hits in the batch were already served, so they are charged
+        # regardless; only this request is admitted or rejected by Redis
+        self.local.mark_synced(key)
+        try:
+            allowed, retry_after = await self.hit(key, cost=1, spent=pending - 1)
+        except RedisError as e:
+            # Fail open: an unavailable Redis must not take the API down
+            logger.warning(f"Rate limiter unavailable, allowing request: {e}")
+            return
+
+        if not allowed:
+            raise TokenBucketExceeded(retry_after or 1)
+
+
+# Token bucket limiter for AI endpoints
+ai_limiter = TokenBucketLimiter(DEFAULT_RATE_LIMIT, scope="ai") 
\ No newline at end of file
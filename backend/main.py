@@ -4,24 +4,30 @@ Interactive AI Prompting Platform
 """
 
 import os
+import sys
+import logging
+import importlib
 from contextlib import asynccontextmanager
 from typing import Dict, List
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
 from slowapi.errors import RateLimitExceeded
 from dotenv import load_dotenv
 
+from backend.core.logging_config import setup_logging
+from backend.core.responses import ORJSONResponse
+
 # Import AI service error for global handling
-try:
-    from backend.services.ai_internal import GeminiServiceError
-except ImportError:
-    from services.ai_internal import GeminiServiceError
+from backend.services.ai_internal import GeminiServiceError
 
 # Load environment variables
 load_dotenv()
 
+# Queue-based logging: log calls in request handlers only enqueue
+setup_logging()
+logger = logging.getLogger(__name__)
+
 
 def validate_environment():
     """
@@ -34,38 +40,59 @@ def validate_environment():
     missing = [var for var in required_vars if not os.getenv(var)]
     if missing:
         raise ValueError(f"Missing required environment variables: {missing}")
-    print(f"✅ Environment validation passed")
+    logger.info("✅ Environment validation passed")
 
 # Import rate limiting components
-from backend.core.ratelimit import limiter, DEFAULT_RATE_LIMIT
+from backend.core.ratelimit import (
+    limiter,
+    ai_limiter,
+    DEFAULT_RATE_LIMIT,
+    TokenBucketLimiter,
+    TokenBucketExceeded,
+)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager for startup and shutdown events."""
     # Startup
-    print("🚀 Promptly API starting up...")
-    print(f"📝 Environment: {os.getenv('ENVIRONMENT', 'development')}")
-    print(f"🔧 Debug mode: {os.getenv('DEBUG', 'false')}")
-    print(f"⚡ Rate-limiting middleware enabled: {DEFAULT_RATE_LIMIT}")
+    logger.info("🚀 Promptly API starting up...")
+    logger.info(f"📝 Environment: {os.getenv('ENVIRONMENT', 'development')}")
+    logger.info(f"🔧 Debug mode: {os.getenv('DEBUG', 'false')}")
+    logger.info(f"⚡ Rate-limiting middleware enabled: {DEFAULT_RATE_LIMIT}")
     
     # Validate environment variables
     validate_environment()
     
+    # Load token bucket script into Redis (EVALSHA on the hot path)
+    try:
+        await TokenBucketLimiter.load_script()
+    except Exception as e:
+        logger.warning(f"⚠️  Rate limit script not loaded, will retry on first request: {e}")
+    
     # Initialize database
     from backend.core.database import db_manager
     await db_manager.connect()
+    try:
+        await db_manager.warm_pool()
+    except Exception as e:
+        logger.warning(f"⚠️  MongoDB pool warm-up failed: {e}")
     
     # Initialize models (create indexes)
     from backend.models import init_models
     database = db_manager.database
     if database:
         await init_models(database)
-        print("📊 Models initialized with indexes")
+        logger.info("📊 Models initialized with indexes")
+    
+    if LAZY_ROUTER_IMPORTS:
+        register_routers(app)
+        app.openapi_schema = None  # rebuild docs with the new routes
+        logger.info("🧩 Routers registered")
     
     yield
     # Shutdown
-    print("👋 Promptly API shutting down...")
+    logger.info("👋 Promptly API shutting down...")
     await db_manager.disconnect()
     
     # Close Redis connection
@@ -85,36 +112,38 @@ app = FastAPI(
     docs_url="/docs" if os.getenv("ENABLE_DOCS", "true").lower() == "true" else None,
     redoc_url="/redoc" if os.getenv("ENABLE_DOCS", "true").lower() == "true" else None,
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # Add rate limiting state
 app.state.limiter = limiter
 
-# Add SlowAPI middleware
-from slowapi.middleware import SlowAPIMiddleware
-app.add_middleware(SlowAPIMiddleware)
+# Routes are limited by TokenBucketLimiter dependencies (async Redis), so
+# SlowAPIMiddleware is not installed; app.state.limiter keeps @limiter.limit usable
+
+# Collapse concurrent identical health-check requests
+from backend.core.dedup import DedupMiddleware
+app.add_middleware(DedupMiddleware)
 
 # Rate limiting exception handler
 @app.exception_handler(RateLimitExceeded)
-async def rate_limit_handler(request: Request, exc: RateLimitExceeded):
+@app.exception_handler(TokenBucketExceeded)
+async def rate_limit_handler(request: Request, exc: Exception):
     """
     Custom rate limit exceeded handler.
     
     Returns JSON response with 429 status and Retry-After header.
     """
-    import logging
-    
-    logger = logging.getLogger(__name__)
     logger.warning(
         f"Rate limit exceeded for {request.client.host if request.client else 'unknown'} "
         f"on {request.method} {request.url.path}"
     )
     
-    response = JSONResponse(
+    response = ORJSONResponse(
         status_code=429,
         content={"detail": "Rate limit exceeded"}
     )
-    response.headers["Retry-After"] = str(exc.retry_after or 60)
+    response.headers["Retry-After"] = str(getattr(exc, "retry_after", None) or 60)
     return response
 
 
@@ -126,9 +155,6 @@ async def gemini_service_error_handler(request: Request, exc: GeminiServiceError
     
     Maps AI service errors to proper HTTP responses.
     """
-    import logging
-    
-    logger = logging.getLogger(__name__)
     logger.error(
         f"Gemini service error {exc.status} for {request.client.host if request.client else 'unknown'} "
         f"on {request.method} {request.url.path}: {exc.detail}"
@@ -137,7 +163,7 @@ async def gemini_service_error_handler(request: Request, exc: GeminiServiceError
     # Map internal errors to 502 Bad Gateway for external API issues
     status_code = 502 if exc.status >= 500 else exc.status
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status_code,
         content={"detail": f"AI service error: {exc.detail}"}
     )
@@ -148,11 +174,13 @@ cors_origins: List[str] = [
     for origin in os.getenv("CORS_ORIGINS", "http://localhost:5173").split(",")
     if origin.strip()  # Filter out empty strings
 ]
+# Methods actually served by the API; preflights are answered by the middleware
+CORS_METHODS: List[str] = ["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"]
 app.add_middleware(
     CORSMiddleware,
     allow_origins=cors_origins,
     allow_credentials=True,
-    allow_methods=["*"],
+    allow_methods=CORS_METHODS,
     allow_headers=["*"],
 )
 
@@ -183,65 +211,12 @@ async def root() -> Dict[str, str]:
     }
 
 
-# Authentication routes
-from backend.auth import AuthRoutes, google_oauth_client, github_oauth_client, jwt_authentication
-
-# JWT authentication routes
-app.include_router(
-    AuthRoutes.get_auth_router(),
-    prefix="/auth/jwt",
-    tags=["auth"]
-)
-
-# User registration routes
-app.include_router(
-    AuthRoutes.get_register_router(),
-    prefix="/auth",
-    tags=["auth"]
-)
-
-# User management routes
-app.include_router(
-    AuthRoutes.get_users_router(),
-    prefix="/users",
-    tags=["users"]
-)
-
-# OAuth routes
-OAUTH_STATE_SECRET = os.getenv("JWT_SECRET_KEY", "dev-secret-change-in-production")
-
-# Google OAuth
-if os.getenv("GOOGLE_CLIENT_ID") and os.getenv("GOOGLE_CLIENT_SECRET"):
-    app.include_router(
-        AuthRoutes.get_oauth_router(
-            google_oauth_client,
-            jwt_authentication,
-            OAUTH_STATE_SECRET,
-        ),
-        prefix="/auth/google",
-        tags=["auth"]
-    )
-
-# GitHub OAuth
-if os.getenv("GITHUB_CLIENT_ID") and os.getenv("GITHUB_CLIENT_SECRET"):
-    app.include_router(
-        AuthRoutes.get_oauth_router(
-            github_oauth_client,
-            jwt_authentication,
-            OAUTH_STATE_SECRET,
-        ),
-        prefix="/auth/github",
-        tags=["auth"]
-    )
-
-
 # AI Services Router (with rate limiting)
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 
 ai_router = APIRouter()
 
-@ai_router.get("/ping")
-@limiter.limit(DEFAULT_RATE_LIMIT)
+@ai_router.get("/ping", dependencies=[Depends(ai_limiter)])
 async def ai_ping(request: Request) -> Dict[str, str]:
     """
     AI services health check endpoint.
@@ -263,22 +238,96 @@ app.include_router(
     tags=["ai"]
 )
 
-# Session management routes
-from backend.api.sessions import router as sessions_router
-app.include_router(sessions_router, prefix="/api")
+# Import auth/session/file routers in lifespan instead of at module import
+LAZY_ROUTER_IMPORTS = os.getenv("LAZY_ROUTER_IMPORTS", "false").lower() == "true"
 
-# File upload routes
-from backend.api.files import router as files_router
-app.include_router(files_router, prefix="/api")
+# OAuth routes
+OAUTH_STATE_SECRET = os.getenv("JWT_SECRET_KEY", "dev-secret-change-in-production")
+
+
+def register_routers(app: FastAPI) -> None:
+    """
+    Import and mount the auth, session and file routers.
+    
+    Called at import time by default. With LAZY_ROUTER_IMPORTS=true it runs
+    from lifespan instead, so the process binds and answers /ping before
+    the heavier auth/OAuth/storage modules are loaded.
+    """
+    auth = importlib.import_module("backend.auth")
+    AuthRoutes = auth.AuthRoutes
+    
+    # JWT authentication routes
+    app.include_router(
+        AuthRoutes.get_auth_router(),
+        prefix="/auth/jwt",
+        tags=["auth"]
+    )
+    
+    # User registration routes
+    app.include_router(
+        AuthRoutes.get_register_router(),
+        prefix="/auth",
+        tags=["auth"]
+    )
+    
+    # User management routes
+    app.include_router(
+        AuthRoutes.get_users_router(),
+        prefix="/users",
+        tags=["users"]
+    )
+    
+    # Google OAuth
+    if os.getenv("GOOGLE_CLIENT_ID") and os.getenv("GOOGLE_CLIENT_SECRET"):
+        app.include_router(
+            AuthRoutes.get_oauth_router(
+                auth.google_oauth_client,
+                auth.jwt_authentication,
+                OAUTH_STATE_SECRET,
+            ),
+            prefix="/auth/google",
+            tags=["auth"]
+        )
+    
+    # GitHub OAuth
+    if os.getenv("GITHUB_CLIENT_ID") and os.getenv("GITHUB_CLIENT_SECRET"):
+        app.include_router(
+            AuthRoutes.get_oauth_router(
+                auth.github_oauth_client,
+                auth.jwt_authentication,
+                OAUTH_STATE_SECRET,
+            ),
+            prefix="/auth/github",
+            tags=["auth"]
+        )
+    
+    # Session management routes
+    sessions = importlib.import_module("backend.api.sessions")
+    app.include_router(sessions.router, prefix="/api")
+    
+    # File upload routes
+    files = importlib.import_module("backend.api.files")
+    app.include_router(files.router, prefix="/api")
+
+
+if not LAZY_ROUTER_IMPORTS:
+    register_routers(app)
 
 
 if __name__ == "__main__":
     import uvicorn
     
+    reload = os.getenv("RELOAD_ON_CHANGE", "true").lower() == "true"
+    
     uvicorn.run(
-        "main:app",
+        "backend.main:app",
         host=os.getenv("API_HOST", "0.0.0.0"),
         port=int(os.getenv("API_PORT", "8000")),
-        reload=os.getenv("RELOAD_ON_CHANGE", "true").lower() == "true",
-        workers=int(os.getenv("API_WORKERS", "1"))
+        reload=reload,
+        # Reload mode is single-process; otherwise default to one worker per core
+        workers=1 if reload else int(os.getenv("API_WORKERS", str(os.cpu_count() or 1))),
+        # uvloop is not available on Windows
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+        access_log=os.getenv("ACCESS_LOG", "false").lower() == "true"
     ) 
\ No newline at end of file
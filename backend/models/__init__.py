@@ -3,9 +3,16 @@ Models package for Promptly backend
 Contains data models and schemas
 """
 
+import asyncio
+import weakref
+from typing import Any
+
 # Re-export ObjectId for consistency across models
 from bson import ObjectId
 
+# Shared ObjectId field type
+from .types import PyObjectId, validate_object_id
+
 # User models
 from .user import (
     User,
@@ -23,7 +30,8 @@ from .session import (
     SessionCreate,
     SessionUpdate,
     SessionRead,
-    PyObjectId as SessionObjectId,
+    SessionSettings,
+    TargetModel,
     ensure_session_indexes
 )
 
@@ -33,28 +41,56 @@ from .node import (
     NodeCreate,
     NodeUpdate,
     NodeRead,
-    PyObjectId as NodeObjectId,
-    ensure_node_indexes
+    NodeReadMsg,
+    encode_node_docs,
+    encode_node_cursor,
+    ensure_node_indexes,
+    list_node_tree_skeleton
 )
 
-# Shared ObjectId type (use the one from session/node models)
-PyObjectId = SessionObjectId
+# Index builds started in this process, one Event per database. Weak keys
+# so a database object its owner has dropped is not pinned here.
+_models_initialized: "weakref.WeakKeyDictionary[Any, asyncio.Event]" = weakref.WeakKeyDictionary()
+
 
 # Model initialization function
 async def init_models(db):
     """
     Initialize all models by ensuring proper indexes exist
     
+    Runs at most once per database per process. Concurrent callers wait
+    for the first build instead of issuing their own createIndexes
+    commands, and a failed build is forgotten so the next caller retries.
+    
     Args:
         db: AsyncIOMotorDatabase instance
     """
-    await ensure_session_indexes(db)
-    await ensure_node_indexes(db)
+    while True:
+        event = _models_initialized.get(db)
+        if event is None:
+            break
+        await event.wait()
+        if _models_initialized.get(db) is event:
+            return
+    
+    event = asyncio.Event()
+    _models_initialized[db] = event
+    try:
+        await asyncio.gather(
+            ensure_session_indexes(db),
+            ensure_node_indexes(db)
+        )
+    except BaseException:
+        _models_initialized.pop(db, None)
+        raise
+    finally:
+        event.set()
 
 __all__ = [
     # ObjectId types
     "ObjectId",
     "PyObjectId",
+    "validate_object_id",
     
     # User models
     "User",
@@ -70,6 +106,8 @@ __all__ = [
     "SessionCreate",
     "SessionUpdate", 
     "SessionRead",
+    "SessionSettings",
+    "TargetModel",
     "ensure_session_indexes",
     
     # Node models
@@ -77,7 +115,11 @@ __all__ = [
     "NodeCreate",
     "NodeUpdate",
     "NodeRead", 
+    "NodeReadMsg",
+    "encode_node_docs",
+    "encode_node_cursor",
     "ensure_node_indexes",
+    "list_node_tree_skeleton",
     
     # Initialization
     "init_models",
@@ -3,24 +3,45 @@ Node model for Promptly
 Defines node data structure for prompt decision trees
 """
 
+import os
+import time
+import logging
 from datetime import datetime, timezone
-from typing import Optional, Annotated, Any, Dict
+from typing import Optional, Any, Dict, Iterable, List, Tuple, Union
 
+import msgspec
 from bson import ObjectId
-from pydantic import BaseModel, Field, BeforeValidator
-from motor.motor_asyncio import AsyncIOMotorDatabase
+from pydantic import BaseModel, ConfigDict, Field
+from motor.motor_asyncio import AsyncIOMotorCursor, AsyncIOMotorDatabase
+from pymongo import IndexModel
+from pymongo.errors import OperationFailure
 
+from .types import PyObjectId, validate_object_id
 
-def validate_object_id(v: Any) -> ObjectId:
-    """Validate and convert to ObjectId"""
-    if isinstance(v, ObjectId):
-        return v
-    if isinstance(v, str) and ObjectId.is_valid(v):
-        return ObjectId(v)
-    raise ValueError("Invalid ObjectId")
+logger = logging.getLogger(__name__)
 
+# Opt-in: hash-shard nodes on session_id when connected to a mongos
+SHARD_NODES = os.getenv("MONGODB_SHARD_NODES", "false").lower() == "true"
 
-PyObjectId = Annotated[ObjectId, BeforeValidator(validate_object_id)]
+# Maximum length of a node's content; raw node documents built outside the
+# models must enforce it at the API boundary
+NODE_CONTENT_MAX_LENGTH = 10000
+
+
+# MongoDB stores datetimes at millisecond precision, so a timestamp cached
+# for up to 1ms is indistinguishable once persisted
+_last_now_ns = 0
+_last_now_dt = datetime.fromtimestamp(0, timezone.utc)
+
+
+def _now_utc_coarse() -> datetime:
+    """Current UTC time, rebuilt at most once per millisecond"""
+    global _last_now_ns, _last_now_dt
+    now_ns = time.time_ns()
+    if not 0 <= now_ns - _last_now_ns < 1_000_000:
+        _last_now_ns = now_ns
+        _last_now_dt = datetime.fromtimestamp(now_ns / 1e9, timezone.utc)
+    return _last_now_dt
 
 
 class Node(BaseModel):
@@ -28,19 +49,16 @@ class Node(BaseModel):
     Node model for MongoDB storage
     Represents a node in the decision tree for prompt crafting
     """
-    id: PyObjectId = Field(default_factory=ObjectId, alias="_id")
+    id: PyObjectId = Field(default_factory=ObjectId, alias="_id", validate_default=False)
     session_id: PyObjectId = Field(...)
     parent_id: Optional[PyObjectId] = Field(None)
     role: str = Field(..., max_length=50)  # e.g., "user", "assistant"
-    content: str = Field(..., max_length=10000)
+    content: str = Field(..., max_length=NODE_CONTENT_MAX_LENGTH)
     type: Optional[str] = Field(None, max_length=50)  # e.g., "question", "final", "answer"
     extra: Optional[Dict[str, Any]] = Field(default_factory=dict)  # For raw AI responses and metadata
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: datetime = Field(default_factory=_now_utc_coarse)
     
-    class Config:
-        populate_by_name = True
-        arbitrary_types_allowed = True
-        json_encoders = {ObjectId: str}
+    model_config = ConfigDict(populate_by_name=True, arbitrary_types_allowed=True)
 
 
 class NodeCreate(BaseModel):
@@ -48,7 +66,7 @@ class NodeCreate(BaseModel):
     session_id: str = Field(...)
     parent_id: Optional[str] = Field(None)
     role: str = Field(..., max_length=50)
-    content: str = Field(..., max_length=10000)
+    content: str = Field(..., max_length=NODE_CONTENT_MAX_LENGTH)
     type: Optional[str] = Field(None, max_length=50)
     extra: Optional[Dict[str, Any]] = Field(default_factory=dict)
 
@@ -56,7 +74,7 @@ class NodeCreate(BaseModel):
 class NodeUpdate(BaseModel):
     """Schema for updating an existing node"""
     role: Optional[str] = Field(None, max_length=50)
-    content: Optional[str] = Field(None, max_length=10000)
+    content: Optional[str] = Field(None, max_length=NODE_CONTENT_MAX_LENGTH)
     type: Optional[str] = Field(None, max_length=50)
     extra: Optional[Dict[str, Any]] = None
 
@@ -72,8 +90,76 @@ class NodeRead(BaseModel):
     extra: Optional[Dict[str, Any]] = None
     created_at: datetime
     
-    class Config:
-        populate_by_name = True
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class NodeReadMsg(msgspec.Struct, kw_only=True):
+    """
+    msgspec mirror of NodeRead for bulk node responses
+    Skips pydantic validation and encodes in C
+    """
+    id: str
+    session_id: str
+    parent_id: Optional[str] = None
+    role: str
+    content: str
+    type: Optional[str] = None
+    extra: Optional[Dict[str, Any]] = None
+    created_at: datetime
+
+
+def _msgspec_enc_hook(obj: Any) -> Any:
+    """Encode ObjectIds nested in extra payloads"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    raise NotImplementedError(f"Objects of type {type(obj).__name__} are not supported")
+
+
+_node_encoder = msgspec.json.Encoder(enc_hook=_msgspec_enc_hook)
+
+
+def node_doc_to_msg(doc: Dict[str, Any]) -> NodeReadMsg:
+    """Convert a raw node document from MongoDB to NodeReadMsg"""
+    parent_id = doc.get("parent_id")
+    return NodeReadMsg(
+        id=str(doc["_id"]),
+        session_id=str(doc["session_id"]),
+        parent_id=str(parent_id) if parent_id is not None else None,
+        role=doc["role"],
+        content=doc["content"],
+        type=doc.get("type"),
+        extra=doc.get("extra"),
+        created_at=doc["created_at"]
+    )
+
+
+def encode_node_docs(docs: Iterable[Dict[str, Any]]) -> bytes:
+    """
+    Encode raw node documents as a JSON array
+    
+    Args:
+        docs: Node documents as returned by MongoDB
+        
+    Returns:
+        JSON bytes in the NodeRead shape
+    """
+    return _node_encoder.encode([node_doc_to_msg(doc) for doc in docs])
+
+
+async def encode_node_cursor(cursor: AsyncIOMotorCursor) -> bytes:
+    """
+    Encode a node cursor as a JSON array while iterating it
+    
+    Each document is converted as its batch arrives, so raw BSON dicts are
+    released as the cursor advances instead of all being held at once.
+    
+    Args:
+        cursor: Motor cursor over node documents
+        
+    Returns:
+        JSON bytes in the NodeRead shape
+    """
+    return _node_encoder.encode([node_doc_to_msg(doc) async for doc in cursor])
 
 
 async def ensure_node_indexes(db: AsyncIOMotorDatabase):
@@ -82,25 +168,96 @@ async def ensure_node_indexes(db: AsyncIOMotorDatabase):
     
     Indexes:
     - session_id + parent_id for threaded tree queries
+    - session_id + role + type for question counts
     - session_id for session node queries
     - parent_id for child node queries
     - created_at for time-based queries
     """
     collection = db["nodes"]
     
-    # Compound index for session nodes with parent relationships
-    await collection.create_index([
-        ("session_id", 1),
-        ("parent_id", 1)
-    ], name="session_parent_nodes")
+    # Single createIndexes command: one round-trip, built together server-side
+    await collection.create_indexes([
+        # Compound index for session nodes with parent relationships
+        IndexModel([("session_id", 1), ("parent_id", 1)], name="session_parent_nodes", background=True),
+        
+        # Compound index for session nodes ordered by creation time
+        IndexModel([("session_id", 1), ("created_at", 1)], name="session_nodes_by_time", background=True),
+        
+        # Compound index for per-session question counts in the Q&A loop
+        IndexModel([("session_id", 1), ("role", 1), ("type", 1)], name="session_role_type", background=True),
+        
+        # Single field indexes
+        IndexModel("session_id", name="session_id_index", background=True),
+        IndexModel("parent_id", name="parent_id_index", background=True),
+        IndexModel("created_at", name="created_at_index", background=True),
+    ])
+    
+    if SHARD_NODES:
+        await shard_nodes_collection(db)
+
+
+async def shard_nodes_collection(db: AsyncIOMotorDatabase) -> bool:
+    """
+    Hash-shard the nodes collection on session_id
     
-    # Compound index for session nodes ordered by creation time
-    await collection.create_index([
-        ("session_id", 1),
-        ("created_at", 1)
-    ], name="session_nodes_by_time")
+    Keeps each session's nodes on a single shard so tree reads are
+    single-shard queries. Only acts when connected through mongos;
+    replica sets and standalone servers are left as they are.
+    
+    Args:
+        db: Database instance
+        
+    Returns:
+        True if the collection is sharded after the call
+    """
+    hello = await db.client.admin.command("hello")
+    if hello.get("msg") != "isdbgrid":
+        return False
+    
+    # A hashed index on the shard key must exist before sharding a non-empty collection
+    await db["nodes"].create_index([("session_id", "hashed")], name="session_id_hashed")
+    try:
+        await db.client.admin.command(
+            "shardCollection",
+            f"{db.name}.nodes",
+            key={"session_id": "hashed"}
+        )
+        logger.info(f"Sharded {db.name}.nodes on hashed session_id")
+    except OperationFailure as e:
+        # Already sharded (possibly by another worker) on the same key
+        if "already" not in str(e).lower():
+            raise
+    return True 
+
+
+# Fields needed to rebuild a session's tree shape without node bodies
+TREE_SKELETON_PROJECTION = {"_id": 1, "parent_id": 1, "role": 1}
+
+
+async def list_node_tree_skeleton(
+    db: AsyncIOMotorDatabase,
+    session_id: Union[str, ObjectId]
+) -> List[Tuple[ObjectId, Optional[ObjectId], str]]:
+    """
+    List the tree structure of a session without node content
+    
+    Only _id, parent_id and role are fetched, so long content and extra
+    payloads never leave MongoDB. Sorted by creation time using the
+    session_nodes_by_time index.
+    
+    Args:
+        db: Database instance
+        session_id: Session ID
+        
+    Returns:
+        List of (node_id, parent_id, role) tuples in creation order
+    """
+    cursor = db["nodes"].find(
+        {"session_id": validate_object_id(session_id)},
+        projection=TREE_SKELETON_PROJECTION
+    ).sort("created_at", 1)
     
-    # Single field indexes
-    await collection.create_index("session_id", name="session_id_index")
-    await collection.create_index("parent_id", name="parent_id_index")
-    await collection.create_index("created_at", name="created_at_index") 
\ No newline at end of file
+    return [
+        (doc["_id"], doc.get("parent_id"), doc.get("role"))
+        async for doc in cursor
+    ]
\ No newline at end of file
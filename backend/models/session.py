@@ -4,23 +4,45 @@ Defines session data structure for AI prompt crafting sessions
 """
 
 from datetime import datetime, timezone
-from typing import Optional, Dict, Any, Annotated
+from typing import Optional, Dict, Any, List, Literal
 
 from bson import ObjectId
-from pydantic import BaseModel, Field, BeforeValidator, field_validator
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    Field,
+    StrictInt,
+    StrictStr,
+    field_validator,
+)
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import IndexModel
 
+from .types import PyObjectId
 
-def validate_object_id(v: Any) -> ObjectId:
-    """Validate and convert to ObjectId"""
-    if isinstance(v, ObjectId):
-        return v
-    if isinstance(v, str) and ObjectId.is_valid(v):
-        return ObjectId(v)
-    raise ValueError("Invalid ObjectId")
 
+# Supported target models, validated by pydantic-core as a literal schema
+TargetModel = Literal[
+    'gpt-4', 'gpt-4-turbo', 'gpt-3.5-turbo',
+    'claude-3-opus', 'claude-3-sonnet', 'claude-3-haiku',
+    'llama-2-70b', 'llama-2-13b', 'gemini-pro'
+]
+
+# Built once at import; validators only do a hashed membership check
+_VALID_STATUSES = frozenset({"active", "completed", "cancelled"})
+_VALID_STATUSES_ERR = "Status must be one of: " + ", ".join(sorted(_VALID_STATUSES))
 
-PyObjectId = Annotated[ObjectId, BeforeValidator(validate_object_id)]
+
+class SessionSettings(BaseModel):
+    """
+    Generation settings for a session
+    Known keys are type-checked; any other keys are kept as-is
+    """
+    tone: Optional[StrictStr] = None
+    wordLimit: Optional[StrictInt] = None
+    contextSources: Optional[List[Any]] = None
+    
+    model_config = ConfigDict(extra='allow')
 
 
 class Session(BaseModel):
@@ -28,77 +50,54 @@ class Session(BaseModel):
     Session model for MongoDB storage
     Represents an AI prompt crafting session
     """
-    id: PyObjectId = Field(default_factory=ObjectId, alias="_id")
+    id: PyObjectId = Field(default_factory=ObjectId, alias="_id", validate_default=False)
     user_id: PyObjectId = Field(...)
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     title: Optional[str] = Field(None, max_length=200)
-    metadata: Optional[Dict[str, Any]] = Field(default_factory=dict)
+    metadata: Optional[Dict[str, Any]] = None  # read as `metadata or {}`
     
     # Session-specific fields
     starter_prompt: Optional[str] = Field(None, max_length=5000)
     max_questions: int = Field(default=10, ge=1, le=20)
     target_model: str = Field(default="gpt-4", max_length=50)
-    settings: Dict[str, Any] = Field(default_factory=dict)
+    settings: Optional[Dict[str, Any]] = None  # read as `settings or {}`
     status: str = Field(default="active", max_length=20)  # active, completed, cancelled
     
-    class Config:
-        populate_by_name = True
-        arbitrary_types_allowed = True
-        json_encoders = {ObjectId: str}
+    model_config = ConfigDict(
+        populate_by_name=True,
+        arbitrary_types_allowed=True,
+        extra='ignore',
+        validate_assignment=False,
+    )
 
     @field_validator('status')
     @classmethod
     def validate_status(cls, v):
         """Validate session status"""
-        valid_statuses = ["active", "completed", "cancelled"]
-        if v not in valid_statuses:
-            raise ValueError(f"Status must be one of: {', '.join(valid_statuses)}")
+        if v not in _VALID_STATUSES:
+            raise ValueError(_VALID_STATUSES_ERR)
         return v
 
+    def to_mongo(self) -> Dict[str, Any]:
+        """Dump for Motor writes, keeping ObjectId and datetime values native"""
+        return self.model_dump(by_alias=True)
+
+    def to_api(self) -> bytes:
+        """Serialize to JSON bytes in SessionRead's shape in one pydantic-core pass"""
+        return self.__pydantic_serializer__.to_json(self, by_alias=False)
+
 
 class SessionCreate(BaseModel):
     """Schema for creating a new session"""
     title: Optional[str] = Field(None, max_length=200)
-    metadata: Optional[Dict[str, Any]] = Field(default_factory=dict)
+    metadata: Optional[Dict[str, Any]] = None
     starter_prompt: str = Field(..., min_length=1, max_length=5000)
     max_questions: int = Field(..., ge=1, le=20)
-    target_model: str = Field(..., min_length=1, max_length=50)
-    settings: Dict[str, Any] = Field(...)
-    
-    @field_validator('settings')
-    @classmethod
-    def validate_settings(cls, v):
-        """Validate settings structure"""
-        if not isinstance(v, dict):
-            raise ValueError("Settings must be a dictionary")
-        
-        # Validate required settings fields
-        tone = v.get('tone')
-        word_limit = v.get('wordLimit')
-        context_sources = v.get('contextSources')
-        
-        if tone is not None and not isinstance(tone, str):
-            raise ValueError("Settings.tone must be a string")
-        if word_limit is not None and not isinstance(word_limit, int):
-            raise ValueError("Settings.wordLimit must be an integer")
-        if context_sources is not None and not isinstance(context_sources, list):
-            raise ValueError("Settings.contextSources must be a list")
-            
-        return v
+    target_model: TargetModel = Field(...)
+    settings: SessionSettings = Field(...)
     
-    @field_validator('target_model')
-    @classmethod
-    def validate_target_model(cls, v):
-        """Validate target model is supported"""
-        supported_models = [
-            'gpt-4', 'gpt-4-turbo', 'gpt-3.5-turbo',
-            'claude-3-opus', 'claude-3-sonnet', 'claude-3-haiku',
-            'llama-2-70b', 'llama-2-13b', 'gemini-pro'
-        ]
-        if v not in supported_models:
-            raise ValueError(f"Unsupported target model. Supported models: {', '.join(supported_models)}")
-        return v
+    model_config = ConfigDict(extra='ignore', validate_assignment=False)
 
 
 class SessionUpdate(BaseModel):
@@ -108,50 +107,12 @@ class SessionUpdate(BaseModel):
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     starter_prompt: Optional[str] = Field(None, max_length=5000)
     max_questions: Optional[int] = Field(None, ge=1, le=20)
-    target_model: Optional[str] = Field(None, max_length=50)
-    settings: Optional[Dict[str, Any]] = None
+    target_model: Optional[TargetModel] = None
+    settings: Optional[SessionSettings] = None
     status: Optional[str] = Field(None, max_length=20)
     
-    @field_validator('target_model')
-    @classmethod
-    def validate_target_model(cls, v):
-        """Validate target model is supported (if provided)"""
-        if v is None:
-            return v
-        
-        supported_models = [
-            'gpt-4', 'gpt-4-turbo', 'gpt-3.5-turbo',
-            'claude-3-opus', 'claude-3-sonnet', 'claude-3-haiku',
-            'llama-2-70b', 'llama-2-13b', 'gemini-pro'
-        ]
-        if v not in supported_models:
-            raise ValueError(f"Unsupported target model. Supported models: {', '.join(supported_models)}")
-        return v
+    model_config = ConfigDict(extra='ignore', validate_assignment=False)
     
-    @field_validator('settings')
-    @classmethod
-    def validate_settings(cls, v):
-        """Validate settings structure (if provided)"""
-        if v is None:
-            return v
-            
-        if not isinstance(v, dict):
-            raise ValueError("Settings must be a dictionary")
-        
-        # Validate settings fields
-        tone = v.get('tone')
-        word_limit = v.get('wordLimit')
-        context_sources = v.get('contextSources')
-        
-        if tone is not None and not isinstance(tone, str):
-            raise ValueError("Settings.tone must be a string")
-        if word_limit is not None and not isinstance(word_limit, int):
-            raise ValueError("Settings.wordLimit must be an integer")
-        if context_sources is not None and not isinstance(context_sources, list):
-            raise ValueError("Settings.contextSources must be a list")
-            
-        return v
-
     @field_validator('status')
     @classmethod
     def validate_status(cls, v):
@@ -159,9 +120,8 @@ class SessionUpdate(BaseModel):
         if v is None:
             return v
         
-        valid_statuses = ["active", "completed", "cancelled"]
-        if v not in valid_statuses:
-            raise ValueError(f"Status must be one of: {', '.join(valid_statuses)}")
+        if v not in _VALID_STATUSES:
+            raise ValueError(_VALID_STATUSES_ERR)
         return v
 
 
@@ -176,11 +136,14 @@ class SessionRead(BaseModel):
     starter_prompt: Optional[str] = None
     max_questions: int
     target_model: str
-    settings: Dict[str, Any]
+    settings: Optional[Dict[str, Any]] = None
     status: str
     
-    class Config:
-        populate_by_name = True
+    model_config = ConfigDict(
+        populate_by_name=True,
+        extra='ignore',
+        validate_assignment=False,
+    )
 
 
 async def ensure_session_indexes(db: AsyncIOMotorDatabase):
@@ -195,14 +158,14 @@ async def ensure_session_indexes(db: AsyncIOMotorDatabase):
     """
     collection = db["sessions"]
     
-    # Compound index for user sessions ordered by creation time (latest first)
-    await collection.create_index([
-        ("user_id", 1),
-        ("created_at", -1)
-    ], name="user_sessions_by_time")
-    
-    # Single field indexes
-    await collection.create_index("user_id", name="user_id_index")
-    await collection.create_index("created_at", name="created_at_index")
-    await collection.create_index("updated_at", name="updated_at_index")
-    await collection.create_index("status", name="status_index") 
\ No newline at end of file
+    # Single createIndexes command: one round-trip, built together server-side
+    await collection.create_indexes([
+        # Compound index for user sessions ordered by creation time (latest first)
+        IndexModel([("user_id", 1), ("created_at", -1)], name="user_sessions_by_time", background=True),
+        
+        # Single field indexes
+        IndexModel("user_id", name="user_id_index", background=True),
+        IndexModel("created_at", name="created_at_index", background=True),
+        IndexModel("updated_at", name="updated_at_index", background=True),
+        IndexModel("status", name="status_index", background=True),
+    ])
\ No newline at end of file
@@ -0,0 +1,35 @@
+"""
+Shared field types for Promptly models
+Defines the ObjectId field type used by session and node models
+"""
+
+from typing import Annotated, Any
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pydantic import PlainSerializer, PlainValidator, WithJsonSchema
+
+
+def validate_object_id(v: Any) -> ObjectId:
+    """Validate and convert to ObjectId"""
+    # Exact type checks and a single parse: ObjectId(v) already validates
+    # the hex, so a separate is_valid() call would parse it twice
+    t = type(v)
+    if t is ObjectId:
+        return v
+    if t is str:
+        try:
+            return ObjectId(v)
+        except InvalidId:
+            pass
+    raise ValueError("Invalid ObjectId")
+
+
+# Validation and JSON serialization are both plain functions, so pydantic-core
+# calls them directly instead of falling back to json_encoders at dump time
+PyObjectId = Annotated[
+    ObjectId,
+    PlainValidator(validate_object_id),
+    PlainSerializer(lambda v: str(v), return_type=str, when_used="json"),
+    WithJsonSchema({"type": "string", "pattern": "^[0-9a-fA-F]{24}$"}),
+]
@@ -3,11 +3,43 @@ User model for Promptly
 Defines user data structure and authentication methods
 """
 
-from typing import List, Optional
-from pydantic import BaseModel, EmailStr, Field
+import os
+import re
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Annotated, List, Optional
+from pydantic import AfterValidator, BaseModel, Field
 from fastapi_users import schemas
 import argon2
 
+# Argon2 cost parameters (defaults: ~64 MB and 2 lanes per hash); existing
+# hashes with other parameters are upgraded on next login via needs_rehash
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "65536"))
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "2"))
+
+# Dedicated pool for Argon2 so hashing never blocks the event loop or
+# queues behind other work on the default executor
+_hash_executor = ThreadPoolExecutor(
+    max_workers=os.cpu_count() or 1,
+    thread_name_prefix="argon2"
+)
+
+
+# Stored emails were vetted by fastapi-users at signup, so reads only need
+# a shape check rather than the full email_validator machinery
+EMAIL_RE = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+
+def _validate_email(v: str) -> str:
+    """Check basic email shape and length, normalizing to lowercase"""
+    if len(v) > 254 or not EMAIL_RE.match(v):
+        raise ValueError('invalid email')
+    return v.lower()
+
+
+Email = Annotated[str, AfterValidator(_validate_email)]
+
 
 class OAuthAccount(BaseModel):
     """OAuth account model for social login"""
@@ -25,7 +57,7 @@ class User(BaseModel):
     Compatible with FastAPI Users
     """
     id: str = Field(alias="_id")
-    email: EmailStr
+    email: Email
     username: str
     hashed_password: str
     is_active: bool = True
@@ -73,9 +105,9 @@ class PasswordManager:
     
     def __init__(self):
         self.hasher = argon2.PasswordHasher(
-            time_cost=2,      # Number of iterations
-            memory_cost=102400,  # Memory usage in KiB (100MB)
-            parallelism=8,    # Number of parallel threads
+            time_cost=ARGON2_TIME_COST,      # Number of iterations
+            memory_cost=ARGON2_MEMORY_COST,  # Memory usage in KiB
+            parallelism=ARGON2_PARALLELISM,  # Number of parallel lanes
             hash_len=32,      # Hash length in bytes
             salt_len=16       # Salt length in bytes
         )
@@ -111,6 +143,35 @@ class PasswordManager:
         except Exception:
             return False
     
+    async def hash_password_async(self, password: str) -> str:
+        """
+        Hash a password on the Argon2 thread pool
+        
+        Args:
+            password: Plain text password
+            
+        Returns:
+            str: Hashed password
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_hash_executor, self.hash_password, password)
+    
+    async def verify_password_async(self, password: str, hashed_password: str) -> bool:
+        """
+        Verify a password on the Argon2 thread pool
+        
+        Args:
+            password: Plain text password
+            hashed_password: Hashed password from database
+            
+        Returns:
+            bool: True if password matches, False otherwise
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _hash_executor, self.verify_password, password, hashed_password
+        )
+    
     def needs_rehash(self, hashed_password: str) -> bool:
         """
         Check if password hash needs to be updated
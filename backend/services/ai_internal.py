@@ -2,9 +2,9 @@
 Gemini 2.5 Service Adapter - Internal AI Bridge
 
 This module provides an async adapter for Google Gemini 2.5 API with:
-- Input trimming for prompts > 2000 characters
-- Exponential backoff retry logic
-- Shared HTTP client for performance
+- Input trimming for prompts > 8000 UTF-8 bytes
+- Exponential backoff retry logic honoring Retry-After
+- Shared HTTP/2 client with tuned connection pool
 - Comprehensive error handling
 - Security-focused logging
 """
@@ -13,9 +13,11 @@ import asyncio
 import logging
 import os
 import random
+from functools import lru_cache
 from typing import Dict, Optional, Any
 
 import httpx
+import orjson
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -24,9 +26,60 @@ load_dotenv()
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# Global HTTP client singleton with thread-safe access
+# Gemini configuration, read once at import
+_API_KEY = os.getenv("GEMINI_API_KEY")
+_BASE_URL = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com/v1beta")
+_URL = f"{_BASE_URL}/models/gemini-2.0-flash-exp:generateContent"
+_HEADERS = {
+    "Content-Type": "application/json",
+    "x-goog-api-key": _API_KEY or ""
+}
+
+# Appended to prompts cut down by _truncate_prompt
+_TRUNCATION_MARKER = "…[truncated]"
+_TRUNCATION_MARKER_BYTES = len(_TRUNCATION_MARKER.encode("utf-8"))
+
+# Retry configuration
+MAX_RETRIES = 3
+BASE_RETRY_DELAY = 1.0  # seconds
+MAX_RETRY_AFTER = 30.0  # cap on server-requested delays
+
+# Upper bound on the error body kept for logs and GeminiServiceError
+MAX_ERROR_DETAIL_BYTES = 512
+
+# Serialized request bodies are cached for prompts up to this many characters
+PAYLOAD_CACHE_SIZE = 256
+PAYLOAD_CACHE_MAX_PROMPT = 4096
+
+# Context injection turn shared by every request
+_SYSTEM_PART = {
+    "parts": [
+        {
+            "text": "You are Gemini 2.5, respond concisely."
+        }
+    ]
+}
+
+# HTTP/2 multiplexes concurrent Gemini calls over one connection; it needs
+# the h2 package (httpx[http2]), so fall back to HTTP/1.1 without it
+try:
+    import h2  # noqa: F401
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
+# Keep idle connections around long enough to span bursts of retries, so
+# follow-up calls reuse an open TLS session instead of handshaking again
+_HTTP_LIMITS = httpx.Limits(
+    max_connections=int(os.getenv("GEMINI_MAX_CONNECTIONS", "200")),
+    max_keepalive_connections=int(os.getenv("GEMINI_MAX_KEEPALIVE_CONNECTIONS", "100")),
+    keepalive_expiry=float(os.getenv("GEMINI_KEEPALIVE_EXPIRY", "90"))
+)
+_HTTP_TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+
+# Global HTTP client singleton. Creation never awaits, so no lock is needed:
+# nothing else can run on the event loop between the check and the assignment.
 _http_client: Optional[httpx.AsyncClient] = None
-_client_lock = asyncio.Lock()
 
 
 class GeminiServiceError(Exception):
@@ -38,14 +91,20 @@ class GeminiServiceError(Exception):
         super().__init__(f"Gemini API error {status}: {detail}")
 
 
-async def _get_http_client() -> httpx.AsyncClient:
-    """Get or create the shared HTTP client singleton with thread safety."""
+def _get_http_client() -> httpx.AsyncClient:
+    """Get the shared HTTP client, creating it on first use."""
+    client = _http_client
+    return client if client is not None else _init_http_client()
+
+
+def _init_http_client() -> httpx.AsyncClient:
+    """Create the shared HTTP client singleton."""
     global _http_client
-    if _http_client is None:
-        async with _client_lock:
-            # Double-check pattern to prevent race conditions
-            if _http_client is None:
-                _http_client = httpx.AsyncClient()
+    _http_client = httpx.AsyncClient(
+        http2=_HTTP2_AVAILABLE,
+        limits=_HTTP_LIMITS,
+        timeout=_HTTP_TIMEOUT
+    )
     return _http_client
 
 
@@ -57,24 +116,104 @@ async def _close_http_client():
         _http_client = None
 
 
-def _truncate_prompt(prompt: str, max_length: int = 2000) -> str:
+def _truncate_prompt(prompt: str, max_bytes: int = 8000) -> str:
     """
-    Truncate prompt if it exceeds max_length characters.
+    Truncate prompt if its UTF-8 encoding exceeds max_bytes.
     
     Args:
         prompt: The input prompt text
-        max_length: Maximum allowed length (default: 2000)
+        max_bytes: Maximum allowed UTF-8 size, marker included (default: 8000)
         
     Returns:
         Truncated prompt with marker if truncation occurred
     """
-    if len(prompt) <= max_length:
+    # A codepoint is at most 4 bytes in UTF-8, so short prompts skip encoding
+    if len(prompt) * 4 <= max_bytes:
         return prompt
     
-    # The marker "…[truncated]" is 12 characters long
-    marker = "…[truncated]"
-    truncated = prompt[:max_length - len(marker)]
-    return f"{truncated}{marker}"
+    encoded = prompt.encode("utf-8")
+    if len(encoded) <= max_bytes:
+        return prompt
+    
+    # Drop any partial codepoint left at the cut
+    truncated = encoded[:max_bytes - _TRUNCATION_MARKER_BYTES].decode("utf-8", errors="ignore")
+    return truncated + _TRUNCATION_MARKER
+
+
+@lru_cache(maxsize=PAYLOAD_CACHE_SIZE, typed=True)
+def _build_payload(
+    prompt: str,
+    temperature: float,
+    max_tokens: int,
+    top_p: float,
+    top_k: int
+) -> bytes:
+    """
+    Build and serialize the Gemini request body with context injection.
+    
+    Args:
+        prompt: The (already truncated) user prompt
+        temperature: Sampling temperature
+        max_tokens: Maximum output tokens
+        top_p: Nucleus sampling threshold
+        top_k: Top-k sampling limit
+        
+    Returns:
+        JSON-encoded request body
+    """
+    return orjson.dumps({
+        "contents": [
+            _SYSTEM_PART,
+            {
+                "parts": [
+                    {
+                        "text": prompt
+                    }
+                ]
+            }
+        ],
+        "generationConfig": {
+            "temperature": temperature,
+            "maxOutputTokens": max_tokens,
+            "topP": top_p,
+            "topK": top_k
+        }
+    })
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header given in seconds.
+    
+    Args:
+        value: Raw header value, if present
+        
+    Returns:
+        Delay in seconds, or None if absent or not a number of seconds
+    """
+    if not isinstance(value, str):
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+def _backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """
+    Compute the delay before the next retry.
+    
+    Args:
+        attempt: Zero-based attempt number that just failed
+        retry_after: Server-provided Retry-After delay, if any
+        
+    Returns:
+        Retry-After (capped) when given, otherwise exponential backoff with jitter
+    """
+    if retry_after is not None:
+        return min(retry_after, MAX_RETRY_AFTER)
+    # Exponential backoff: 1s, 2s, 4s plus 0-250ms jitter
+    return BASE_RETRY_DELAY * (2 ** attempt) + random.uniform(0, 0.25)
 
 
 def _log_request_safely(prompt: str, max_log_length: int = 100) -> str:
@@ -121,11 +260,7 @@ async def ask_gemini(payload: Dict[str, Any], *, timeout: float = 30.0) -> Dict[
     if "prompt" not in payload:
         raise ValueError("Payload must contain 'prompt' field")
     
-    # Get configuration from environment
-    api_key = os.getenv("GEMINI_API_KEY")
-    base_url = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com/v1beta")
-    
-    if not api_key:
+    if not _API_KEY:
         raise GeminiServiceError(500, "GEMINI_API_KEY environment variable not set")
     
     # Process and truncate prompt
@@ -136,123 +271,76 @@ async def ask_gemini(payload: Dict[str, Any], *, timeout: float = 30.0) -> Dict[
     log_prompt = _log_request_safely(truncated_prompt)
     logger.info(f"Gemini API request initiated: {log_prompt}")
     
-    # Prepare request payload with context injection
-    request_payload = {
-        "contents": [
-            {
-                "parts": [
-                    {
-                        "text": "You are Gemini 2.5, respond concisely."
-                    }
-                ]
-            },
-            {
-                "parts": [
-                    {
-                        "text": truncated_prompt
-                    }
-                ]
-            }
-        ],
-        "generationConfig": {
-            "temperature": payload.get("temperature", 0.7),
-            "maxOutputTokens": payload.get("max_tokens", 4096),
-            "topP": payload.get("top_p", 0.95),
-            "topK": payload.get("top_k", 64)
-        }
-    }
-    
-    # Headers
-    headers = {
-        "Content-Type": "application/json",
-        "x-goog-api-key": api_key
-    }
+    # Serialize request body; recurring short prompts reuse cached bytes
+    body_args = (
+        truncated_prompt,
+        payload.get("temperature", 0.7),
+        payload.get("max_tokens", 4096),
+        payload.get("top_p", 0.95),
+        payload.get("top_k", 64)
+    )
+    if len(truncated_prompt) <= PAYLOAD_CACHE_MAX_PROMPT:
+        request_body = _build_payload(*body_args)
+    else:
+        request_body = _build_payload.__wrapped__(*body_args)
     
-    # Retry configuration
-    max_retries = 3
-    base_delay = 1.0  # seconds
+    client = _get_http_client()
     
-    client = await _get_http_client()
-    
-    for attempt in range(max_retries):
+    for attempt in range(MAX_RETRIES):
+        last_attempt = attempt == MAX_RETRIES - 1
+        retry_after = None
         try:
             # Make the API request
             response = await client.post(
-                f"{base_url}/models/gemini-2.0-flash-exp:generateContent",
-                json=request_payload,
-                headers=headers,
+                _URL,
+                content=request_body,
+                headers=_HEADERS,
                 timeout=timeout
             )
+        except httpx.ReadTimeout:
+            logger.warning(f"Gemini API timeout on attempt {attempt + 1}")
+            if last_attempt:
+                raise GeminiServiceError(408, "Request timeout after retries")
+        except httpx.RequestError as e:
+            logger.error(f"Gemini API request error on attempt {attempt + 1}: {str(e)}")
+            if last_attempt:
+                raise GeminiServiceError(500, f"Request error after retries: {str(e)}")
+        else:
+            # Single buffer shared by the success and error paths
+            raw = response.content
             
             # Check for success
             if response.status_code == 200:
-                result = response.json()
+                result = orjson.loads(raw)
                 logger.info(f"Gemini API request successful on attempt {attempt + 1}")
                 return result
             
-            # Handle client errors (4xx) - don't retry
-            elif 400 <= response.status_code < 500:
-                error_detail = response.text
-                logger.error(f"Gemini API client error {response.status_code}: {error_detail}")
-                raise GeminiServiceError(response.status_code, error_detail)
+            # Truncated so large HTML error pages don't flood logs
+            error_detail = raw[:MAX_ERROR_DETAIL_BYTES].decode("utf-8", errors="replace")
             
-            # Handle server errors (5xx) - retry with backoff
-            elif response.status_code >= 500:
-                error_detail = response.text
+            # Handle rate limiting (429) and server errors (5xx) - retry with backoff
+            if response.status_code == 429 or response.status_code >= 500:
                 logger.warning(
-                    f"Gemini API server error {response.status_code} on attempt {attempt + 1}: {error_detail}"
+                    f"Gemini API error {response.status_code} on attempt {attempt + 1}: {error_detail}"
                 )
-                
-                # Don't retry on last attempt
-                if attempt == max_retries - 1:
+                if last_attempt:
                     raise GeminiServiceError(response.status_code, error_detail)
-                
-                # Calculate delay with jitter
-                delay = base_delay * (2 ** attempt)  # Exponential backoff: 1s, 2s, 4s
-                jitter = random.uniform(0, 0.25)  # Add 0-250ms jitter
-                total_delay = delay + jitter
-                
-                logger.info(f"Retrying in {total_delay:.2f} seconds...")
-                await asyncio.sleep(total_delay)
-                continue
+                retry_after = _parse_retry_after(response.headers.get("retry-after"))
+            
+            # Handle other client errors (4xx) - don't retry
+            elif 400 <= response.status_code < 500:
+                logger.error(f"Gemini API client error {response.status_code}: {error_detail}")
+                raise GeminiServiceError(response.status_code, error_detail)
             
             else:
                 # Unexpected status code
                 error_detail = f"Unexpected status code: {response.status_code}"
                 logger.error(f"Gemini API unexpected error: {error_detail}")
                 raise GeminiServiceError(response.status_code, error_detail)
-                
-        except httpx.ReadTimeout:
-            logger.warning(f"Gemini API timeout on attempt {attempt + 1}")
-            
-            # Don't retry on last attempt
-            if attempt == max_retries - 1:
-                raise GeminiServiceError(408, "Request timeout after retries")
-            
-            # Retry with exponential backoff
-            delay = base_delay * (2 ** attempt)
-            jitter = random.uniform(0, 0.25)
-            total_delay = delay + jitter
-            
-            logger.info(f"Retrying after timeout in {total_delay:.2f} seconds...")
-            await asyncio.sleep(total_delay)
-            continue
-            
-        except httpx.RequestError as e:
-            logger.error(f"Gemini API request error on attempt {attempt + 1}: {str(e)}")
-            
-            # Don't retry on last attempt
-            if attempt == max_retries - 1:
-                raise GeminiServiceError(500, f"Request error after retries: {str(e)}")
-            
-            # Retry with exponential backoff
-            delay = base_delay * (2 ** attempt)
-            jitter = random.uniform(0, 0.25)
-            total_delay = delay + jitter
-            
-            logger.info(f"Retrying after request error in {total_delay:.2f} seconds...")
-            await asyncio.sleep(total_delay)
-            continue
+        
+        delay = _backoff_delay(attempt, retry_after)
+        logger.info(f"Retrying in {delay:.2f} seconds...")
+        await asyncio.sleep(delay)
     
     # This should never be reached due to the logic above
     raise GeminiServiceError(500, "Maximum retries exceeded")
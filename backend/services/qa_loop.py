@@ -3,21 +3,50 @@ Q&A Loop Service for Promptly
 Handles iterative question-answer dialogue logic
 """
 
-import json
+import asyncio
 import logging
+from bisect import bisect_right
+from collections import OrderedDict
 from datetime import datetime, timezone
-from typing import Dict, Any, List, Optional, Tuple
+from functools import lru_cache
+from itertools import accumulate
+from typing import Dict, Any, List, NoReturn, Optional, Tuple
 
+import orjson
 from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorDatabase, AsyncIOMotorClientSession
+from pymongo import InsertOne
 
 from backend.models.session import Session
 from backend.models.node import Node
+from backend.models.types import validate_object_id
 from backend.services.ai_internal import ask_gemini, GeminiServiceError
 
 logger = logging.getLogger(__name__)
 
 
+# Fields build_context_chain needs from the target node and each ancestor
+CONTEXT_CHAIN_PROJECTION = {
+    "role": 1, "content": 1, "type": 1, "created_at": 1,
+    "ancestors.role": 1, "ancestors.content": 1, "ancestors.type": 1,
+    "ancestors.created_at": 1, "ancestors.depth": 1
+}
+
+
+# Built context chains keyed by (session_id, leaf node_id). Nodes are never
+# updated or deleted individually, so a leaf's ancestry is fixed once written
+CONTEXT_CHAIN_CACHE_SIZE = 1024
+_context_chain_cache: "OrderedDict[Tuple[ObjectId, ObjectId], Tuple[Dict[str, Any], ...]]" = OrderedDict()
+
+# Upper bound of Session.max_questions; caps counts made before the session is loaded
+MAX_QUESTIONS_CAP = 20
+
+
+# Parsed AI responses are memoized for texts up to this many characters
+PARSE_CACHE_SIZE = 1024
+PARSE_CACHE_MAX_TEXT = 4096
+
+
 class QALoopError(Exception):
     """Custom exception for Q&A loop errors"""
     pass
@@ -42,18 +71,82 @@ async def get_session_with_validation(
     Raises:
         QALoopError: If session not found or access denied
     """
+    session_doc = await get_session_doc_with_validation(db, session_id, user_id)
+    return Session(**session_doc)
+
+
+async def get_session_doc_with_validation(
+    db: AsyncIOMotorDatabase,
+    session_id: ObjectId,
+    user_id: ObjectId,
+    projection: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Get the raw session document and validate ownership without building a model
+    
+    Args:
+        db: Database instance
+        session_id: Session ObjectId
+        user_id: User ObjectId
+        projection: Optional projection
+        
+    Returns:
+        Session document
+        
+    Raises:
+        QALoopError: If session not found or access denied
+    """
+    # Ownership is part of the filter, so other users' sessions never leave MongoDB
     collection = db["sessions"]
-    session_doc = await collection.find_one({"_id": session_id})
+    session_doc = await collection.find_one({"_id": session_id, "user_id": user_id}, projection)
     
-    if not session_doc:
+    if session_doc is None:
+        await _raise_session_lookup_error(db, session_id)
+    return session_doc
+
+
+async def _raise_session_lookup_error(db: AsyncIOMotorDatabase, session_id: ObjectId) -> NoReturn:
+    """Distinguish a missing session from another user's session after an owned lookup misses"""
+    if await db["sessions"].find_one({"_id": session_id}, {"_id": 1}) is None:
         raise QALoopError("Session not found")
+    raise QALoopError("Access denied: You can only access your own sessions")
+
+
+async def prepare_turn(
+    db: AsyncIOMotorDatabase,
+    session_id: ObjectId,
+    user_id: ObjectId,
+    cancel_requested: bool = False
+) -> Tuple[Session, bool, str]:
+    """
+    Load and validate a session and evaluate its stop conditions
     
-    session = Session(**session_doc)
+    The session lookup and the question count are independent, so both
+    round-trips are issued concurrently.
     
-    if str(session.user_id) != str(user_id):
-        raise QALoopError("Access denied: You can only access your own sessions")
+    Args:
+        db: Database instance
+        session_id: Session ObjectId
+        user_id: User ObjectId
+        cancel_requested: Whether user requested cancellation
+        
+    Returns:
+        Tuple of (session, should_stop, reason)
+        
+    Raises:
+        QALoopError: If session not found or access denied
+    """
+    session_doc, question_count = await asyncio.gather(
+        db["sessions"].find_one({"_id": session_id, "user_id": user_id}),
+        _count_questions(db, session_id, MAX_QUESTIONS_CAP)
+    )
     
-    return session
+    if session_doc is None:
+        await _raise_session_lookup_error(db, session_id)
+    session = Session(**session_doc)
+    should_stop, reason = _stop_reason(session, question_count, cancel_requested)
+    
+    return session, should_stop, reason
 
 
 async def validate_node_ownership(
@@ -72,21 +165,49 @@ async def validate_node_ownership(
     Returns:
         Node object
         
+    Raises:
+        QALoopError: If node not found or doesn't belong to session
+    """
+    node_doc = await get_node_doc_with_validation(db, node_id, session_id)
+    return Node(**node_doc)
+
+
+async def get_node_doc_with_validation(
+    db: AsyncIOMotorDatabase,
+    node_id: ObjectId,
+    session_id: ObjectId,
+    projection: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Get the raw node document and validate it belongs to the session
+    
+    Args:
+        db: Database instance
+        node_id: Node ObjectId
+        session_id: Session ObjectId
+        projection: Optional projection of the returned document
+        
+    Returns:
+        Node document
+        
     Raises:
         QALoopError: If node not found or doesn't belong to session
     """
     collection = db["nodes"]
-    node_doc = await collection.find_one({"_id": node_id})
+    # Session scoping happens in the filter; a miss is disambiguated only
+    # for the error message
+    node_doc = await collection.find_one({"_id": node_id, "session_id": session_id}, projection)
     
-    if not node_doc:
+    if node_doc is None:
+        await _raise_node_lookup_error(db, node_id)
+    return node_doc
+
+
+async def _raise_node_lookup_error(db: AsyncIOMotorDatabase, node_id: ObjectId) -> NoReturn:
+    """Distinguish a missing node from another session's node after a scoped lookup misses"""
+    if await db["nodes"].find_one({"_id": node_id}, {"_id": 1}) is None:
         raise QALoopError("Node not found")
-    
-    node = Node(**node_doc)
-    
-    if str(node.session_id) != str(session_id):
-        raise QALoopError("Node does not belong to this session")
-    
-    return node
+    raise QALoopError("Node does not belong to this session")
 
 
 async def check_stop_conditions(
@@ -111,13 +232,30 @@ async def check_stop_conditions(
     if session.status != "active":
         return True, f"session_{session.status}"
     
-    # Count AI questions in this session
-    collection = db["nodes"]
-    question_count = await collection.count_documents({
-        "session_id": session.id,
-        "role": "assistant",
-        "type": "question"
-    })
+    question_count = await _count_questions(db, session.id, session.max_questions)
+    
+    return _stop_reason(session, question_count, cancel_requested)
+
+
+async def _count_questions(db: AsyncIOMotorDatabase, session_id: ObjectId, limit: int) -> int:
+    """Count AI questions in a session; the scan stops once limit is hit"""
+    return await db["nodes"].count_documents(
+        {
+            "session_id": session_id,
+            "role": "assistant",
+            "type": "question"
+        },
+        limit=limit
+    )
+
+
+def _stop_reason(session: Session, question_count: int, cancel_requested: bool) -> Tuple[bool, str]:
+    """Evaluate stop conditions once the question count is known"""
+    if cancel_requested:
+        return True, "cancelled"
+    
+    if session.status != "active":
+        return True, f"session_{session.status}"
     
     if question_count >= session.max_questions:
         return True, "max_questions_reached"
@@ -142,53 +280,64 @@ async def build_context_chain(
         List of context entries ordered chronologically (root to leaf)
         representing the conversation path leading to the specified node
     """
-    collection = db["nodes"]
-    
-    # Get all nodes in the session
-    cursor = collection.find(
-        {"session_id": session_id}
-    ).sort("created_at", 1)
+    cache_key = (session_id, node_id)
+    cached = _context_chain_cache.get(cache_key)
+    if cached is not None:
+        _context_chain_cache.move_to_end(cache_key)
+        return list(cached)
     
-    nodes = await cursor.to_list(length=None)
+    collection = db["nodes"]
     
-    if not nodes:
+    # Walk parent edges server-side: only nodes on the path come back
+    cursor = collection.aggregate([
+        {"$match": {"_id": node_id, "session_id": session_id}},
+        {"$graphLookup": {
+            "from": "nodes",
+            "startWith": "$parent_id",
+            "connectFromField": "parent_id",
+            "connectToField": "_id",
+            "as": "ancestors",
+            "depthField": "depth",
+            "restrictSearchWithMatch": {"session_id": session_id}
+        }},
+        {"$project": CONTEXT_CHAIN_PROJECTION}
+    ])
+    docs = await cursor.to_list(length=1)
+    
+    if not docs:
         return []
     
-    # Build a map of nodes by ID for efficient lookup
-    # Ensure consistent ObjectId string conversion
-    node_map = {str(node["_id"]): node for node in nodes}
-    
-    # Find the path from root to target node
-    context_chain = []
-    current_node_id = str(node_id)
-    
-    # Build the chain by walking up the parent hierarchy
-    visited = set()
-    while current_node_id and current_node_id in node_map:
-        if current_node_id in visited:
-            # Prevent infinite loops
-            logger.warning(f"Circular reference detected in node chain: {current_node_id}")
-            break
-        
-        visited.add(current_node_id)
-        node = node_map[current_node_id]
-        
-        context_chain.append({
-            "role": node["role"],
-            "content": node["content"],
-            "type": node.get("type"),
-            "created_at": node["created_at"]
-        })
-        
-        # Move to parent
-        current_node_id = str(node["parent_id"]) if node.get("parent_id") else None
+    node = docs[0]
+    
+    # Deepest ancestor is the root; the target node itself comes last
+    path = sorted(node.get("ancestors", []), key=lambda a: a["depth"], reverse=True)
+    path.append(node)
     
-    # Reverse to get root-to-leaf order
-    context_chain.reverse()
+    context_chain = [
+        {
+            "role": entry["role"],
+            "content": entry["content"],
+            "type": entry.get("type"),
+            "created_at": entry["created_at"]
+        }
+        for entry in path
+    ]
+    
+    _context_chain_cache[cache_key] = tuple(context_chain)
+    if len(_context_chain_cache) > CONTEXT_CHAIN_CACHE_SIZE:
+        _context_chain_cache.popitem(last=False)
     
     return context_chain
 
 
+def _format_context_entry(entry: Dict[str, Any]) -> str:
+    """Format one context entry as `[role:type] content`"""
+    entry_type = entry.get("type", "")
+    if entry_type:
+        return f"[{entry['role']}:{entry_type}] {entry['content']}"
+    return f"[{entry['role']}] {entry['content']}"
+
+
 def truncate_context_for_tokens(
     context_chain: List[Dict[str, Any]], 
     starter_prompt: str = "", 
@@ -205,84 +354,56 @@ def truncate_context_for_tokens(
     Returns:
         Formatted context string with initial context section
     """
-    # Start with initial context section if provided
-    context_sections = []
+    header_text = "=== CONVERSATION HISTORY ===\n"
+    starter = starter_prompt.strip() if starter_prompt else ""
+    initial_section = f"=== INITIAL USER CONTEXT ===\n{starter}\n" if starter else ""
+    initial_len = len(initial_section)
     
-    if starter_prompt and starter_prompt.strip():
-        initial_section = f"=== INITIAL USER CONTEXT ===\n{starter_prompt.strip()}\n"
-        context_sections.append(initial_section)
+    # Format each entry once; sizes are computed from lengths, not joins
+    entries = [_format_context_entry(entry) for entry in context_chain]
+    lengths = list(map(len, entries))
     
-    # Add conversation history section if we have entries
-    if context_chain:
-        conversation_parts = []
-        for entry in context_chain:
-            role = entry["role"]
-            content = entry["content"]
-            entry_type = entry.get("type", "")
-            
-            if entry_type:
-                conversation_parts.append(f"[{role}:{entry_type}] {content}")
-            else:
-                conversation_parts.append(f"[{role}] {content}")
-        
-        if conversation_parts:
-            conversation_section = "=== CONVERSATION HISTORY ===\n" + "\n\n".join(conversation_parts)
-            context_sections.append(conversation_section)
-    
-    if not context_sections:
+    if not initial_section and not entries:
         return ""
     
-    full_context = "\n\n".join(context_sections)
+    # Length of "\n\n".join(sections) without building it
+    conversation_len = len(header_text) + sum(lengths) + 2 * (len(entries) - 1) if entries else 0
+    total_len = initial_len + conversation_len + (2 if initial_section and entries else 0)
     
-    # If within limits, return full context
-    if len(full_context) <= max_chars:
-        return full_context
+    # If within limits, join once and return full context
+    if total_len <= max_chars:
+        sections = [initial_section] if initial_section else []
+        if entries:
+            sections.append(header_text + "\n\n".join(entries))
+        return "\n\n".join(sections)
     
     # Need to truncate - prioritize initial context, then recent conversation
-    reserved_for_initial = min(len(context_sections[0]) if context_sections else 0, max_chars // 3)
+    first_section_len = initial_len if initial_section else conversation_len
+    reserved_for_initial = min(first_section_len, max_chars // 3)
     available_for_conversation = max_chars - reserved_for_initial - 50  # Reserve space for separators
     
     # Always include initial context if present
     truncated_sections = []
-    if starter_prompt and starter_prompt.strip():
-        if len(context_sections[0]) <= reserved_for_initial:
-            truncated_sections.append(context_sections[0])
+    if initial_section:
+        if initial_len <= reserved_for_initial:
+            truncated_sections.append(initial_section)
         else:
             # Truncate initial context if too long
-            truncated_initial = context_sections[0][:reserved_for_initial - 15] + "…[truncated]\n"
-            truncated_sections.append(truncated_initial)
-    
-    # Try to fit recent conversation entries
-    if context_chain and available_for_conversation > 100:
-        conversation_parts = []
-        current_length = 0
-        header_text = "=== CONVERSATION HISTORY ===\n"
-        
-        for entry in reversed(context_chain):
-            role = entry["role"]
-            content = entry["content"]
-            entry_type = entry.get("type", "")
-            
-            if entry_type:
-                entry_text = f"[{role}:{entry_type}] {content}"
-            else:
-                entry_text = f"[{role}] {content}"
-            
-            if current_length + len(entry_text) + 2 > available_for_conversation - len(header_text):
-                break
-            
-            conversation_parts.append(entry_text)
-            current_length += len(entry_text) + 2
+            truncated_sections.append("".join((initial_section[:reserved_for_initial - 15], "…[truncated]\n")))
+    
+    # Fit the longest run of most recent entries (each costs its length + 2)
+    if entries and available_for_conversation > 100:
+        budget = available_for_conversation - len(header_text)
+        suffix_costs = list(accumulate(length + 2 for length in reversed(lengths)))
+        fitting = bisect_right(suffix_costs, budget)
         
-        if conversation_parts:
-            conversation_parts.reverse()  # Back to chronological order
-            conversation_section = header_text + "\n\n".join(conversation_parts)
-            truncated_sections.append(conversation_section)
+        if fitting:
+            truncated_sections.append(header_text + "\n\n".join(entries[-fitting:]))
     
     return "\n\n".join(truncated_sections) if truncated_sections else "…[truncated]"
 
 
-async def parse_ai_response(raw_response: Dict[str, Any]) -> Tuple[Optional[str], Optional[List[str]], Optional[str], Optional[bool], Optional[str]]:
+def parse_ai_response(raw_response: Dict[str, Any]) -> Tuple[Optional[str], Optional[List[str]], Optional[str], Optional[bool], Optional[str]]:
     """
     Parse AI response to extract question, options, selection method, custom answer flag, or final prompt
     
@@ -307,60 +428,188 @@ async def parse_ai_response(raw_response: Dict[str, Any]) -> Tuple[Optional[str]
         if not text:
             return None, None, None, None, "Empty response"
         
-        # Try to parse as JSON first
-        try:
-            parsed = json.loads(text)
-            
-            # Check for question format
-            if "question" in parsed and "options" in parsed:
-                question = parsed["question"]
-                options = parsed["options"]
-                selection_method = parsed.get("selectionMethod", "single")
-                allow_custom = parsed.get("allowCustomAnswer", True)  # Default to True now
-                
-                if isinstance(question, str) and isinstance(options, list):
-                    # Validate options length (2-6 as requested)
-                    if len(options) < 2 or len(options) > 6:
-                        logger.warning(f"AI provided {len(options)} options, expected 2-6. Truncating/padding.")
-                        if len(options) > 6:
-                            options = options[:6]
-                        elif len(options) < 2:
-                            options.extend(["Other", "Not sure"][:2 - len(options)])
-                    
-                    # Validate selection method
-                    valid_methods = ["single", "multi", "ranking"]
-                    if selection_method not in valid_methods:
-                        logger.warning(f"AI provided invalid selection method '{selection_method}', defaulting to 'single'")
-                        selection_method = "single"
-                    
-                    return question, options, selection_method, allow_custom, None
-            
-            # Check for final prompt format
-            if "finalPrompt" in parsed:
-                final_prompt = parsed["finalPrompt"]
-                if isinstance(final_prompt, str):
-                    return None, None, None, None, final_prompt
-                    
-        except json.JSONDecodeError:
-            # Not JSON, treat as final prompt
-            pass
+        if len(text) <= PARSE_CACHE_MAX_TEXT:
+            question, options, selection_method, allow_custom, final_prompt = _parse_text(text)
+        else:
+            question, options, selection_method, allow_custom, final_prompt = _parse_text.__wrapped__(text)
         
-        # Default: treat as final prompt
-        return None, None, None, None, text
+        # Cached results are shared; hand each caller its own options list
+        if options is not None:
+            options = list(options)
+        
+        return question, options, selection_method, allow_custom, final_prompt
         
     except Exception as e:
         logger.error(f"Error parsing AI response: {e}")
         return None, None, None, None, f"Error parsing response: {str(e)}"
 
 
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_text(text: str) -> Tuple[Optional[str], Optional[List[str]], Optional[str], Optional[bool], Optional[str]]:
+    """
+    Parse the response text into question fields or a final prompt
+    
+    Args:
+        text: Stripped response text
+        
+    Returns:
+        Tuple of (question, options, selection_method, allow_custom_answer, final_prompt)
+    """
+    # Only a JSON object carrying one of the known keys can be structured output;
+    # plain-text final prompts skip the (failing) parse entirely
+    if not text.startswith("{") or ('"question"' not in text and '"finalPrompt"' not in text):
+        return None, None, None, None, text
+    
+    # Try to parse as JSON first
+    try:
+        parsed = orjson.loads(text)
+        
+        # Check for question format
+        if "question" in parsed and "options" in parsed:
+            question = parsed["question"]
+            options = parsed["options"]
+            selection_method = parsed.get("selectionMethod", "single")
+            allow_custom = parsed.get("allowCustomAnswer", True)  # Default to True now
+            
+            if isinstance(question, str) and isinstance(options, list):
+                # Validate options length (2-6 as requested)
+                if len(options) < 2 or len(options) > 6:
+                    logger.warning(f"AI provided {len(options)} options, expected 2-6. Truncating/padding.")
+                    if len(options) > 6:
+                        options = options[:6]
+                    elif len(options) < 2:
+                        options.extend(["Other", "Not sure"][:2 - len(options)])
+                
+                # Validate selection method
+                valid_methods = ["single", "multi", "ranking"]
+                if selection_method not in valid_methods:
+                    logger.warning(f"AI provided invalid selection method '{selection_method}', defaulting to 'single'")
+                    selection_method = "single"
+                
+                return question, options, selection_method, allow_custom, None
+        
+        # Check for final prompt format
+        if "finalPrompt" in parsed:
+            final_prompt = parsed["finalPrompt"]
+            if isinstance(final_prompt, str):
+                return None, None, None, None, final_prompt
+                
+    except orjson.JSONDecodeError:
+        # Not JSON, treat as final prompt
+        pass
+    
+    # Default: treat as final prompt
+    return None, None, None, None, text
+
+
+def build_user_answer_node(
+    session_id: ObjectId,
+    parent_id: ObjectId,
+    answer: str,
+    answer_type: str = "answer",
+    now: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """
+    Build (but do not insert) a user answer node document
+    
+    Args:
+        session_id: Session ObjectId
+        parent_id: Parent node ObjectId
+        answer: User's answer text
+        answer_type: Type of answer ("answer" or "custom_answer")
+        now: Creation timestamp; defaults to the current UTC time
+        
+    Returns:
+        Node document with its _id already assigned
+    """
+    return {
+        "_id": ObjectId(),
+        "session_id": validate_object_id(session_id),
+        "parent_id": validate_object_id(parent_id),
+        "role": "user",
+        "content": answer,
+        "type": answer_type,
+        "extra": {},
+        "created_at": now or datetime.now(timezone.utc)
+    }
+
+
+def build_ai_node(
+    session_id: ObjectId,
+    parent_id: ObjectId,
+    content: str,
+    node_type: str,
+    raw_response: Dict[str, Any],
+    now: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """
+    Build (but do not insert) an AI response node document
+    
+    Args:
+        session_id: Session ObjectId
+        parent_id: Parent node ObjectId
+        content: AI response content
+        node_type: Node type ("question" or "final")
+        raw_response: Raw AI response for debugging
+        now: Creation timestamp; defaults to the current UTC time
+        
+    Returns:
+        Node document with its _id already assigned
+    """
+    return {
+        "_id": ObjectId(),
+        "session_id": validate_object_id(session_id),
+        "parent_id": validate_object_id(parent_id),
+        "role": "assistant",
+        "content": content,
+        "type": node_type,
+        "extra": {"raw": raw_response},
+        "created_at": now or datetime.now(timezone.utc)
+    }
+
+
+async def commit_turn(
+    db: AsyncIOMotorDatabase,
+    session: AsyncIOMotorClientSession,
+    session_id: ObjectId,
+    nodes: List[Dict[str, Any]],
+    status: Optional[str] = None
+) -> None:
+    """
+    Write a turn's nodes in one bulk_write, then the session status if given
+    
+    Operations on a client session must run one at a time, so the status
+    update follows the node batch rather than running alongside it. The
+    session's updated_at reuses the last node's created_at instead of
+    taking a fresh timestamp.
+    
+    Args:
+        db: Database instance
+        session: Database session for transactions
+        session_id: Session ObjectId
+        nodes: Node documents to insert, parents before children
+        status: New session status, if it changes this turn
+    """
+    await db["nodes"].bulk_write(
+        [InsertOne(node) for node in nodes],
+        ordered=True,
+        session=session
+    )
+    
+    if status is not None:
+        now = nodes[-1]["created_at"] if nodes else None
+        await update_session_status(db, session, session_id, status, now)
+
+
 async def insert_user_answer_node(
     db: AsyncIOMotorDatabase,
     session: AsyncIOMotorClientSession,
     session_id: ObjectId,
     parent_id: ObjectId,
     answer: str,
-    answer_type: str = "answer"
-) -> Node:
+    answer_type: str = "answer",
+    now: Optional[datetime] = None
+) -> Dict[str, Any]:
     """
     Insert user answer node
     
@@ -371,27 +620,17 @@ async def insert_user_answer_node(
         parent_id: Parent node ObjectId
         answer: User's answer text
         answer_type: Type of answer ("answer" or "custom_answer")
+        now: Creation timestamp; defaults to the current UTC time
         
     Returns:
-        Created Node object
-    """
-    node = Node(
-        session_id=session_id,
-        parent_id=parent_id,
-        role="user",
-        content=answer,
-        type=answer_type,
-        created_at=datetime.now(timezone.utc)
-    )
+        Inserted node document
+    """
+    doc = build_user_answer_node(session_id, parent_id, answer, answer_type, now)
     
     collection = db["nodes"]
-    result = await collection.insert_one(
-        node.model_dump(by_alias=True),
-        session=session
-    )
+    await collection.insert_one(doc, session=session)
     
-    node.id = result.inserted_id
-    return node
+    return doc
 
 
 async def insert_ai_node(
@@ -401,8 +640,9 @@ async def insert_ai_node(
     parent_id: ObjectId,
     content: str,
     node_type: str,
-    raw_response: Dict[str, Any]
-) -> Node:
+    raw_response: Dict[str, Any],
+    now: Optional[datetime] = None
+) -> Dict[str, Any]:
     """
     Insert AI response node
     
@@ -414,35 +654,25 @@ async def insert_ai_node(
         content: AI response content
         node_type: Node type ("question" or "final")
         raw_response: Raw AI response for debugging
+        now: Creation timestamp; defaults to the current UTC time
         
     Returns:
-        Created Node object
-    """
-    node = Node(
-        session_id=session_id,
-        parent_id=parent_id,
-        role="assistant",
-        content=content,
-        type=node_type,
-        extra={"raw": raw_response},
-        created_at=datetime.now(timezone.utc)
-    )
+        Inserted node document
+    """
+    doc = build_ai_node(session_id, parent_id, content, node_type, raw_response, now)
     
     collection = db["nodes"]
-    result = await collection.insert_one(
-        node.model_dump(by_alias=True),
-        session=session
-    )
+    await collection.insert_one(doc, session=session)
     
-    node.id = result.inserted_id
-    return node
+    return doc
 
 
 async def update_session_status(
     db: AsyncIOMotorDatabase,
     session: AsyncIOMotorClientSession,
     session_id: ObjectId,
-    status: str
+    status: str,
+    now: Optional[datetime] = None
 ) -> None:
     """
     Update session status
@@ -452,6 +682,7 @@ async def update_session_status(
         session: Database session for transactions
         session_id: Session ObjectId
         status: New status
+        now: updated_at timestamp; defaults to the current UTC time
     """
     collection = db["sessions"]
     await collection.update_one(
@@ -459,7 +690,7 @@ async def update_session_status(
         {
             "$set": {
                 "status": status,
-                "updated_at": datetime.now(timezone.utc)
+                "updated_at": now or datetime.now(timezone.utc)
             }
         },
         session=session
@@ -4,16 +4,132 @@ Handles file uploads and object storage operations
 """
 
 import os
+import re
+import hmac
+import time
+import hashlib
+import random
 import logging
-from datetime import timedelta
-from typing import Optional, BinaryIO
+import threading
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Optional, BinaryIO, Iterable, List, Tuple
 from functools import lru_cache
 
 from minio import Minio
+from minio.credentials import StaticProvider
+from minio.datatypes import Part
+from minio.deleteobjects import DeleteObject
 from minio.error import S3Error
+from urllib.parse import quote, urlunsplit
 from urllib3.exceptions import MaxRetryError
 
 logger = logging.getLogger(__name__)
+# Per-request success logs use %-style arguments so nothing is formatted
+# when INFO is disabled
+
+# libmagic content sniffing is optional (python-magic needs the system
+# library); without it a built-in check of executable signatures is used
+try:
+    import magic
+    _magic = magic.Magic(mime=True)
+except Exception:
+    _magic = None
+
+# Presigned URLs are reused until this many seconds before they expire
+PRESIGNED_URL_CACHE_SIZE = 10_000
+PRESIGNED_URL_REFRESH_MARGIN = 600
+
+# make_bucket errors meaning the bucket is already there
+BUCKET_EXISTS_CODES = frozenset({"BucketAlreadyOwnedByYou", "BucketAlreadyExists"})
+
+# Uploads larger than the threshold are sent as concurrent multipart parts.
+# S3 requires parts of at least 5 MiB (except the last)
+MULTIPART_THRESHOLD = int(os.getenv("MINIO_MULTIPART_THRESHOLD", str(16 * 1024 * 1024)))
+MULTIPART_PART_SIZE = max(int(os.getenv("MINIO_MULTIPART_PART_SIZE", str(8 * 1024 * 1024))), 5 * 1024 * 1024)
+MULTIPART_CONCURRENCY = int(os.getenv("MINIO_MULTIPART_CONCURRENCY", "10"))
+
+# Upload retries: only throttling/server-side S3 errors are retried, with
+# exponential backoff plus jitter (or the server's Retry-After)
+UPLOAD_MAX_RETRIES = 3
+UPLOAD_MAX_BACKOFF = 30.0
+RETRYABLE_S3_CODES = frozenset({"SlowDown", "InternalError", "ServiceUnavailable", "RequestTimeout"})
+
+# Filename sanitization patterns
+_UNSAFE_FILENAME_CHARS = re.compile(r'[^\w\-_\.]')
+# ASCII names (the common case) skip the regex with a C-level bytes.translate:
+# every ASCII byte outside [A-Za-z0-9_.-] maps to '_'
+_UNSAFE_ASCII_TABLE = bytes(
+    c if chr(c).isalnum() or chr(c) in '_-.' else ord('_')
+    for c in range(128)
+) + bytes(range(128, 256))
+_REPEATED_SEPARATORS = re.compile(r'[_\.]{2,}')
+
+# Dangerous MIME types to reject
+DANGEROUS_MIME_TYPES = frozenset({
+    'application/x-msdownload',
+    'application/x-executable',
+    'application/x-sharedlib',
+    'application/x-msdos-program',
+    'application/vnd.microsoft.portable-executable',
+    'text/x-script.python',
+    'application/x-python-code',
+    'text/x-shellscript',
+    'application/javascript',
+    'text/javascript',
+    'application/x-dosexec',
+    'application/x-mach-binary',
+    'application/x-pie-executable',
+    'text/x-python',
+    'text/x-script.perl',
+    'text/x-php'
+})
+
+# Dangerous extensions
+DANGEROUS_EXTENSIONS = frozenset({
+    '.exe', '.bat', '.cmd', '.com', '.pif', '.scr', '.vbs', '.js', '.jar',
+    '.sh', '.py', '.pl', '.php', '.asp', '.aspx', '.jsp'
+})
+
+# Types inferred for uploads that arrive without one. Only formats browsers
+# won't execute when served inline from a presigned URL; anything else
+# (html, svg, xml, unknown extensions) is stored as a generic download.
+DEFAULT_CONTENT_TYPE = "application/octet-stream"
+_COMMON_CONTENT_TYPES = {
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+    "gif": "image/gif",
+    "webp": "image/webp",
+    "pdf": "application/pdf",
+    "txt": "text/plain",
+    "md": "text/markdown",
+    "csv": "text/csv",
+    "doc": "application/msword",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "xls": "application/vnd.ms-excel",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "ppt": "application/vnd.ms-powerpoint",
+    "pptx": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+}
+
+# Leading bytes of executable formats, for sniffing without libmagic
+SNIFF_BYTES = 512
+_EXECUTABLE_SIGNATURES = (
+    (b"MZ", 'application/x-dosexec'),
+    (b"\x7fELF", 'application/x-executable'),
+    (b"\xfe\xed\xfa\xce", 'application/x-mach-binary'),
+    (b"\xfe\xed\xfa\xcf", 'application/x-mach-binary'),
+    (b"\xce\xfa\xed\xfe", 'application/x-mach-binary'),
+    (b"\xcf\xfa\xed\xfe", 'application/x-mach-binary'),
+    (b"#!", 'text/x-shellscript'),
+)
+
+# Downloads are fetched as concurrent HTTP Range requests of this size
+DOWNLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+DOWNLOAD_CONCURRENCY = 20
 
 
 class StorageError(Exception):
@@ -31,6 +147,10 @@ class MinIOClient:
         self._client: Optional[Minio] = None
         self._bucket_name: str = os.getenv("MINIO_BUCKET", "promptly-files")
         self._url_expiry_hours: int = int(os.getenv("MINIO_URL_EXPIRY_HOURS", "24"))
+        # object_key -> (url, monotonic deadline); accessed from threadpool workers
+        self._url_cache: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._url_cache_lock = threading.Lock()
+        self._url_cache_ttl: float = max(self._url_expiry_hours * 3600 - PRESIGNED_URL_REFRESH_MARGIN, 0)
     
     @property
     def client(self) -> Minio:
@@ -69,11 +189,29 @@ class MinIOClient:
     def _ensure_bucket_exists(self):
         """Ensure the bucket exists (create if missing)"""
         try:
-            if not self.client.bucket_exists(self._bucket_name):
-                self.client.make_bucket(self._bucket_name)
-                logger.info(f"✅ Created MinIO bucket: {self._bucket_name}")
-            else:
+            # Create optimistically: one round-trip whether or not it exists
+            self.client.make_bucket(self._bucket_name)
+            logger.info(f"✅ Created MinIO bucket: {self._bucket_name}")
+        except S3Error as e:
+            if e.code in BUCKET_EXISTS_CODES:
                 logger.info(f"✅ MinIO bucket exists: {self._bucket_name}")
+                return
+            if e.code == "AccessDenied":
+                # Credentials without CreateBucket can still use an existing bucket
+                self._check_bucket_exists()
+                return
+            logger.error(f"❌ Failed to ensure bucket exists: {e}")
+            raise StorageError(f"Failed to access storage bucket: {str(e)}", status_code=500)
+        except MaxRetryError as e:
+            logger.error(f"❌ MinIO connection failed: {e}")
+            raise StorageError("Storage service unavailable", status_code=503)
+    
+    def _check_bucket_exists(self):
+        """Verify the bucket exists without trying to create it"""
+        try:
+            if not self.client.bucket_exists(self._bucket_name):
+                raise StorageError(f"Storage bucket {self._bucket_name} does not exist", status_code=500)
+            logger.info(f"✅ MinIO bucket exists: {self._bucket_name}")
         except S3Error as e:
             logger.error(f"❌ Failed to ensure bucket exists: {e}")
             raise StorageError(f"Failed to access storage bucket: {str(e)}", status_code=500)
@@ -91,6 +229,9 @@ class MinIOClient:
         """
         Upload file to MinIO bucket
         
+        Files larger than MULTIPART_THRESHOLD are handed to
+        upload_file_parallel; smaller ones go out as a single PUT.
+        
         Args:
             object_key: S3 object key for the file
             data: File data stream
@@ -103,10 +244,13 @@ class MinIOClient:
         Raises:
             StorageError: If upload fails
         """
+        if size > MULTIPART_THRESHOLD:
+            return self.upload_file_parallel(object_key, data, size, content_type)
+        
         try:
-            # Upload with retry logic
-            max_retries = 3
-            for attempt in range(max_retries):
+            # Upload with retry logic; a failed attempt may have consumed the stream
+            start = data.tell()
+            for attempt in range(UPLOAD_MAX_RETRIES):
                 try:
                     self.client.put_object(
                         bucket_name=self._bucket_name,
@@ -115,12 +259,15 @@ class MinIOClient:
                         length=size,
                         content_type=content_type
                     )
-                    logger.info(f"✅ File uploaded: {object_key} ({size} bytes)")
+                    logger.info("✅ File uploaded: %s (%d bytes)", object_key, size)
                     return object_key
                 except S3Error as e:
-                    if attempt == max_retries - 1:
+                    if attempt == UPLOAD_MAX_RETRIES - 1 or not _is_retryable_s3_error(e):
                         raise e
-                    logger.warning(f"⚠️  Upload attempt {attempt + 1} failed, retrying: {e}")
+                    delay = _upload_retry_delay(attempt, e)
+                    logger.warning(f"⚠️  Upload attempt {attempt + 1} failed, retrying in {delay:.2f}s: {e}")
+                    time.sleep(delay)
+                    data.seek(start)
                     
         except S3Error as e:
             logger.error(f"❌ Failed to upload file {object_key}: {e}")
@@ -129,10 +276,138 @@ class MinIOClient:
             logger.error(f"❌ MinIO connection failed during upload: {e}")
             raise StorageError("Storage service unavailable", status_code=503)
     
+    def upload_file_parallel(
+        self,
+        object_key: str,
+        data: BinaryIO,
+        size: int,
+        content_type: str = "application/octet-stream"
+    ) -> str:
+        """
+        Upload file to MinIO bucket as concurrent multipart parts
+        
+        The file is split into MULTIPART_PART_SIZE parts read by offset
+        from the stream and uploaded from a thread pool; the upload is
+        aborted if any part fails.
+        
+        Args:
+            object_key: S3 object key for the file
+            data: Seekable file data stream
+            size: File size in bytes
+            content_type: MIME type of the file
+            
+        Returns:
+            Object key of uploaded file
+            
+        Raises:
+            StorageError: If upload fails
+        """
+        client = self.client
+        start = data.tell()
+        read_lock = threading.Lock()
+        
+        def upload_part(part_number: int) -> Part:
+            offset = start + (part_number - 1) * MULTIPART_PART_SIZE
+            length = min(MULTIPART_PART_SIZE, start + size - offset)
+            # The stream is shared between workers, so seek+read is serialized
+            with read_lock:
+                data.seek(offset)
+                chunk = data.read(length)
+            etag = client._upload_part(
+                self._bucket_name, object_key, chunk, None, upload_id, part_number
+            )
+            return Part(part_number, etag)
+        
+        part_count = -(-size // MULTIPART_PART_SIZE)
+        upload_id = None
+        try:
+            upload_id = client._create_multipart_upload(
+                self._bucket_name, object_key, {"Content-Type": content_type}
+            )
+            with ThreadPoolExecutor(max_workers=min(MULTIPART_CONCURRENCY, part_count)) as executor:
+                parts = list(executor.map(upload_part, range(1, part_count + 1)))
+            client._complete_multipart_upload(self._bucket_name, object_key, upload_id, parts)
+            logger.info("✅ File uploaded: %s (%d bytes, %d parts)", object_key, size, part_count)
+            return object_key
+        except BaseException as e:
+            # Abort on any failure (including interrupts and cancellation) so
+            # uploaded parts don't linger as an incomplete multipart upload
+            if upload_id is not None:
+                try:
+                    client._abort_multipart_upload(self._bucket_name, object_key, upload_id)
+                except Exception as abort_error:
+                    logger.warning(f"⚠️  Failed to abort multipart upload {upload_id}: {abort_error}")
+            if not isinstance(e, Exception):
+                raise
+            logger.error(f"❌ Failed multipart upload of {object_key}: {e}")
+            if isinstance(e, MaxRetryError):
+                raise StorageError("Storage service unavailable", status_code=503)
+            raise StorageError(f"Failed to upload file: {str(e)}", status_code=500)
+    
+    def download_object_parallel(
+        self,
+        object_key: str,
+        chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+        max_concurrency: int = DOWNLOAD_CONCURRENCY
+    ) -> bytearray:
+        """
+        Download an object with concurrent ranged GETs
+        
+        Each worker fetches one byte range and writes it straight into a
+        preallocated buffer at its offset, so no chunks are joined.
+        
+        Args:
+            object_key: S3 object key
+            chunk_size: Bytes per ranged request
+            max_concurrency: Maximum requests in flight
+            
+        Returns:
+            Object contents
+            
+        Raises:
+            StorageError: If the download fails
+        """
+        client = self.client
+        try:
+            size = client.stat_object(self._bucket_name, object_key).size
+            buffer = bytearray(size)
+            view = memoryview(buffer)
+            
+            def download_range(offset: int) -> None:
+                length = min(chunk_size, size - offset)
+                response = client.get_object(
+                    self._bucket_name, object_key, offset=offset, length=length
+                )
+                try:
+                    view[offset:offset + length] = response.read()
+                finally:
+                    response.close()
+                    response.release_conn()
+            
+            offsets = range(0, size, chunk_size)
+            if len(offsets) > 1:
+                with ThreadPoolExecutor(max_workers=min(max_concurrency, len(offsets))) as executor:
+                    list(executor.map(download_range, offsets))
+            elif offsets:
+                download_range(0)
+            
+            logger.info("✅ File downloaded: %s (%d bytes, %d ranges)", object_key, size, len(offsets))
+            return buffer
+        except S3Error as e:
+            logger.error(f"❌ Failed to download file {object_key}: {e}")
+            status_code = 404 if e.code in ("NoSuchKey", "NoSuchObject") else 500
+            raise StorageError(f"Failed to download file: {str(e)}", status_code=status_code)
+        except MaxRetryError as e:
+            logger.error(f"❌ MinIO connection failed during download: {e}")
+            raise StorageError("Storage service unavailable", status_code=503)
+    
     def get_presigned_url(self, object_key: str) -> str:
         """
         Generate presigned GET URL for file access
         
+        URLs are cached per object key and reused until shortly before
+        they expire, so repeated lookups skip request signing.
+        
         Args:
             object_key: S3 object key
             
@@ -142,18 +417,90 @@ class MinIOClient:
         Raises:
             StorageError: If URL generation fails
         """
+        now = time.monotonic()
+        with self._url_cache_lock:
+            cached = self._url_cache.get(object_key)
+            if cached is not None and cached[1] > now:
+                self._url_cache.move_to_end(object_key)
+                return cached[0]
+        
         try:
-            url = self.client.presigned_get_object(
-                bucket_name=self._bucket_name,
-                object_name=object_key,
-                expires=timedelta(hours=self._url_expiry_hours)
-            )
-            logger.info(f"✅ Generated presigned URL for {object_key} (expires in {self._url_expiry_hours}h)")
+            url = self.get_presigned_url_fast(object_key)
+            logger.info("✅ Generated presigned URL for %s (expires in %dh)", object_key, self._url_expiry_hours)
+            
+            if self._url_cache_ttl > 0:
+                with self._url_cache_lock:
+                    self._url_cache[object_key] = (url, now + self._url_cache_ttl)
+                    self._url_cache.move_to_end(object_key)
+                    if len(self._url_cache) > PRESIGNED_URL_CACHE_SIZE:
+                        self._url_cache.popitem(last=False)
             return url
         except S3Error as e:
             logger.error(f"❌ Failed to generate presigned URL for {object_key}: {e}")
             raise StorageError(f"Failed to generate file access URL: {str(e)}", status_code=500)
     
+    def get_presigned_url_fast(self, object_key: str, request_date: Optional[datetime] = None) -> str:
+        """
+        Presign a GET URL with a cached SigV4 signing key
+        
+        Produces the same URL as presigned_get_object, but the signing
+        key (four chained HMACs) is derived once per day and region
+        instead of per call, leaving one SHA-256 and one HMAC per URL.
+        Falls back to the SDK for credentials it does not handle
+        (temporary session tokens, non-static providers).
+        
+        Args:
+            object_key: S3 object key
+            request_date: Signing time; defaults to now
+            
+        Returns:
+            Presigned URL valid for configured hours
+        """
+        client = self.client
+        expires = self._url_expiry_hours * 3600
+        provider = client._provider
+        credentials = provider.retrieve() if isinstance(provider, StaticProvider) else None
+        if credentials is None or credentials.session_token or not 1 <= expires <= 604800:
+            return client.presigned_get_object(
+                bucket_name=self._bucket_name,
+                object_name=object_key,
+                expires=timedelta(seconds=expires),
+                request_date=request_date
+            )
+        
+        region = client._get_region(self._bucket_name)
+        url = client._base_url.build(
+            method="GET",
+            region=region,
+            bucket_name=self._bucket_name,
+            object_name=object_key,
+            query_params={}
+        )
+        
+        date = (request_date or datetime.now(timezone.utc)).astimezone(timezone.utc)
+        amz_date = date.strftime("%Y%m%dT%H%M%SZ")
+        signer_date = amz_date[:8]
+        scope = f"{signer_date}/{region}/s3/aws4_request"
+        
+        # Parameter names are already in canonical (sorted) order
+        query = (
+            "X-Amz-Algorithm=AWS4-HMAC-SHA256"
+            f"&X-Amz-Credential={quote(credentials.access_key + '/' + scope, safe='')}"
+            f"&X-Amz-Date={amz_date}"
+            f"&X-Amz-Expires={expires}"
+            "&X-Amz-SignedHeaders=host"
+        )
+        canonical_request = f"GET\n{url.path or '/'}\n{query}\nhost:{url.netloc}\n\nhost\nUNSIGNED-PAYLOAD"
+        string_to_sign = (
+            f"AWS4-HMAC-SHA256\n{amz_date}\n{scope}\n"
+            f"{hashlib.sha256(canonical_request.encode()).hexdigest()}"
+        )
+        # One-shot hmac.digest runs entirely in OpenSSL, with no HMAC object per call
+        signing_key = _sigv4_signing_key(credentials.secret_key, signer_date, region)
+        signature = hmac.digest(signing_key, string_to_sign.encode(), "sha256").hex()
+        
+        return urlunsplit(url._replace(query=f"{query}&X-Amz-Signature={signature}"))
+    
     def delete_file(self, object_key: str) -> None:
         """
         Delete file from MinIO bucket
@@ -166,16 +513,102 @@ class MinIOClient:
         """
         try:
             self.client.remove_object(self._bucket_name, object_key)
-            logger.info(f"✅ File deleted: {object_key}")
+            with self._url_cache_lock:
+                self._url_cache.pop(object_key, None)
+            logger.info("✅ File deleted: %s", object_key)
         except S3Error as e:
             logger.error(f"❌ Failed to delete file {object_key}: {e}")
             raise StorageError(f"Failed to delete file: {str(e)}", status_code=500)
+    
+    def delete_files(self, object_keys: Iterable[str]) -> None:
+        """
+        Delete many files from MinIO bucket with multi-object DELETE requests
+        
+        remove_objects sends the keys in batches of up to 1000 (the S3
+        DeleteObjects limit), so N keys cost ceil(N / 1000) round-trips
+        instead of N.
+        
+        Args:
+            object_keys: S3 object keys to delete
+            
+        Raises:
+            StorageError: If any deletion fails
+        """
+        keys: List[str] = list(dict.fromkeys(object_keys))
+        if not keys:
+            return
+        
+        try:
+            # Errors are yielded lazily; consuming them is what sends the requests
+            errors = list(self.client.remove_objects(
+                self._bucket_name,
+                (DeleteObject(key) for key in keys)
+            ))
+        except S3Error as e:
+            logger.error(f"❌ Failed to delete {len(keys)} files: {e}")
+            raise StorageError(f"Failed to delete files: {str(e)}", status_code=500)
+        finally:
+            with self._url_cache_lock:
+                for key in keys:
+                    self._url_cache.pop(key, None)
+        
+        if errors:
+            failed = ", ".join(error.name or "?" for error in errors[:10])
+            logger.error(f"❌ Failed to delete {len(errors)} of {len(keys)} files: {failed}")
+            raise StorageError(f"Failed to delete {len(errors)} files", status_code=500)
+        
+        logger.info("✅ Files deleted: %d", len(keys))
+
+
+@lru_cache(maxsize=16)
+def _sigv4_signing_key(secret_key: str, signer_date: str, region: str) -> bytes:
+    """Derive the SigV4 S3 signing key; changes only with the date and region"""
+    key = hmac.digest(("AWS4" + secret_key).encode(), signer_date.encode(), "sha256")
+    for part in (region, "s3", "aws4_request"):
+        key = hmac.digest(key, part.encode(), "sha256")
+    return key
+
+
+def _is_retryable_s3_error(error: S3Error) -> bool:
+    """Throttling and server-side failures are retryable; other 4xx errors are not"""
+    if error.code in RETRYABLE_S3_CODES:
+        return True
+    status = getattr(error.response, "status", None)
+    return isinstance(status, int) and status >= 500
+
+
+def _upload_retry_delay(attempt: int, error: S3Error) -> float:
+    """
+    Compute the delay before the next upload attempt
+    
+    Args:
+        attempt: Zero-based attempt number that just failed
+        error: Error returned by the failed attempt
+        
+    Returns:
+        Retry-After (capped) when the server sent one, otherwise
+        exponential backoff with up to 1s of jitter
+    """
+    headers = getattr(error.response, "headers", None) or {}
+    retry_after = headers.get("Retry-After")
+    if isinstance(retry_after, str):
+        try:
+            return min(max(0.0, float(retry_after)), UPLOAD_MAX_BACKOFF)
+        except ValueError:
+            pass
+    return min(2 ** attempt, UPLOAD_MAX_BACKOFF) + random.uniform(0, 1)
+
+
+# MinIOClient singleton; construction does no I/O (the SDK client is created lazily)
+_minio_client: Optional[MinIOClient] = None
 
 
-@lru_cache(maxsize=1)
 def get_minio_client() -> MinIOClient:
     """Get singleton MinIO client instance"""
-    return MinIOClient()
+    global _minio_client
+    if _minio_client is None:
+        _minio_client = MinIOClient()
+    return _minio_client
 
 
 def sanitize_filename(filename: str) -> str:
@@ -188,17 +621,17 @@ def sanitize_filename(filename: str) -> str:
     Returns:
         Sanitized filename safe for S3 storage
     """
-    import re
-    import unicodedata
-    
     # Normalize unicode characters
     filename = unicodedata.normalize('NFKD', filename)
     
     # Remove dangerous characters, keep alphanumeric, dots, hyphens, underscores
-    filename = re.sub(r'[^\w\-_\.]', '_', filename)
+    if filename.isascii():
+        filename = filename.encode('ascii').translate(_UNSAFE_ASCII_TABLE).decode('ascii')
+    else:
+        filename = _UNSAFE_FILENAME_CHARS.sub('_', filename)
     
     # Remove multiple consecutive underscores/dots
-    filename = re.sub(r'[_\.]{2,}', '_', filename)
+    filename = _REPEATED_SEPARATORS.sub('_', filename)
     
     # Ensure not empty and not too long
     if not filename or filename.startswith('.'):
@@ -212,42 +645,57 @@ def sanitize_filename(filename: str) -> str:
     return filename
 
 
-def validate_file_type(content_type: str, filename: str) -> bool:
+def validate_file_type(content_type: str, filename: str, head: Optional[bytes] = None) -> bool:
     """
     Validate file type against allowed MIME types
     
     Args:
         content_type: MIME type from upload
         filename: Original filename
+        head: Leading bytes of the file; when given, the sniffed type is
+            checked as well, so a mislabelled executable is still rejected
         
     Returns:
         True if file type is allowed
     """
-    # Dangerous MIME types to reject
-    dangerous_types = {
-        'application/x-msdownload',
-        'application/x-executable',
-        'application/x-sharedlib',
-        'application/x-msdos-program',
-        'application/vnd.microsoft.portable-executable',
-        'text/x-script.python',
-        'application/x-python-code',
-        'text/x-shellscript',
-        'application/javascript',
-        'text/javascript'
-    }
-    
-    # Dangerous extensions
-    dangerous_extensions = {
-        '.exe', '.bat', '.cmd', '.com', '.pif', '.scr', '.vbs', '.js', '.jar',
-        '.sh', '.py', '.pl', '.php', '.asp', '.aspx', '.jsp'
-    }
-    
-    if content_type.lower() in dangerous_types:
-        return False
-    
-    _, ext = os.path.splitext(filename.lower())
-    if ext in dangerous_extensions:
-        return False
-    
-    return True 
\ No newline at end of file
+    return (
+        content_type.lower() not in DANGEROUS_MIME_TYPES
+        and os.path.splitext(filename)[1].lower() not in DANGEROUS_EXTENSIONS
+        and (head is None or sniff_content_type(head) not in DANGEROUS_MIME_TYPES)
+    )
+
+
+def guess_content_type(filename: str) -> str:
+    """
+    Guess a file's MIME type from its extension, for allow-listed formats only
+    
+    Args:
+        filename: Original filename
+        
+    Returns:
+        MIME type, or application/octet-stream for anything not on the
+        allowlist (including browser-renderable types like html and svg)
+    """
+    _, dot, ext = filename.rpartition(".")
+    content_type = _COMMON_CONTENT_TYPES.get(ext.lower()) if dot else None
+    return content_type or DEFAULT_CONTENT_TYPE
+
+
+def sniff_content_type(head: bytes) -> Optional[str]:
+    """
+    Classify file content from its first SNIFF_BYTES bytes
+    
+    Args:
+        head: Leading bytes of the file
+        
+    Returns:
+        Sniffed MIME type (libmagic when installed), or None if the
+        built-in signature check does not recognise an executable
+    """
+    head = head[:SNIFF_BYTES]
+    if _magic is not None:
+        return _magic.from_buffer(head)
+    for signature, mime_type in _EXECUTABLE_SIGNATURES:
+        if head.startswith(signature):
+            return mime_type
+    return None 
\ No newline at end of file
@@ -12,14 +12,6 @@ from backend.main import app
 from backend.core.database import db_manager
 
 
-@pytest.fixture(scope="session")
-def event_loop():
-    """Create an instance of the default event loop for the test session."""
-    loop = asyncio.get_event_loop_policy().new_event_loop()
-    yield loop
-    loop.close()
-
-
 @pytest.fixture(scope="session")
 async def test_db():
     """Create a test database connection."""
@@ -37,9 +29,9 @@ async def test_db():
     client.close()
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 async def client():
-    """Create test client."""
+    """Create one test client shared by the whole session."""
     async with AsyncClient(app=app, base_url="http://test") as ac:
         yield ac
 
@@ -55,9 +47,41 @@ async def test_user_data():
     }
 
 
+# Separate account for tests that only need a valid token, so the
+# per-test reset of test_user_data doesn't invalidate it
+TOKEN_USER_DATA = {
+    "email": "token-user@example.com",
+    "password": "testpassword123",
+    "first_name": "Token",
+    "last_name": "User"
+}
+
+
+@pytest.fixture(scope="session")
+async def auth_token(client: AsyncClient) -> str:
+    """Register and log in once, returning a bearer token for the session."""
+    # A 400 here just means the account survived an earlier run
+    await client.post("/auth/register", json=TOKEN_USER_DATA)
+    
+    login_data = {
+        "username": TOKEN_USER_DATA["email"],
+        "password": TOKEN_USER_DATA["password"]
+    }
+    response = await client.post("/auth/jwt/login", data=login_data)
+    return response.json()["access_token"]
+
+
 class TestAuthentication:
     """Authentication test cases"""
     
+    @pytest.fixture(autouse=True)
+    async def reset_test_user(self, test_user_data: dict):
+        """Remove the test user before each test instead of rebuilding fixtures."""
+        from backend.core.database import get_database
+        
+        database = await get_database()
+        await database["users"].delete_many({"email": test_user_data["email"]})
+    
     async def test_health_check(self, client: AsyncClient):
         """Test health check endpoint."""
         response = await client.get("/ping")
@@ -116,25 +140,14 @@ class TestAuthentication:
         response = await client.get("/users/me")
         assert response.status_code == 401
     
-    async def test_protected_route_with_token(self, client: AsyncClient, test_user_data: dict):
+    async def test_protected_route_with_token(self, client: AsyncClient, auth_token: str):
         """Test accessing protected route with valid token."""
-        # Register and login
-        await client.post("/auth/register", json=test_user_data)
-        
-        login_data = {
-            "username": test_user_data["email"],
-            "password": test_user_data["password"]
-        }
-        login_response = await client.post("/auth/jwt/login", data=login_data)
-        token = login_response.json()["access_token"]
-        
-        # Access protected route
-        headers = {"Authorization": f"Bearer {token}"}
+        headers = {"Authorization": f"Bearer {auth_token}"}
         response = await client.get("/users/me", headers=headers)
         assert response.status_code == 200
         
         user_data = response.json()
-        assert user_data["email"] == test_user_data["email"]
+        assert user_data["email"] == TOKEN_USER_DATA["email"]
 
 
 @pytest.mark.asyncio
@@ -154,5 +167,58 @@ async def test_password_hashing():
     assert password_manager.verify_password("wrongpassword", hashed) is False
 
 
+
+@pytest.mark.asyncio
+async def test_password_hashing_async():
+    """Test that async hashing runs off the event loop and round-trips."""
+    from backend.models.user import password_manager
+    
+    password = "testpassword123"
+    hashed = await password_manager.hash_password_async(password)
+    
+    assert hashed != password
+    assert await password_manager.verify_password_async(password, hashed) is True
+    assert await password_manager.verify_password_async("wrongpassword", hashed) is False
+
+
+def test_user_email_validation():
+    """Test the lightweight email check on the User model."""
+    from pydantic import ValidationError
+    from backend.models.user import User
+    
+    user = User(_id="u1", email="Jane@Example.com", username="jane", hashed_password="x")
+    assert user.email == "jane@example.com"
+    
+    for bad in ("not-an-email", "a@b", "a b@example.com", "x" * 250 + "@example.com"):
+        with pytest.raises(ValidationError):
+            User(_id="u1", email=bad, username="jane", hashed_password="x")
+
+
+@pytest.mark.asyncio
+async def test_jwt_strategy_caches_verified_tokens():
+    """Test that a verified token skips re-decoding but still loads the user."""
+    from unittest.mock import AsyncMock, MagicMock, patch
+    from fastapi_users.jwt import decode_jwt
+    from backend.auth import get_jwt_strategy
+    from backend.auth.strategy import clear_token_cache
+    
+    clear_token_cache()
+    strategy = get_jwt_strategy()
+    user = MagicMock(id="user-1")
+    user_manager = MagicMock(parse_id=lambda value: value, get=AsyncMock(return_value=user))
+    token = await strategy.write_token(user)
+    
+    with patch("backend.auth.strategy.decode_jwt", wraps=decode_jwt) as decode:
+        assert await strategy.read_token(token, user_manager) is user
+        assert await get_jwt_strategy().read_token(token, user_manager) is user
+        assert await strategy.read_token("not-a-token", user_manager) is None
+        assert await strategy.read_token("not-a-token", user_manager) is None
+    
+    # One decode for the good token, and failures are never cached
+    assert decode.call_count == 3
+    assert user_manager.get.await_count == 2
+    clear_token_cache()
+
+
 if __name__ == "__main__":
     pytest.main([__file__]) 
\ No newline at end of file
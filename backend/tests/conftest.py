@@ -0,0 +1,42 @@
+"""
+Shared pytest configuration for backend tests
+"""
+
+import os
+import asyncio
+from typing import Optional
+
+import pytest
+
+# Cheap Argon2 parameters for tests - set before backend.models.user is
+# imported so the module-level PasswordManager picks them up. Production
+# defaults in .env / models/user.py are unchanged.
+os.environ.setdefault("ARGON2_TIME_COST", "1")
+os.environ.setdefault("ARGON2_MEMORY_COST", "1024")
+os.environ.setdefault("ARGON2_PARALLELISM", "1")
+
+
+# Created on first use and shared by every event_loop fixture definition
+# (tests/conftest.py re-exports this one), so pytest-asyncio never swaps in
+# a second loop and closes this one mid-session
+_session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _get_session_loop() -> asyncio.AbstractEventLoop:
+    """Return the shared session loop, uvloop when available like the server."""
+    global _session_loop
+    if _session_loop is None or _session_loop.is_closed():
+        try:
+            import uvloop
+            _session_loop = uvloop.new_event_loop()
+        except ImportError:
+            _session_loop = asyncio.get_event_loop_policy().new_event_loop()
+    return _session_loop
+
+
+@pytest.fixture(scope="session")
+def event_loop():
+    """One event loop for the whole test session, across every test root."""
+    loop = _get_session_loop()
+    yield loop
+    loop.close()
@@ -3,17 +3,17 @@ Unit tests for Gemini 2.5 AI Service Adapter
 
 Tests cover:
 - Request body validation and context injection
-- Prompt truncation logic
+- Prompt truncation logic (UTF-8 byte bound)
 - Retry logic with exponential backoff
 - Error handling and custom exceptions
 - HTTP client lifecycle management
 """
 
-import os
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 import httpx
+import orjson
 
 from backend.services.ai_internal import (
     ask_gemini,
@@ -26,20 +26,39 @@ from backend.services.ai_internal import (
 )
 
 
+def _with_api_key(api_key="test-api-key"):
+    """Patch the import-time Gemini configuration with a test key."""
+    return patch.multiple(
+        "backend.services.ai_internal",
+        _API_KEY=api_key,
+        _HEADERS={"Content-Type": "application/json", "x-goog-api-key": api_key or ""},
+    )
+
+
 def test_truncate_prompt_under_limit():
     """Test that short prompts are not truncated."""
     prompt = "Hello world!"
-    result = _truncate_prompt(prompt, max_length=2000)
+    result = _truncate_prompt(prompt, max_bytes=2000)
     assert result == prompt
 
 
 def test_truncate_prompt_over_limit():
     """Test that long prompts are truncated with marker."""
-    prompt = "x" * 2500  # 2500 characters
-    result = _truncate_prompt(prompt, max_length=2000)
+    prompt = "x" * 2500  # 2500 bytes
+    result = _truncate_prompt(prompt, max_bytes=2000)
+    
+    assert len(result.encode("utf-8")) == 2000
+    assert result.endswith("…[truncated]")
+
+
+def test_truncate_prompt_counts_bytes():
+    """Test that multi-byte prompts are bounded by UTF-8 size on a codepoint boundary."""
+    prompt = "😀" * 1000  # 1000 characters, 4000 bytes
+    result = _truncate_prompt(prompt, max_bytes=2000)
     
-    assert len(result) == 2000
+    assert len(result.encode("utf-8")) <= 2000
     assert result.endswith("…[truncated]")
+    assert set(result[:-len("…[truncated]")]) == {"😀"}
 
 
 async def test_invalid_payload_type():
@@ -54,7 +73,7 @@ async def test_missing_prompt_field():
         await ask_gemini({"message": "Hello"})
 
 
-@patch.dict(os.environ, {}, clear=True)
+@_with_api_key(None)
 async def test_missing_api_key():
     """Test that missing API key raises GeminiServiceError."""
     with pytest.raises(GeminiServiceError) as exc_info:
@@ -64,8 +83,16 @@ async def test_missing_api_key():
     assert "GEMINI_API_KEY environment variable not set" in exc_info.value.detail
 
 
-@patch.dict(os.environ, {"GEMINI_API_KEY": "test-api-key"})
-async def test_successful_request(monkeypatch):
+@pytest.fixture
+def mock_http(monkeypatch):
+    """Install a mock in place of the shared HTTP client."""
+    mock_client = AsyncMock()
+    monkeypatch.setattr("backend.services.ai_internal._get_http_client", lambda: mock_client)
+    return mock_client
+
+
+@_with_api_key()
+async def test_successful_request(mock_http):
     """Test successful API request with proper payload structure."""
     # Mock response
     mock_response = {
@@ -78,18 +105,10 @@ async def test_successful_request(monkeypatch):
         ]
     }
 
-    # Mock httpx client
-    mock_client = AsyncMock()
     mock_post_response = MagicMock()
     mock_post_response.status_code = 200
-    mock_post_response.json.return_value = mock_response
-    mock_client.post.return_value = mock_post_response
-
-    # Patch the _get_http_client function
-    async def mock_get_client():
-        return mock_client
-
-    monkeypatch.setattr("backend.services.ai_internal._get_http_client", mock_get_client)
+    mock_post_response.content = orjson.dumps(mock_response)
+    mock_http.post.return_value = mock_post_response
 
     # Make the request
     result = await ask_gemini({"prompt": "Hello"})
@@ -98,8 +117,8 @@ async def test_successful_request(monkeypatch):
     assert result == mock_response
 
     # Verify the request was made correctly
-    mock_client.post.assert_called_once()
-    call_args = mock_client.post.call_args
+    mock_http.post.assert_called_once()
+    call_args = mock_http.post.call_args
 
     # Check URL
     expected_url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash-exp:generateContent"
@@ -111,7 +130,7 @@ async def test_successful_request(monkeypatch):
     assert headers["x-goog-api-key"] == "test-api-key"
 
     # Check request body structure
-    request_body = call_args[1]["json"]
+    request_body = orjson.loads(call_args[1]["content"])
     assert "contents" in request_body
     assert len(request_body["contents"]) == 2
     
@@ -120,25 +139,30 @@ async def test_successful_request(monkeypatch):
     assert request_body["contents"][1]["parts"][0]["text"] == "Hello"
 
 
-@patch.dict(os.environ, {"GEMINI_API_KEY": "test-api-key"})
-async def test_retry_on_server_error(monkeypatch):
+@_with_api_key()
+async def test_request_body_cached_for_repeated_prompt(mock_http):
+    """Test that repeated prompts reuse the serialized request body."""
+    mock_http.post.return_value = MagicMock(status_code=200, content=b'{"candidates": []}')
+
+    await ask_gemini({"prompt": "Repeat me"})
+    await ask_gemini({"prompt": "Repeat me"})
+    await ask_gemini({"prompt": "Repeat me", "temperature": 0.2})
+
+    bodies = [call[1]["content"] for call in mock_http.post.call_args_list]
+    assert bodies[0] is bodies[1]
+    assert orjson.loads(bodies[2])["generationConfig"]["temperature"] == 0.2
+
+
+@_with_api_key()
+async def test_retry_on_server_error(mock_http, monkeypatch):
     """Test that 5xx errors trigger retry with exponential backoff."""
-    # Mock httpx client
-    mock_client = AsyncMock()
-    
     # First two calls return 500, third succeeds
     responses = [
-        MagicMock(status_code=500, text="Internal Server Error"),
-        MagicMock(status_code=500, text="Internal Server Error"),
-        MagicMock(status_code=200, json=lambda: {"candidates": []})
+        MagicMock(status_code=500, content=b"Internal Server Error"),
+        MagicMock(status_code=500, content=b"Internal Server Error"),
+        MagicMock(status_code=200, content=b'{"candidates": []}')
     ]
-    mock_client.post.side_effect = responses
-
-    # Patch the _get_http_client function
-    async def mock_get_client():
-        return mock_client
-
-    monkeypatch.setattr("backend.services.ai_internal._get_http_client", mock_get_client)
+    mock_http.post.side_effect = responses
 
     # Mock asyncio.sleep to avoid actual delays in tests
     sleep_calls = []
@@ -154,27 +178,19 @@ async def test_retry_on_server_error(monkeypatch):
     assert result == {"candidates": []}
 
     # Verify three attempts were made
-    assert mock_client.post.call_count == 3
+    assert mock_http.post.call_count == 3
 
     # Verify sleep was called twice (between retries)
     assert len(sleep_calls) == 2
 
 
-@patch.dict(os.environ, {"GEMINI_API_KEY": "test-api-key"})
-async def test_no_retry_on_client_error(monkeypatch):
+@_with_api_key()
+async def test_no_retry_on_client_error(mock_http):
     """Test that 4xx errors don't trigger retry."""
-    # Mock httpx client
-    mock_client = AsyncMock()
     mock_post_response = MagicMock()
     mock_post_response.status_code = 400
-    mock_post_response.text = "Bad Request"
-    mock_client.post.return_value = mock_post_response
-
-    # Patch the _get_http_client function
-    async def mock_get_client():
-        return mock_client
-
-    monkeypatch.setattr("backend.services.ai_internal._get_http_client", mock_get_client)
+    mock_post_response.content = b"Bad Request"
+    mock_http.post.return_value = mock_post_response
 
     # Make the request and expect immediate failure
     with pytest.raises(GeminiServiceError) as exc_info:
@@ -185,7 +201,7 @@ async def test_no_retry_on_client_error(monkeypatch):
     assert "Bad Request" in exc_info.value.detail
 
     # Verify only one attempt was made
-    assert mock_client.post.call_count == 1
+    assert mock_http.post.call_count == 1
 
 
 class TestPromptUtilities:
@@ -194,7 +210,7 @@ class TestPromptUtilities:
     def test_truncate_prompt_exact_limit(self):
         """Test that prompts exactly at the limit are not truncated."""
         prompt = "x" * 2000
-        result = _truncate_prompt(prompt, max_length=2000)
+        result = _truncate_prompt(prompt, max_bytes=2000)
         assert result == prompt
 
     def test_log_request_safely_under_limit(self):
@@ -221,8 +237,8 @@ class TestHttpClientManagement:
         # Clean up any existing client
         await _close_http_client()
         
-        client1 = await _get_http_client()
-        client2 = await _get_http_client()
+        client1 = _get_http_client()
+        client2 = _get_http_client()
         
         assert client1 is client2
         assert isinstance(client1, httpx.AsyncClient)
@@ -232,13 +248,13 @@ class TestHttpClientManagement:
 
     async def test_close_http_client(self):
         """Test that HTTP client is properly closed."""
-        client = await _get_http_client()
+        client = _get_http_client()
         assert client is not None
         
         await _close_http_client()
         
         # Should create a new client after closing
-        client2 = await _get_http_client()
+        client2 = _get_http_client()
         assert client2 is not client
         
         # Cleanup
@@ -248,21 +264,13 @@ class TestHttpClientManagement:
 class TestAskGeminiRetryLogic:
     """Test retry logic and error handling."""
 
-    @patch.dict(os.environ, {"GEMINI_API_KEY": "test-api-key"})
-    async def test_retry_exhaustion(self, monkeypatch):
+    @_with_api_key()
+    async def test_retry_exhaustion(self, mock_http, monkeypatch):
         """Test that repeated failures eventually raise GeminiServiceError."""
-        # Mock httpx client
-        mock_client = AsyncMock()
         mock_post_response = MagicMock()
         mock_post_response.status_code = 500
-        mock_post_response.text = "Internal Server Error"
-        mock_client.post.return_value = mock_post_response
-
-        # Patch the _get_http_client function
-        async def mock_get_client():
-            return mock_client
-
-        monkeypatch.setattr("backend.services.ai_internal._get_http_client", mock_get_client)
+        mock_post_response.content = b"Internal Server Error"
+        mock_http.post.return_value = mock_post_response
 
         # Mock asyncio.sleep to avoid delays
         monkeypatch.setattr("backend.services.ai_internal.asyncio.sleep", AsyncMock())
@@ -276,27 +284,18 @@ class TestAskGeminiRetryLogic:
         assert "Internal Server Error" in exc_info.value.detail
 
         # Verify three attempts were made (max retries)
-        assert mock_client.post.call_count == 3
+        assert mock_http.post.call_count == 3
 
-    @patch.dict(os.environ, {"GEMINI_API_KEY": "test-api-key"})
-    async def test_retry_on_timeout(self, monkeypatch):
+    @_with_api_key()
+    async def test_retry_on_timeout(self, mock_http, monkeypatch):
         """Test that timeouts trigger retry logic."""
-        # Mock httpx client
-        mock_client = AsyncMock()
-        
         # First two calls timeout, third succeeds
         responses = [
             httpx.ReadTimeout("Request timed out"),
             httpx.ReadTimeout("Request timed out"),
-            MagicMock(status_code=200, json=lambda: {"candidates": []})
+            MagicMock(status_code=200, content=b'{"candidates": []}')
         ]
-        mock_client.post.side_effect = responses
-
-        # Patch the _get_http_client function
-        async def mock_get_client():
-            return mock_client
-
-        monkeypatch.setattr("backend.services.ai_internal._get_http_client", mock_get_client)
+        mock_http.post.side_effect = responses
 
         # Mock asyncio.sleep to avoid actual delays
         monkeypatch.setattr("backend.services.ai_internal.asyncio.sleep", AsyncMock())
@@ -308,20 +307,12 @@ class TestAskGeminiRetryLogic:
         assert result == {"candidates": []}
 
         # Verify three attempts were made
-        assert mock_client.post.call_count == 3
+        assert mock_http.post.call_count == 3
 
-    @patch.dict(os.environ, {"GEMINI_API_KEY": "test-api-key"})
-    async def test_timeout_exhaustion(self, monkeypatch):
+    @_with_api_key()
+    async def test_timeout_exhaustion(self, mock_http, monkeypatch):
         """Test that repeated timeouts eventually raise GeminiServiceError."""
-        # Mock httpx client
-        mock_client = AsyncMock()
-        mock_client.post.side_effect = httpx.ReadTimeout("Request timed out")
-
-        # Patch the _get_http_client function
-        async def mock_get_client():
-            return mock_client
-
-        monkeypatch.setattr("backend.services.ai_internal._get_http_client", mock_get_client)
+        mock_http.post.side_effect = httpx.ReadTimeout("Request timed out")
 
         # Mock asyncio.sleep to avoid delays
         monkeypatch.setattr("backend.services.ai_internal.asyncio.sleep", AsyncMock())
@@ -335,7 +326,26 @@ class TestAskGeminiRetryLogic:
         assert "Request timeout after retries" in exc_info.value.detail
 
         # Verify three attempts were made
-        assert mock_client.post.call_count == 3
+        assert mock_http.post.call_count == 3
+
+    @_with_api_key()
+    async def test_retry_after_honored_on_rate_limit(self, mock_http, monkeypatch):
+        """Test that 429 responses are retried after the server's Retry-After delay."""
+        responses = [
+            MagicMock(status_code=429, content=b"Too Many Requests", headers={"retry-after": "3"}),
+            MagicMock(status_code=200, content=b'{"candidates": []}')
+        ]
+        mock_http.post.side_effect = responses
+
+        # Record sleep delays
+        mock_sleep = AsyncMock()
+        monkeypatch.setattr("backend.services.ai_internal.asyncio.sleep", mock_sleep)
+
+        result = await ask_gemini({"prompt": "Hello"})
+
+        assert result == {"candidates": []}
+        assert mock_http.post.call_count == 2
+        mock_sleep.assert_awaited_once_with(3.0)
 
 
 class TestCleanup:
@@ -344,7 +354,7 @@ class TestCleanup:
     async def test_cleanup_function(self):
         """Test that cleanup properly closes HTTP client and logs."""
         # Get a client first
-        await _get_http_client()
+        _get_http_client()
         
         # Mock the close function to verify it's called
         with patch("backend.services.ai_internal._close_http_client") as mock_close:
@@ -0,0 +1,72 @@
+"""
+Request Deduplication Tests
+Tests for collapsing concurrent identical requests into one handler call
+"""
+
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from backend.core.dedup import DedupMiddleware
+
+
+def make_app():
+    """Create a small app whose handler counts invocations."""
+    app = FastAPI()
+    app.state.calls = 0
+    app.add_middleware(DedupMiddleware, paths=["/slow"])
+
+    @app.get("/slow")
+    async def slow():
+        app.state.calls += 1
+        await asyncio.sleep(0.05)
+        return {"calls": app.state.calls}
+
+    @app.get("/other")
+    async def other():
+        app.state.calls += 1
+        await asyncio.sleep(0.05)
+        return {"calls": app.state.calls}
+
+    return app
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_response():
+    """Test that identical in-flight requests hit the handler once."""
+    app = make_app()
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        responses = await asyncio.gather(*[client.get("/slow") for _ in range(5)])
+
+    assert app.state.calls == 1
+    assert all(r.status_code == 200 for r in responses)
+    assert all(r.json() == {"calls": 1} for r in responses)
+
+
+@pytest.mark.asyncio
+async def test_sequential_requests_not_cached():
+    """Test that completed responses are not reused."""
+    app = make_app()
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        first = await client.get("/slow")
+        second = await client.get("/slow")
+
+    assert first.json() == {"calls": 1}
+    assert second.json() == {"calls": 2}
+
+
+@pytest.mark.asyncio
+async def test_excluded_requests_not_deduplicated():
+    """Test that other paths and authenticated requests always run."""
+    app = make_app()
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        await asyncio.gather(*[client.get("/other") for _ in range(3)])
+        assert app.state.calls == 3
+
+        await asyncio.gather(*[
+            client.get("/slow", headers={"Authorization": "Bearer token"})
+            for _ in range(3)
+        ])
+        assert app.state.calls == 6
@@ -5,91 +5,126 @@ Tests file upload, validation, and MinIO integration
 
 import os
 import pytest
+import tempfile
 import uuid
-from typing import AsyncGenerator, Dict, Any
+from types import MappingProxyType
+from typing import AsyncGenerator, Dict, Any, Mapping
 from unittest.mock import Mock, patch, AsyncMock
 from io import BytesIO
 
 from httpx import AsyncClient
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from bson import ObjectId
+from fastapi import HTTPException, Request
 
 from backend.main import app
 from backend.models import init_models
 from backend.models.user import User
 from backend.models.session import Session
+from backend.api import files as files_api
 from backend.services.storage import StorageError
 
 
 # Test database configuration
 TEST_MONGODB_URL = os.getenv("MONGODB_URL_TEST", "mongodb://localhost:27017")
 TEST_DATABASE_NAME = "test_promptly_files"
+# Run against a live MongoDB (e.g. nightly integration runs) instead of in-memory
+TEST_USE_REAL_MONGO = os.getenv("TEST_USE_REAL_MONGO", "false").lower() == "true"
+TEST_COLLECTIONS = ("sessions", "users", "files")
+# Seeded once per session and kept across per-test cleanup
+TEST_USER_ID = ObjectId()
+TEST_SESSION_ID = ObjectId()
+TEST_AUTH_HEADERS = MappingProxyType({"Authorization": "Bearer test-token"})
 
+try:
+    from mongomock_motor import AsyncMongoMockClient
+except ImportError:  # pragma: no cover - fall back to a live MongoDB
+    AsyncMongoMockClient = None
 
-@pytest.fixture
-async def test_db() -> AsyncGenerator[AsyncIOMotorDatabase, None]:
+
+@pytest.fixture(scope="session")
+async def _test_database() -> AsyncGenerator[AsyncIOMotorDatabase, None]:
     """
-    Fixture providing a clean test database
+    Session-wide test database, in-memory unless TEST_USE_REAL_MONGO is set
     """
-    client = AsyncIOMotorClient(TEST_MONGODB_URL, uuidRepresentation="standard")
+    if TEST_USE_REAL_MONGO or AsyncMongoMockClient is None:
+        client = AsyncIOMotorClient(TEST_MONGODB_URL, uuidRepresentation="standard")
+    else:
+        client = AsyncMongoMockClient(uuidRepresentation="standard")
     db = client[TEST_DATABASE_NAME]
     
-    # Initialize indexes
+    # Initialize indexes once for the whole session
     await init_models(db)
     
     yield db
     
-    # Cleanup
-    await db["sessions"].drop()
-    await db["users"].drop()
-    await db["files"].drop()
+    for name in TEST_COLLECTIONS:
+        await db[name].drop()
     client.close()
 
 
 @pytest.fixture
-async def test_client(test_db) -> AsyncGenerator[AsyncClient, None]:
+async def test_db(_test_database) -> AsyncGenerator[AsyncIOMotorDatabase, None]:
+    """
+    Fixture providing a clean test database
+    """
+    yield _test_database
+    
+    # Cleanup documents but keep collections, indexes and seeded rows
+    seeded = {"_id": {"$nin": [TEST_USER_ID, TEST_SESSION_ID]}}
+    for name in TEST_COLLECTIONS:
+        await _test_database[name].delete_many(seeded)
+    await _test_database["sessions"].update_one(
+        {"_id": TEST_SESSION_ID},
+        {"$set": {"settings.contextSources": []}}
+    )
+
+
+@pytest.fixture(scope="session")
+async def test_client(_test_database) -> AsyncGenerator[AsyncClient, None]:
     """
-    Fixture providing test HTTP client with database override
+    Fixture providing one test HTTP client with database override per session
     """
     from backend.core.database import get_database
     
     async def override_get_database():
-        return test_db
+        return _test_database
     
     app.dependency_overrides[get_database] = override_get_database
     
     async with AsyncClient(app=app, base_url="http://test") as client:
         yield client
     
+    app.dependency_overrides.pop(get_database, None)
+
+
+@pytest.fixture(autouse=True)
+def restore_dependency_overrides():
+    """
+    Drop any dependency overrides a test adds so they don't leak into the next
+    """
+    saved = dict(app.dependency_overrides)
+    yield
     app.dependency_overrides.clear()
+    app.dependency_overrides.update(saved)
 
 
-@pytest.fixture
-async def test_user(test_db) -> User:
+@pytest.fixture(scope="session")
+async def _seed(_test_database) -> Dict[str, Any]:
     """
-    Fixture providing a test user in the database
+    Shared documents inserted once for the whole session, one batch per collection
     """
     user_data = {
-        "_id": ObjectId(),
+        "_id": TEST_USER_ID,
         "email": "test@example.com",
         "hashed_password": "hashed_password_123",
         "is_active": True,
         "is_superuser": False,
         "is_verified": True
     }
-    
-    await test_db["users"].insert_one(user_data)
-    return User(**user_data)
-
-
-@pytest.fixture
-async def test_session(test_db, test_user: User) -> Session:
-    """
-    Fixture providing a test session in the database
-    """
     session_data = {
-        "_id": ObjectId(),
-        "user_id": ObjectId(test_user.id),
+        "_id": TEST_SESSION_ID,
+        "user_id": TEST_USER_ID,
         "title": "Test Session",
         "starter_prompt": "Test prompt",
         "max_questions": 10,
@@ -97,49 +132,94 @@ async def test_session(test_db, test_user: User) -> Session:
         "settings": {"contextSources": []},
         "status": "active"
     }
+    documents = {
+        "users": [user_data],
+        "sessions": [session_data],
+    }
+    
+    for name, docs in documents.items():
+        await _test_database[name].insert_many(docs)
     
-    await test_db["sessions"].insert_one(session_data)
-    return Session(**session_data)
+    return {
+        "user": User(**user_data),
+        "session": Session(**session_data),
+    }
 
 
 @pytest.fixture
-async def auth_headers(test_client: AsyncClient, test_user: User) -> Dict[str, str]:
+async def test_user(test_db, _seed: Dict[str, Any]) -> User:
+    """
+    Fixture providing a test user in the database
+    """
+    return _seed["user"]
+
+
+@pytest.fixture
+async def test_session(test_db, _seed: Dict[str, Any]) -> Session:
+    """
+    Fixture providing a test session in the database
+    """
+    return _seed["session"]
+
+
+@pytest.fixture(scope="module")
+def auth_headers(_seed: Dict[str, Any]) -> Mapping[str, str]:
     """
     Fixture providing authentication headers for test requests
+    
+    The current_active_user override is installed once per module and only
+    accepts these exact headers, so unauthenticated requests still get 401.
     """
     from backend.auth import current_active_user
     
-    async def override_current_active_user():
+    test_user = _seed["user"]
+    
+    async def override_current_active_user(request: Request):
+        if request.headers.get("authorization") != TEST_AUTH_HEADERS["Authorization"]:
+            raise HTTPException(status_code=401, detail="Unauthorized")
         return test_user
     
     app.dependency_overrides[current_active_user] = override_current_active_user
     
-    return {"Authorization": "Bearer test-token"}
+    yield TEST_AUTH_HEADERS
+    
+    app.dependency_overrides.pop(current_active_user, None)
+
+
+def _configure_minio_mock(mock_client_instance: Mock) -> None:
+    """Set the default return values the upload tests expect"""
+    mock_client_instance.upload_file.return_value = "test-object-key"
+    mock_client_instance.get_presigned_url.return_value = "https://example.com/presigned-url"
+
+
+@pytest.fixture(scope="module")
+def _minio_client_patch():
+    """
+    Patch get_minio_client where the files API looks it up, once per module
+    """
+    mock_client_instance = Mock()
+    _configure_minio_mock(mock_client_instance)
+    
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(files_api, "get_minio_client", lambda: mock_client_instance)
+        yield mock_client_instance
 
 
 @pytest.fixture
-def mock_minio_client():
+def mock_minio_client(_minio_client_patch):
     """
     Fixture providing a mocked MinIO client
     """
-    with patch('backend.services.storage.get_minio_client') as mock_get_client:
-        mock_client = Mock()
-        mock_client_instance = Mock()
-        
-        # Mock client methods
-        mock_client_instance.upload_file.return_value = "test-object-key"
-        mock_client_instance.get_presigned_url.return_value = "https://example.com/presigned-url"
-        
-        mock_client.return_value = mock_client_instance
-        mock_get_client.return_value = mock_client_instance
-        
-        yield mock_client_instance
+    yield _minio_client_patch
+    
+    # Reset call history and any per-test overrides for the next test
+    _minio_client_patch.reset_mock(return_value=True, side_effect=True)
+    _configure_minio_mock(_minio_client_patch)
 
 
 class TestFileUpload:
     """Test file upload endpoint"""
     
-    @pytest.mark.asyncio
     async def test_upload_file_success(
         self, 
         test_client: AsyncClient, 
@@ -150,7 +230,7 @@ class TestFileUpload:
         # Create test file content
         file_content = b"This is test file content"
         file_data = {
-            "file": ("test.txt", BytesIO(file_content), "text/plain")
+            "file": ("test.txt", file_content, "text/plain")
         }
         
         response = await test_client.post(
@@ -176,7 +256,6 @@ class TestFileUpload:
         mock_minio_client.upload_file.assert_called_once()
         mock_minio_client.get_presigned_url.assert_called_once()
     
-    @pytest.mark.asyncio
     async def test_upload_file_with_session_link(
         self, 
         test_client: AsyncClient, 
@@ -188,7 +267,7 @@ class TestFileUpload:
         """Test file upload with session linking"""
         file_content = b"Session linked file content"
         file_data = {
-            "file": ("session-file.pdf", BytesIO(file_content), "application/pdf")
+            "file": ("session-file.pdf", file_content, "application/pdf")
         }
         
         response = await test_client.post(
@@ -216,60 +295,58 @@ class TestFileUpload:
         assert context_source["size"] == len(file_content)
         assert context_source["contentType"] == "application/pdf"
     
-    @pytest.mark.asyncio
     async def test_upload_file_size_limit(
         self, 
         test_client: AsyncClient, 
         auth_headers: Dict[str, str]
     ):
         """Test file upload size limit (20 MB)"""
-        # Create file content larger than 20 MB
-        large_content = b"x" * (21 * 1024 * 1024)  # 21 MB
-        file_data = {
-            "file": ("large-file.txt", BytesIO(large_content), "text/plain")
-        }
-        
-        response = await test_client.post(
-            "/files",
-            files=file_data,
-            headers=auth_headers
-        )
+        # Sparse 21 MB temp file of zeros - streamed by httpx, never held in memory
+        with tempfile.TemporaryFile() as large_file:
+            large_file.truncate(21 * 1024 * 1024)
+            file_data = {
+                "file": ("large-file.txt", large_file, "text/plain")
+            }
+            
+            response = await test_client.post(
+                "/files",
+                files=file_data,
+                headers=auth_headers
+            )
         
         assert response.status_code == 413
         data = response.json()
         assert "20 MB limit" in data["detail"]
     
-    @pytest.mark.asyncio
+    @pytest.mark.parametrize("filename,content_type", [
+        ("virus.exe", "application/x-msdownload"),
+        ("script.js", "application/javascript"),
+        ("malware.bat", "application/x-msdos-program"),
+        ("shell.sh", "text/x-shellscript"),
+    ])
     async def test_upload_dangerous_file_type(
         self, 
         test_client: AsyncClient, 
-        auth_headers: Dict[str, str]
+        auth_headers: Dict[str, str],
+        filename: str,
+        content_type: str
     ):
         """Test rejection of dangerous file types"""
-        dangerous_files = [
-            ("virus.exe", "application/x-msdownload"),
-            ("script.js", "application/javascript"),
-            ("malware.bat", "application/x-msdos-program"),
-            ("shell.sh", "text/x-shellscript"),
-        ]
+        file_content = b"dangerous content"
+        file_data = {
+            "file": (filename, file_content, content_type)
+        }
         
-        for filename, content_type in dangerous_files:
-            file_content = b"dangerous content"
-            file_data = {
-                "file": (filename, BytesIO(file_content), content_type)
-            }
-            
-            response = await test_client.post(
-                "/files",
-                files=file_data,
-                headers=auth_headers
-            )
-            
-            assert response.status_code == 400
-            data = response.json()
-            assert "File type not allowed" in data["detail"]
+        response = await test_client.post(
+            "/files",
+            files=file_data,
+            headers=auth_headers
+        )
+        
+        assert response.status_code == 400
+        data = response.json()
+        assert "File type not allowed" in data["detail"]
     
-    @pytest.mark.asyncio
     async def test_upload_no_file(
         self, 
         test_client: AsyncClient, 
@@ -285,7 +362,6 @@ class TestFileUpload:
         data = response.json()
         assert "No file provided" in str(data["detail"])
     
-    @pytest.mark.asyncio
     async def test_upload_invalid_session_id(
         self, 
         test_client: AsyncClient, 
@@ -295,7 +371,7 @@ class TestFileUpload:
         """Test upload with invalid session ID"""
         file_content = b"Test content"
         file_data = {
-            "file": ("test.txt", BytesIO(file_content), "text/plain")
+            "file": ("test.txt", file_content, "text/plain")
         }
         
         # Use non-existent session ID
@@ -311,34 +387,32 @@ class TestFileUpload:
         data = response.json()
         assert "Session not found" in data["detail"]
     
-    @pytest.mark.asyncio
     async def test_upload_storage_error(
         self, 
         test_client: AsyncClient, 
-        auth_headers: Dict[str, str]
+        auth_headers: Dict[str, str],
+        monkeypatch
     ):
         """Test handling of storage service errors"""
-        with patch('backend.services.storage.get_minio_client') as mock_get_client:
-            mock_client = Mock()
-            mock_client.upload_file.side_effect = StorageError("Storage unavailable", 503)
-            mock_get_client.return_value = mock_client
-            
-            file_content = b"Test content"
-            file_data = {
-                "file": ("test.txt", BytesIO(file_content), "text/plain")
-            }
-            
-            response = await test_client.post(
-                "/files",
-                files=file_data,
-                headers=auth_headers
-            )
-            
-            assert response.status_code == 503
-            data = response.json()
-            assert "Storage unavailable" in data["detail"]
+        mock_client = Mock()
+        mock_client.upload_file.side_effect = StorageError("Storage unavailable", 503)
+        monkeypatch.setattr(files_api, "get_minio_client", lambda: mock_client)
+        
+        file_content = b"Test content"
+        file_data = {
+            "file": ("test.txt", file_content, "text/plain")
+        }
+        
+        response = await test_client.post(
+            "/files",
+            files=file_data,
+            headers=auth_headers
+        )
+        
+        assert response.status_code == 503
+        data = response.json()
+        assert "Storage unavailable" in data["detail"]
     
-    @pytest.mark.asyncio
     async def test_upload_unauthorized(
         self, 
         test_client: AsyncClient
@@ -346,7 +420,7 @@ class TestFileUpload:
         """Test upload without authentication"""
         file_content = b"Test content"
         file_data = {
-            "file": ("test.txt", BytesIO(file_content), "text/plain")
+            "file": ("test.txt", file_content, "text/plain")
         }
         
         response = await test_client.post(
@@ -360,7 +434,6 @@ class TestFileUpload:
 class TestFileInfo:
     """Test file info retrieval endpoint"""
     
-    @pytest.mark.asyncio
     async def test_get_file_info_success(
         self,
         test_client: AsyncClient,
@@ -401,7 +474,6 @@ class TestFileInfo:
         # Verify MinIO client was called for URL generation
         mock_minio_client.get_presigned_url.assert_called_once()
     
-    @pytest.mark.asyncio
     async def test_get_file_info_not_found(
         self,
         test_client: AsyncClient,
@@ -419,7 +491,6 @@ class TestFileInfo:
         data = response.json()
         assert "File not found" in data["detail"]
     
-    @pytest.mark.asyncio
     async def test_get_file_info_unauthorized(
         self,
         test_client: AsyncClient
@@ -432,51 +503,188 @@ class TestFileInfo:
         assert response.status_code == 401
 
 
-class TestFilenameSanitization:
-    """Test filename sanitization functionality"""
+class TestMinIOClient:
+    """Test MinIOClient against a mocked Minio SDK client"""
     
-    def test_sanitize_dangerous_filename(self):
-        """Test sanitization of dangerous filenames"""
-        from backend.services.storage import sanitize_filename
+    def _storage_client(self):
+        from backend.services.storage import MinIOClient
         
-        test_cases = [
-            ("../../../etc/passwd", "etc_passwd"),
-            ("file with spaces.txt", "file_with_spaces.txt"),
-            ("file..with..dots.txt", "file_with_dots.txt"),
-            ("file/with/slashes.txt", "file_with_slashes.txt"),
-            ("file<>with|special:chars.txt", "file_with_special_chars.txt"),
-            ("", "uploaded_file"),
-            (".hidden", "uploaded_file.hidden"),
-            ("a" * 300 + ".txt", "a" * 250 + ".txt"),  # Long filename
-        ]
-        
-        for original, expected in test_cases:
-            result = sanitize_filename(original)
-            assert result == expected, f"Failed for '{original}': got '{result}', expected '{expected}'"
+        storage_client = MinIOClient()
+        storage_client._client = Mock()
+        storage_client._client.presigned_get_object.side_effect = lambda **kwargs: f"https://minio/{kwargs['object_name']}?sig={uuid.uuid4()}"
+        return storage_client
     
-    def test_validate_file_type(self):
-        """Test file type validation"""
-        from backend.services.storage import validate_file_type
+    def test_presigned_url_reused_until_deleted(self):
+        """Test that repeated lookups skip signing and deletion invalidates"""
+        storage_client = self._storage_client()
         
-        # Safe file types
-        safe_cases = [
-            ("text/plain", "document.txt"),
-            ("image/jpeg", "photo.jpg"),
-            ("application/pdf", "document.pdf"),
-            ("application/json", "data.json"),
-        ]
+        first = storage_client.get_presigned_url("session/file.txt")
+        assert storage_client.get_presigned_url("session/file.txt") == first
+        assert storage_client._client.presigned_get_object.call_count == 1
+        
+        storage_client.get_presigned_url("session/other.txt")
+        assert storage_client._client.presigned_get_object.call_count == 2
         
-        for content_type, filename in safe_cases:
-            assert validate_file_type(content_type, filename) is True
+        storage_client.delete_file("session/file.txt")
+        assert storage_client.get_presigned_url("session/file.txt") != first
+        assert storage_client._client.presigned_get_object.call_count == 3
+    
+    def test_presigned_url_regenerated_near_expiry(self):
+        """Test that a cached URL is not served past its refresh deadline"""
+        storage_client = self._storage_client()
+        
+        with patch("backend.services.storage.time.monotonic", return_value=1000.0):
+            first = storage_client.get_presigned_url("session/file.txt")
         
-        # Dangerous file types
-        dangerous_cases = [
-            ("application/x-msdownload", "virus.exe"),
-            ("application/javascript", "script.js"),
-            ("text/x-shellscript", "script.sh"),
-            ("application/x-python-code", "script.py"),
-            ("text/plain", "script.bat"),  # Dangerous extension
+        deadline = 1000.0 + storage_client._url_cache_ttl
+        with patch("backend.services.storage.time.monotonic", return_value=deadline):
+            assert storage_client.get_presigned_url("session/file.txt") != first
+        assert storage_client._client.presigned_get_object.call_count == 2
+
+    
+    def test_delete_files_uses_multi_object_delete(self):
+        """Test bulk deletion goes through remove_objects and evicts cached URLs"""
+        from minio.deleteobjects import DeleteError
+        
+        storage_client = self._storage_client()
+        storage_client._client.remove_objects.side_effect = lambda bucket, objects: iter([
+            DeleteError("AccessDenied", "denied", obj.name, None) for obj in objects if obj.name == "c"
+        ])
+        first = storage_client.get_presigned_url("a")
+        
+        storage_client.delete_files(["a", "b", "a"])
+        storage_client._client.remove_objects.assert_called_once()
+        storage_client._client.remove_object.assert_not_called()
+        assert storage_client.get_presigned_url("a") != first
+        
+        with pytest.raises(StorageError, match="Failed to delete 1 files"):
+            storage_client.delete_files(["b", "c"])
+        
+        storage_client.delete_files([])
+        assert storage_client._client.remove_objects.call_count == 2
+
+    
+    def test_large_upload_uses_concurrent_multipart(self):
+        """Test that files over the threshold are uploaded as ordered parts"""
+        from backend.services import storage
+        
+        storage_client = self._storage_client()
+        minio_mock = storage_client._client
+        minio_mock._create_multipart_upload.return_value = "upload-1"
+        minio_mock._upload_part.side_effect = lambda bucket, key, chunk, headers, upload_id, number: f"etag-{number}-{len(chunk)}"
+        
+        size = storage.MULTIPART_PART_SIZE * 2 + 10
+        payload = BytesIO(b"x" * size)
+        with patch.object(storage, "MULTIPART_THRESHOLD", storage.MULTIPART_PART_SIZE):
+            assert storage_client.upload_file("big.bin", payload, size) == "big.bin"
+        
+        minio_mock.put_object.assert_not_called()
+        parts = minio_mock._complete_multipart_upload.call_args[0][3]
+        assert [(part.part_number, part.etag) for part in parts] == [
+            (1, f"etag-1-{storage.MULTIPART_PART_SIZE}"),
+            (2, f"etag-2-{storage.MULTIPART_PART_SIZE}"),
+            (3, "etag-3-10"),
         ]
         
-        for content_type, filename in dangerous_cases:
-            assert validate_file_type(content_type, filename) is False 
\ No newline at end of file
+        # A failed part aborts the upload
+        from minio.error import S3Error
+        minio_mock._upload_part.side_effect = S3Error("InternalError", "boom", "big.bin", "req", "host", None)
+        with pytest.raises(StorageError):
+            storage_client.upload_file_parallel("big.bin", BytesIO(b"x" * size), size)
+        minio_mock._abort_multipart_upload.assert_called_once_with(storage_client._bucket_name, "big.bin", "upload-1")
+
+    
+    def test_multipart_upload_aborted_on_unexpected_error(self):
+        """Test that non-S3 part failures still abort the multipart upload"""
+        from backend.services import storage
+        
+        storage_client = self._storage_client()
+        minio_mock = storage_client._client
+        minio_mock._create_multipart_upload.return_value = "upload-1"
+        minio_mock._upload_part.side_effect = RuntimeError("connection reset")
+        
+        size = storage.MULTIPART_PART_SIZE + 10
+        with pytest.raises(StorageError) as exc_info:
+            storage_client.upload_file_parallel("big.bin", BytesIO(b"x" * size), size)
+        assert exc_info.value.status_code == 500
+        minio_mock._abort_multipart_upload.assert_called_once_with(storage_client._bucket_name, "big.bin", "upload-1")
+        minio_mock._complete_multipart_upload.assert_not_called()
+
+    
+    def test_download_object_parallel_assembles_ranges(self):
+        """Test that ranged GETs are written into one buffer at their offsets"""
+        storage_client = self._storage_client()
+        content = bytes(range(256)) * 41  # 10496 bytes, not a multiple of the chunk size
+        storage_client._client.stat_object.return_value = Mock(size=len(content))
+        
+        def get_object(bucket, key, offset, length):
+            return Mock(read=Mock(return_value=content[offset:offset + length]))
+        storage_client._client.get_object.side_effect = get_object
+        
+        assert storage_client.download_object_parallel("blob", chunk_size=1024, max_concurrency=4) == content
+        assert storage_client._client.get_object.call_count == 11
+
+    
+    def test_upload_retries_only_retryable_errors(self):
+        """Test backoff on SlowDown (honoring Retry-After) and no retry on 4xx"""
+        from minio.error import S3Error
+        
+        storage_client = self._storage_client()
+        slow_down = S3Error(Mock(status=503, headers={"Retry-After": "2"}), "SlowDown", "slow", "key", "req", "host")
+        seen = []
+        
+        def put_object(**kwargs):
+            seen.append(kwargs["data"].read())
+            if len(seen) == 1:
+                raise slow_down
+        storage_client._client.put_object.side_effect = put_object
+        
+        with patch("backend.services.storage.time.sleep") as sleep:
+            storage_client.upload_file("key", BytesIO(b"payload"), 7)
+        sleep.assert_called_once_with(2.0)
+        # The stream is rewound before retrying
+        assert seen == [b"payload", b"payload"]
+        
+        denied = S3Error(Mock(status=403, headers={}), "AccessDenied", "denied", "key", "req", "host")
+        storage_client._client.put_object.side_effect = denied
+        with patch("backend.services.storage.time.sleep") as sleep:
+            with pytest.raises(StorageError):
+                storage_client.upload_file("key", BytesIO(b"payload"), 7)
+        sleep.assert_not_called()
+        assert storage_client._client.put_object.call_count == 3
+
+    
+    def test_fast_presign_matches_sdk(self):
+        """Test that the cached-key signer produces the SDK's exact URL"""
+        from datetime import datetime, timedelta, timezone
+        from minio import Minio
+        from backend.services.storage import MinIOClient
+        
+        storage_client = MinIOClient()
+        storage_client._client = Minio("localhost:9000", "access", "secret", secure=False, region="us-east-1")
+        request_date = datetime(2024, 5, 6, 7, 8, 9, tzinfo=timezone.utc)
+        
+        for object_key in ("session/file-id-report.pdf", "user-1/ünïcode name~.txt"):
+            expected = storage_client._client.presigned_get_object(
+                storage_client._bucket_name, object_key,
+                expires=timedelta(hours=storage_client._url_expiry_hours),
+                request_date=request_date
+            )
+            assert storage_client.get_presigned_url_fast(object_key, request_date) == expected
+
+    
+    def test_ensure_bucket_is_one_round_trip(self):
+        """Test that an existing bucket is detected from make_bucket alone"""
+        from minio.error import S3Error
+        
+        storage_client = self._storage_client()
+        minio_mock = storage_client._client
+        minio_mock.make_bucket.side_effect = S3Error(Mock(status=409), "BucketAlreadyOwnedByYou", "", "", "", "")
+        storage_client._ensure_bucket_exists()
+        minio_mock.bucket_exists.assert_not_called()
+        
+        # Without CreateBucket permission, fall back to checking existence
+        minio_mock.make_bucket.side_effect = S3Error(Mock(status=403), "AccessDenied", "", "", "", "")
+        minio_mock.bucket_exists.return_value = True
+        storage_client._ensure_bucket_exists()
+        minio_mock.bucket_exists.assert_called_once_with(storage_client._bucket_name)
@@ -0,0 +1,69 @@
+"""
+Tests for filename sanitization and file type checks
+Kept apart from the API tests so they run without importing the app or Motor
+"""
+
+import pytest
+
+from backend.services.storage import (
+    guess_content_type,
+    sanitize_filename,
+    validate_file_type,
+)
+
+
+class TestFilenameSanitization:
+    """Test filename sanitization functionality"""
+    
+    @pytest.mark.parametrize("original,expected", [
+        ("../../../etc/passwd", "etc_passwd"),
+        ("file with spaces.txt", "file_with_spaces.txt"),
+        ("file..with..dots.txt", "file_with_dots.txt"),
+        ("file/with/slashes.txt", "file_with_slashes.txt"),
+        ("file<>with|special:chars.txt", "file_with_special_chars.txt"),
+        ("", "uploaded_file"),
+        (".hidden", "uploaded_file.hidden"),
+        ("a" * 300 + ".txt", "a" * 250 + ".txt"),  # Long filename
+    ])
+    def test_sanitize_dangerous_filename(self, original, expected):
+        """Test sanitization of dangerous filenames"""
+        result = sanitize_filename(original)
+        assert result == expected, f"Failed for '{original}': got '{result}', expected '{expected}'"
+    
+    @pytest.mark.parametrize("content_type,filename,allowed", [
+        # Safe file types
+        ("text/plain", "document.txt", True),
+        ("image/jpeg", "photo.jpg", True),
+        ("application/pdf", "document.pdf", True),
+        ("application/json", "data.json", True),
+        # Dangerous file types
+        ("application/x-msdownload", "virus.exe", False),
+        ("application/javascript", "script.js", False),
+        ("text/x-shellscript", "script.sh", False),
+        ("application/x-python-code", "script.py", False),
+        ("text/plain", "script.bat", False),  # Dangerous extension
+    ])
+    def test_validate_file_type(self, content_type, filename, allowed):
+        """Test file type validation"""
+        assert validate_file_type(content_type, filename) is allowed
+    
+    def test_guess_content_type(self):
+        """Test content type inference from the filename"""
+        assert guess_content_type("photo.JPG") == "image/jpeg"
+        assert guess_content_type("report.pdf") == "application/pdf"
+        assert guess_content_type("slides.pptx").startswith("application/vnd.openxmlformats")
+        assert guess_content_type("archive.tar.gz") == "application/octet-stream"
+        assert guess_content_type("README") == "application/octet-stream"
+        assert guess_content_type("data.unknownext") == "application/octet-stream"
+    
+    @pytest.mark.parametrize("filename", ["x.html", "x.HTM", "x.svg", "x.xml", "x.xhtml"])
+    def test_guess_content_type_never_infers_renderable_types(self, filename):
+        """Test that browser-renderable formats fall back to a generic download"""
+        assert guess_content_type(filename) == "application/octet-stream"
+    
+    def test_validate_file_type_sniffs_content(self):
+        """Test that executable content is rejected despite a benign label"""
+        assert validate_file_type("image/png", "photo.png", b"\x7fELF\x02\x01\x01" + b"\x00" * 64) is False
+        assert validate_file_type("text/plain", "notes.txt", b"#!/bin/sh\nrm -rf /\n") is False
+        assert validate_file_type("text/plain", "notes.txt", b"just some notes\n") is True
+        assert validate_file_type("application/pdf", "doc.pdf", b"%PDF-1.7\n") is True
@@ -14,18 +14,32 @@ from backend.models.node import Node
 from backend.models.user import User
 from backend.services.qa_loop import (
     get_session_with_validation,
+    get_session_doc_with_validation,
     validate_node_ownership,
+    get_node_doc_with_validation,
     check_stop_conditions,
+    prepare_turn,
     build_context_chain,
     truncate_context_for_tokens,
     parse_ai_response,
     insert_user_answer_node,
     insert_ai_node,
+    build_user_answer_node,
+    build_ai_node,
+    commit_turn,
     update_session_status,
-    QALoopError
+    QALoopError,
+    _parse_text
 )
 
 
+def _filtered_find_one(doc):
+    """find_one stand-in returning doc only when every filter field matches"""
+    def find_one(query, projection=None):
+        return doc if all(doc.get(key) == value for key, value in query.items()) else None
+    return find_one
+
+
 @pytest.fixture
 def mock_user():
     """Create a mock user for testing"""
@@ -112,7 +126,8 @@ class TestQALoopHelpers:
     @pytest.mark.asyncio
     async def test_get_session_with_validation_access_denied(self, mock_db, mock_session):
         """Test access denied for wrong user"""
-        mock_db["sessions"].find_one = AsyncMock(return_value=mock_session.model_dump(by_alias=True))
+        # Owned lookup misses, existence check finds the session
+        mock_db["sessions"].find_one = AsyncMock(side_effect=[None, {"_id": mock_session.id}])
         
         wrong_user_id = ObjectId()
         with pytest.raises(QALoopError, match="Access denied"):
@@ -179,6 +194,153 @@ class TestQALoopHelpers:
         assert should_stop is False
         assert reason == ""
     
+    @pytest.mark.asyncio
+    async def test_doc_validation_skips_model_construction(self):
+        """Test ownership checks against raw documents with a projection"""
+        from unittest.mock import MagicMock
+        
+        user_id, session_id, node_id = ObjectId(), ObjectId(), ObjectId()
+        sessions, nodes = MagicMock(), MagicMock()
+        sessions.find_one = AsyncMock(side_effect=_filtered_find_one({"_id": session_id, "user_id": user_id}))
+        nodes.find_one = AsyncMock(side_effect=_filtered_find_one({"_id": node_id, "session_id": session_id}))
+        db = {"sessions": sessions, "nodes": nodes}
+        
+        doc = await get_session_doc_with_validation(db, session_id, user_id, {"_id": 1})
+        assert doc["_id"] == session_id
+        sessions.find_one.assert_awaited_once_with({"_id": session_id, "user_id": user_id}, {"_id": 1})
+        
+        with pytest.raises(QALoopError, match="Access denied"):
+            await get_session_doc_with_validation(db, session_id, ObjectId())
+        with pytest.raises(QALoopError, match="Session not found"):
+            await get_session_doc_with_validation(db, ObjectId(), user_id)
+        
+        await get_node_doc_with_validation(db, node_id, session_id, {"_id": 1})
+        nodes.find_one.assert_awaited_once_with({"_id": node_id, "session_id": session_id}, {"_id": 1})
+        with pytest.raises(QALoopError, match="does not belong"):
+            await get_node_doc_with_validation(db, node_id, ObjectId())
+        with pytest.raises(QALoopError, match="Node not found"):
+            await get_node_doc_with_validation(db, ObjectId(), session_id)
+    
+    @pytest.mark.asyncio
+    async def test_prepare_turn_loads_session_and_count_together(self):
+        """Test combined session validation and stop-condition check"""
+        from unittest.mock import MagicMock
+        
+        user_id = ObjectId()
+        session = Session(user_id=user_id, max_questions=3)
+        sessions, nodes = MagicMock(), MagicMock()
+        sessions.find_one = AsyncMock(side_effect=_filtered_find_one(session.model_dump(by_alias=True)))
+        nodes.count_documents = AsyncMock(return_value=3)
+        db = {"sessions": sessions, "nodes": nodes}
+        
+        loaded, should_stop, reason = await prepare_turn(db, session.id, user_id)
+        
+        assert loaded.id == session.id
+        assert (should_stop, reason) == (True, "max_questions_reached")
+        sessions.find_one.assert_awaited_once_with({"_id": session.id, "user_id": user_id})
+        nodes.count_documents.assert_awaited_once()
+        
+        with pytest.raises(QALoopError, match="Access denied"):
+            await prepare_turn(db, session.id, ObjectId())
+    
+    @pytest.mark.asyncio
+    async def test_commit_turn_writes_nodes_in_one_batch(self):
+        """Test that a turn's nodes go out in a single ordered bulk_write"""
+        from unittest.mock import MagicMock
+        
+        session_id, parent_id = ObjectId(), ObjectId()
+        user_node = build_user_answer_node(session_id, parent_id, "Adults")
+        ai_node = build_ai_node(session_id, user_node["_id"], "Final", "final", {"candidates": []})
+        sessions, nodes = MagicMock(), MagicMock()
+        nodes.bulk_write = AsyncMock()
+        sessions.update_one = AsyncMock()
+        db = {"sessions": sessions, "nodes": nodes}
+        db_session = object()
+        
+        await commit_turn(db, db_session, session_id, [user_node, ai_node], status="completed")
+        
+        nodes.bulk_write.assert_awaited_once()
+        ops = nodes.bulk_write.call_args[0][0]
+        assert [op._doc for op in ops] == [user_node, ai_node]
+        
+        # Documents match what the Node model would have produced
+        assert Node(**user_node).model_dump(by_alias=True) == user_node
+        assert Node(**ai_node).model_dump(by_alias=True) == ai_node
+        assert nodes.bulk_write.call_args[1] == {"ordered": True, "session": db_session}
+        assert sessions.update_one.call_args[0][1]["$set"]["status"] == "completed"
+        assert sessions.update_one.call_args[0][1]["$set"]["updated_at"] == ai_node["created_at"]
+    
+    def test_built_nodes_store_object_id_links(self):
+        """Test that string ids are stored as ObjectId so parent_id lookups hit the index"""
+        session_id, parent_id = ObjectId(), ObjectId()
+
+        user_node = build_user_answer_node(str(session_id), str(parent_id), "Adults")
+        ai_node = build_ai_node(str(session_id), str(user_node["_id"]), "Final", "final", {})
+
+        assert user_node["session_id"] == session_id and type(user_node["session_id"]) is ObjectId
+        assert user_node["parent_id"] == parent_id and type(user_node["parent_id"]) is ObjectId
+        assert ai_node["parent_id"] == user_node["_id"] and type(ai_node["parent_id"]) is ObjectId
+
+        with pytest.raises(ValueError):
+            build_user_answer_node(session_id, "not-an-id", "Adults")
+
+        now = datetime.now(timezone.utc)
+        assert build_ai_node(session_id, parent_id, "Final", "final", {}, now)["created_at"] is now
+
+    @pytest.mark.asyncio
+    async def test_build_context_chain_orders_ancestors_root_first(self):
+        """Test context chain from a single $graphLookup aggregation"""
+        from unittest.mock import MagicMock
+        
+        now = datetime.now(timezone.utc)
+        session_id, target_id = ObjectId(), ObjectId()
+        aggregated = {
+            "_id": target_id, "role": "user", "content": "Answer", "type": "answer", "created_at": now,
+            "ancestors": [
+                {"role": "assistant", "content": "Question", "type": "question", "created_at": now, "depth": 0},
+                {"role": "user", "content": "Root", "type": "initial", "created_at": now, "depth": 1},
+            ]
+        }
+        cursor = MagicMock()
+        cursor.to_list = AsyncMock(return_value=[aggregated])
+        nodes = MagicMock()
+        nodes.aggregate = MagicMock(return_value=cursor)
+        db = {"nodes": nodes}
+        
+        chain = await build_context_chain(db, session_id, target_id)
+        
+        assert [entry["content"] for entry in chain] == ["Root", "Question", "Answer"]
+        pipeline = nodes.aggregate.call_args[0][0]
+        assert pipeline[0]["$match"] == {"_id": target_id, "session_id": session_id}
+        assert pipeline[1]["$graphLookup"]["connectFromField"] == "parent_id"
+        
+        # Raw AI payloads in extra never leave the server
+        projection = pipeline[-1]["$project"]
+        assert not any(field.split(".")[-1] == "extra" for field in projection)
+        assert set(projection) >= {"role", "content", "type", "created_at", "ancestors.depth"}
+        
+        # Repeat builds for the same leaf are served from the cache as fresh lists
+        chain.append({"role": "user", "content": "Next"})
+        again = await build_context_chain(db, session_id, target_id)
+        assert [entry["content"] for entry in again] == ["Root", "Question", "Answer"]
+        nodes.aggregate.assert_called_once()
+    
+    def test_answer_request_bounds_stored_answer_length(self):
+        """Test that answers are limited to the node content length"""
+        from pydantic import ValidationError
+        from backend.api.sessions import AnswerRequest
+        
+        node_id = str(ObjectId())
+        AnswerRequest(nodeId=node_id, selected=["x" * 10000])
+        
+        with pytest.raises(ValidationError):
+            AnswerRequest(nodeId=node_id, selected=["x" * 10001])
+        
+        # Each item fits, but the joined "a; b" answer would not
+        with pytest.raises(ValidationError):
+            AnswerRequest(nodeId=node_id, selected=["x" * 5000, "y" * 4999])
+        AnswerRequest(nodeId=node_id, selected=["x" * 5000, "y" * 4998])
+    
     def test_truncate_context_for_tokens_short_context(self):
         """Test context truncation with short context"""
         context_chain = [
@@ -209,8 +371,7 @@ class TestQALoopHelpers:
         assert "Initial context" in result
         assert len(result) <= 300
     
-    @pytest.mark.asyncio
-    async def test_parse_ai_response_question_format(self):
+    def test_parse_ai_response_question_format(self):
         """Test parsing AI response with question format"""
         raw_response = {
             "candidates": [
@@ -226,7 +387,7 @@ class TestQALoopHelpers:
             ]
         }
         
-        question, options, selection_method, allow_custom, final_prompt = await parse_ai_response(raw_response)
+        question, options, selection_method, allow_custom, final_prompt = parse_ai_response(raw_response)
         
         assert question == "What genre?"
         assert options == ["Fantasy", "Sci-Fi"]
@@ -234,8 +395,7 @@ class TestQALoopHelpers:
         assert allow_custom is True
         assert final_prompt is None
     
-    @pytest.mark.asyncio
-    async def test_parse_ai_response_final_prompt_format(self):
+    def test_parse_ai_response_final_prompt_format(self):
         """Test parsing AI response with final prompt format"""
         raw_response = {
             "candidates": [
@@ -251,7 +411,7 @@ class TestQALoopHelpers:
             ]
         }
         
-        question, options, selection_method, allow_custom, final_prompt = await parse_ai_response(raw_response)
+        question, options, selection_method, allow_custom, final_prompt = parse_ai_response(raw_response)
         
         assert question is None
         assert options is None
@@ -259,8 +419,7 @@ class TestQALoopHelpers:
         assert allow_custom is None
         assert final_prompt == "Write a fantasy story about dragons"
     
-    @pytest.mark.asyncio
-    async def test_parse_ai_response_plain_text(self):
+    def test_parse_ai_response_plain_text(self):
         """Test parsing AI response with plain text (treated as final prompt)"""
         raw_response = {
             "candidates": [
@@ -276,7 +435,7 @@ class TestQALoopHelpers:
             ]
         }
         
-        question, options, selection_method, allow_custom, final_prompt = await parse_ai_response(raw_response)
+        question, options, selection_method, allow_custom, final_prompt = parse_ai_response(raw_response)
         
         assert question is None
         assert options is None
@@ -284,8 +443,7 @@ class TestQALoopHelpers:
         assert allow_custom is None
         assert final_prompt == "Write a creative story about adventure"
     
-    @pytest.mark.asyncio
-    async def test_parse_ai_response_with_custom_answer_allowed(self):
+    def test_parse_ai_response_with_custom_answer_allowed(self):
         """Test parsing AI response with custom answer functionality"""
         raw_response = {
             "candidates": [
@@ -301,7 +459,7 @@ class TestQALoopHelpers:
             ]
         }
         
-        question, options, selection_method, allow_custom, final_prompt = await parse_ai_response(raw_response)
+        question, options, selection_method, allow_custom, final_prompt = parse_ai_response(raw_response)
         
         assert question == "What tone should your story have?"
         assert len(options) == 4
@@ -310,8 +468,7 @@ class TestQALoopHelpers:
         assert allow_custom is True
         assert final_prompt is None
     
-    @pytest.mark.asyncio
-    async def test_parse_ai_response_multi_selection(self):
+    def test_parse_ai_response_multi_selection(self):
         """Test parsing AI response with multi selection method"""
         raw_response = {
             "candidates": [
@@ -327,7 +484,7 @@ class TestQALoopHelpers:
             ]
         }
         
-        question, options, selection_method, allow_custom, final_prompt = await parse_ai_response(raw_response)
+        question, options, selection_method, allow_custom, final_prompt = parse_ai_response(raw_response)
         
         assert question == "What features should be included?"
         assert len(options) == 4
@@ -335,8 +492,7 @@ class TestQALoopHelpers:
         assert allow_custom is True
         assert final_prompt is None
     
-    @pytest.mark.asyncio
-    async def test_parse_ai_response_ranking_selection(self):
+    def test_parse_ai_response_ranking_selection(self):
         """Test parsing AI response with ranking selection method"""
         raw_response = {
             "candidates": [
@@ -352,13 +508,36 @@ class TestQALoopHelpers:
             ]
         }
         
-        question, options, selection_method, allow_custom, final_prompt = await parse_ai_response(raw_response)
+        question, options, selection_method, allow_custom, final_prompt = parse_ai_response(raw_response)
         
         assert question == "Please rank these priorities in order:"
         assert len(options) == 4
         assert selection_method == "ranking"
         assert allow_custom is True
         assert final_prompt is None
+    
+    def test_parse_ai_response_cached_results_are_independent(self):
+        """Test that repeated texts hit the parse cache without sharing option lists"""
+        raw_response = {
+            "candidates": [
+                {
+                    "content": {
+                        "parts": [
+                            {
+                                "text": '{"question": "Which audience?", "options": ["Kids", "Adults"]}'
+                            }
+                        ]
+                    }
+                }
+            ]
+        }
+        
+        _, first_options, _, _, _ = parse_ai_response(raw_response)
+        first_options.append("Mutated")
+        _, second_options, _, _, _ = parse_ai_response(raw_response)
+        
+        assert second_options == ["Kids", "Adults"]
+        assert _parse_text.cache_info().hits >= 1
 
 
 class TestQALoopIntegration:
@@ -647,6 +826,37 @@ class TestQALoopIntegration:
         assert response.status_code == 422
         assert "Invalid session or node ID format" in response.json()["detail"]
     
+    @pytest.mark.asyncio
+    async def test_qa_loop_answer_too_long(self, test_client, mock_user_token):
+        """Test Q&A loop rejects answers over the node content limit"""
+        headers = {"Authorization": f"Bearer {mock_user_token}"}
+        
+        session_data = {
+            "title": "Long Answer Test",
+            "starterPrompt": "Help me write a story",
+            "maxQuestions": 5,
+            "targetModel": "gpt-4",
+            "settings": {"tone": "creative", "wordLimit": 500}
+        }
+        
+        response = await test_client.post("/sessions", json=session_data, headers=headers)
+        assert response.status_code == 201
+        session_id = response.json()["id"]
+        
+        answer_data = {
+            "nodeId": str(ObjectId()),
+            "selected": ["x" * 10001],
+            "isCustomAnswer": True
+        }
+        
+        response = await test_client.post(
+            f"/sessions/{session_id}/answer",
+            json=answer_data,
+            headers=headers
+        )
+        
+        assert response.status_code == 422
+    
     @pytest.mark.asyncio
     async def test_qa_loop_node_not_in_session(self, test_client, mock_user_token):
         """Test Q&A loop with node that doesn't belong to session"""
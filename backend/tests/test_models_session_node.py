@@ -14,7 +14,7 @@ from bson import ObjectId
 from backend.models import (
     Session, SessionCreate, SessionUpdate, SessionRead,
     Node, NodeCreate, NodeUpdate, NodeRead,
-    PyObjectId, init_models
+    PyObjectId, init_models, list_node_tree_skeleton, encode_node_docs, encode_node_cursor
 )
 
 
@@ -55,7 +55,7 @@ class TestPyObjectId:
     
     def test_valid_object_id(self):
         """Test PyObjectId with valid ObjectId string"""
-        from backend.models.session import validate_object_id
+        from backend.models.types import validate_object_id
         
         valid_id = str(ObjectId())
         py_object_id = validate_object_id(valid_id)
@@ -64,14 +64,14 @@ class TestPyObjectId:
     
     def test_invalid_object_id(self):
         """Test PyObjectId with invalid ObjectId string"""
-        from backend.models.session import validate_object_id
+        from backend.models.types import validate_object_id
         
         with pytest.raises(ValueError, match="Invalid ObjectId"):
             validate_object_id("invalid_id")
     
     def test_object_id_from_object_id(self):
         """Test PyObjectId with ObjectId instance"""
-        from backend.models.session import validate_object_id
+        from backend.models.types import validate_object_id
         
         original_id = ObjectId()
         py_object_id = validate_object_id(original_id)
@@ -101,10 +101,43 @@ class TestSession:
         session = Session(user_id=sample_user_id)
         
         assert session.title is None
-        assert session.metadata == {}
+        assert session.metadata is None
+        assert session.settings is None
         assert session.created_at is not None
         assert session.updated_at is not None
     
+    def test_session_create_settings(self):
+        """Test SessionCreate settings typing and extra keys"""
+        from pydantic import ValidationError
+        
+        data = {"starter_prompt": "Write a poem", "max_questions": 5, "target_model": "gpt-4"}
+        
+        session = SessionCreate(**data, settings={"tone": "formal", "wordLimit": 100, "custom": True})
+        assert session.settings.model_dump(exclude_unset=True) == {
+            "tone": "formal", "wordLimit": 100, "custom": True
+        }
+        assert SessionCreate(**data, settings={}).settings.model_dump(exclude_unset=True) == {}
+        
+        with pytest.raises(ValidationError):
+            SessionCreate(**data, settings={"wordLimit": "100"})
+        with pytest.raises(ValidationError):
+            SessionCreate(**data, settings={"contextSources": "docs"})
+    
+    def test_session_to_mongo_and_api(self, sample_user_id):
+        """Test one-pass Session dumps for Motor writes and API responses"""
+        import orjson
+        
+        session = Session(user_id=sample_user_id, title="Test", settings={"tone": "formal"})
+        
+        doc = session.to_mongo()
+        assert isinstance(doc["_id"], ObjectId)
+        assert doc["user_id"] == sample_user_id
+        
+        body = orjson.loads(session.to_api())
+        assert set(body) == set(SessionRead.model_fields)
+        assert body["id"] == str(session.id)
+        assert SessionRead.model_validate({**body, "_id": body["id"]}).title == "Test"
+    
     @pytest.mark.asyncio
     async def test_session_crud_operations(self, test_db, sample_user_id):
         """Test Session CRUD operations in MongoDB"""
@@ -174,6 +207,43 @@ class TestSession:
         assert "user_sessions_by_time" in indexes
 
 
+    @pytest.mark.asyncio
+    async def test_init_models_runs_once_per_db(self):
+        """Test that concurrent and repeat init_models calls for one db build once"""
+        import asyncio
+        from unittest.mock import AsyncMock, MagicMock
+        from backend.models import init_models
+        
+        collection = MagicMock()
+        collection.create_indexes = AsyncMock()
+        db = MagicMock()
+        db.__getitem__.return_value = collection
+        
+        await asyncio.gather(*(init_models(db) for _ in range(3)))
+        await init_models(db)
+        
+        # One build for sessions and one for nodes, none on later calls
+        assert collection.create_indexes.await_count == 2
+    
+    @pytest.mark.asyncio
+    async def test_init_models_retries_after_failure(self):
+        """Test that a failed index build is not remembered"""
+        from unittest.mock import AsyncMock, MagicMock
+        from backend.models import init_models
+        
+        collection = MagicMock()
+        collection.create_indexes = AsyncMock(side_effect=[RuntimeError("down"), None, None, None])
+        db = MagicMock()
+        db.__getitem__.return_value = collection
+        
+        with pytest.raises(RuntimeError):
+            await init_models(db)
+        await init_models(db)
+        await init_models(db)
+        
+        assert collection.create_indexes.await_count == 4
+
+
 class TestNode:
     """Test Node model"""
     
@@ -208,7 +278,65 @@ class TestNode:
         
         assert node.parent_id is None
         assert node.session_id == session_id
-    
+
+    def test_node_created_at_is_current_utc(self):
+        """Test that the coarse default timestamp is timezone-aware and current"""
+        before = datetime.now(timezone.utc)
+        node = Node(session_id=ObjectId(), role="prompt", content="Now")
+
+        assert node.created_at.tzinfo is not None
+        assert abs((node.created_at - before).total_seconds()) < 0.01
+
+    def test_encode_node_docs_matches_node_read(self):
+        """Test that msgspec encoding produces the NodeRead shape"""
+        import json
+
+        node = Node(
+            session_id=ObjectId(),
+            parent_id=ObjectId(),
+            role="assistant",
+            content="Question?",
+            type="question",
+            extra={"source_id": ObjectId()}
+        )
+        doc = node.model_dump(by_alias=True)
+
+        encoded = json.loads(encode_node_docs([doc]))
+        expected = NodeRead(
+            _id=str(node.id),
+            session_id=str(node.session_id),
+            parent_id=str(node.parent_id),
+            role=node.role,
+            content=node.content,
+            type=node.type,
+            extra={"source_id": str(node.extra["source_id"])},
+            created_at=node.created_at
+        )
+        assert encoded == [json.loads(expected.model_dump_json())]
+
+    @pytest.mark.asyncio
+    async def test_encode_node_cursor_matches_encode_node_docs(self):
+        """Test that streaming a cursor encodes the same bytes as a list"""
+        docs = [
+            Node(session_id=ObjectId(), role="user", content=f"Answer {i}").model_dump(by_alias=True)
+            for i in range(3)
+        ]
+
+        class FakeCursor:
+            def __init__(self, items):
+                self._items = iter(items)
+
+            def __aiter__(self):
+                return self
+
+            async def __anext__(self):
+                try:
+                    return next(self._items)
+                except StopIteration:
+                    raise StopAsyncIteration
+
+        assert await encode_node_cursor(FakeCursor(docs)) == encode_node_docs(docs)
+
     @pytest.mark.asyncio
     async def test_node_crud_operations(self, test_db, sample_user_id):
         """Test Node CRUD operations in MongoDB"""
@@ -287,6 +415,30 @@ class TestNode:
         indexes = await node_collection.index_information()
         assert "session_parent_nodes" in indexes
         assert "session_nodes_by_time" in indexes
+        assert "session_role_type" in indexes
+
+    @pytest.mark.asyncio
+    async def test_node_tree_skeleton(self, test_db, sample_user_id):
+        """Test that the tree skeleton returns structure without content"""
+        session = Session(user_id=sample_user_id)
+        node_collection = test_db["nodes"]
+
+        root_node = Node(session_id=session.id, role="prompt", content="Root " * 500)
+        await node_collection.insert_one(root_node.model_dump(by_alias=True))
+
+        child_node = Node(
+            session_id=session.id,
+            parent_id=root_node.id,
+            role="answer",
+            content="Child"
+        )
+        await node_collection.insert_one(child_node.model_dump(by_alias=True))
+
+        skeleton = await list_node_tree_skeleton(test_db, str(session.id))
+        assert skeleton == [
+            (root_node.id, None, "prompt"),
+            (child_node.id, root_node.id, "answer"),
+        ]
 
 
 class TestModelIntegration:
@@ -5,6 +5,7 @@ Tests for SlowAPI rate limiting middleware with Redis backend
 
 import asyncio
 import os
+import time
 import pytest
 from httpx import AsyncClient
 from fastapi.testclient import TestClient
@@ -16,9 +17,9 @@ TEST_RATE_LIMIT = "5/minute"  # Lower limit for faster testing
 TEST_REDIS_URL = os.getenv("TEST_REDIS_URL", "redis://localhost:6379/1")  # Use DB 1 for tests
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def client():
-    """Create test client with rate limiting enabled."""
+    """Create test client with rate limiting enabled, started once per module."""
     with TestClient(app) as c:
         yield c
 
@@ -166,6 +167,132 @@ class TestRateLimit:
         from core.ratelimit import limiter
         assert limiter is not None
     
+    def test_token_bucket_parses_limit(self):
+        """Test token bucket capacity and refill rate derived from limit string."""
+        from core.ratelimit import TokenBucketLimiter
+        
+        bucket = TokenBucketLimiter("60/minute")
+        assert bucket.capacity == 60
+        assert bucket.rate == 1.0
+    
+    @pytest.mark.asyncio
+    async def test_token_bucket_rejects_when_empty(self, monkeypatch):
+        """Test that an empty bucket raises with the script's retry-after."""
+        from core.ratelimit import TokenBucketLimiter, TokenBucketExceeded
+        from unittest.mock import AsyncMock, Mock
+        
+        redis_mock = Mock()
+        redis_mock.script_load = AsyncMock(return_value="sha")
+        redis_mock.evalsha = AsyncMock(return_value=[0, 7, 0])
+        monkeypatch.setattr("core.ratelimit.get_redis", lambda: redis_mock)
+        
+        bucket = TokenBucketLimiter("5/minute", scope="test")
+        request_mock = Mock()
+        request_mock.state.user = None
+        monkeypatch.setattr("core.ratelimit.get_remote_address", lambda x: "10.0.0.1")
+        
+        with pytest.raises(TokenBucketExceeded) as exc_info:
+            await bucket(request_mock)
+        assert exc_info.value.retry_after == 7
+        
+        # Single round-trip per check, keyed by scope and client
+        redis_mock.evalsha.assert_awaited_once()
+        assert redis_mock.evalsha.call_args[0][2] == "{bucket:test:ip:10.0.0.1}"
+    
+    @pytest.mark.asyncio
+    async def test_token_bucket_fails_open_without_redis(self, monkeypatch):
+        """Test that Redis errors do not block requests."""
+        from core.ratelimit import TokenBucketLimiter
+        from redis.exceptions import ConnectionError as RedisConnectionError
+        from unittest.mock import AsyncMock, Mock
+        
+        redis_mock = Mock()
+        redis_mock.script_load = AsyncMock(side_effect=RedisConnectionError("down"))
+        monkeypatch.setattr("core.ratelimit.get_redis", lambda: redis_mock)
+        monkeypatch.setattr("core.ratelimit.TokenBucketLimiter._script_sha", None)
+        
+        request_mock = Mock()
+        request_mock.state.user = None
+        monkeypatch.setattr("core.ratelimit.get_remote_address", lambda x: "10.0.0.2")
+        
+        assert await TokenBucketLimiter("5/minute")(request_mock) is None
+
+    @pytest.mark.asyncio
+    async def test_local_bucket_prefilters_redis(self, monkeypatch):
+        """Test that the in-process bucket batches syncs and rejects locally."""
+        from core.ratelimit import TokenBucketLimiter, TokenBucketExceeded
+        from unittest.mock import AsyncMock, Mock
+
+        redis_mock = Mock()
+        redis_mock.script_load = AsyncMock(return_value="sha")
+        redis_mock.evalsha = AsyncMock(return_value=[1, 0, 0])
+        monkeypatch.setattr("core.ratelimit.get_redis", lambda: redis_mock)
+
+        request_mock = Mock()
+        request_mock.state.user = None
+        monkeypatch.setattr("core.ratelimit.get_remote_address", lambda x: "10.0.0.3")
+
+        bucket = TokenBucketLimiter("100/hour", scope="test", sync_every=10)
+        for _ in range(10):
+            await bucket(request_mock)
+
+        # Ten admitted hits reported to Redis in a single call: nine already
+        # spent, plus the current request awaiting admission
+        redis_mock.evalsha.assert_awaited_once()
+        assert redis_mock.evalsha.call_args[0][-2:] == (1, 9)
+
+        for _ in range(90):
+            await bucket(request_mock)
+        calls = redis_mock.evalsha.await_count
+
+        # Local bucket is empty: rejected without a Redis round-trip
+        with pytest.raises(TokenBucketExceeded):
+            await bucket(request_mock)
+        assert redis_mock.evalsha.await_count == calls
+
+    @pytest.mark.asyncio
+    async def test_batch_sync_charges_spent_hits_on_drained_bucket(self, monkeypatch):
+        """Test that a nearly drained shared bucket still charges the batch."""
+        from core.ratelimit import TokenBucketLimiter, TokenBucketExceeded
+        from unittest.mock import AsyncMock, Mock
+
+        # Shared bucket with 5 tokens left: charges min(tokens, spent), then
+        # admits the current request only if a token remains
+        shared = {"tokens": 5}
+
+        async def evalsha(sha, numkeys, key, capacity, rate, now, requested, spent):
+            charged = min(shared["tokens"], spent)
+            shared["tokens"] -= charged
+            if shared["tokens"] >= requested:
+                shared["tokens"] -= requested
+                return [1, 0, spent - charged]
+            return [0, 1, spent - charged]
+
+        redis_mock = Mock()
+        redis_mock.script_load = AsyncMock(return_value="sha")
+        redis_mock.evalsha = AsyncMock(side_effect=evalsha)
+        monkeypatch.setattr("core.ratelimit.get_redis", lambda: redis_mock)
+
+        request_mock = Mock()
+        request_mock.state.user = None
+        monkeypatch.setattr("core.ratelimit.get_remote_address", lambda x: "10.0.0.4")
+
+        bucket = TokenBucketLimiter("100/hour", scope="test", sync_every=4)
+        for _ in range(3):
+            await bucket(request_mock)
+
+        # Three spent hits charged, fourth request admitted on the last-but-one token
+        await bucket(request_mock)
+        assert shared["tokens"] == 1
+
+        for _ in range(3):
+            await bucket(request_mock)
+
+        # Only one token left for three spent hits: bucket drained, request rejected
+        with pytest.raises(TokenBucketExceeded):
+            await bucket(request_mock)
+        assert shared["tokens"] == 0
+
     def test_environment_rate_limit_config(self):
         """Test that rate limit can be configured via environment."""
         from core.ratelimit import DEFAULT_RATE_LIMIT
@@ -202,4 +329,36 @@ async def test_performance_under_load():
         
         # Check status codes
         status_codes = [r.status_code for r in successful_responses]
-        assert all(code in [200, 429] for code in status_codes) 
\ No newline at end of file
+        assert all(code in [200, 429] for code in status_codes) 
+
+@pytest.mark.asyncio
+async def test_token_bucket_script_charges_spent_hits():
+    """Test the Lua script charges spent hits down to zero and reports the shortfall."""
+    from core.ratelimit import TOKEN_BUCKET_LUA
+    try:
+        import redis.asyncio as redis
+        r = redis.Redis.from_url(TEST_REDIS_URL)
+        await r.ping()
+    except Exception:
+        pytest.skip("Redis not available for testing")
+    
+    key = "{bucket:test:drained}"
+    try:
+        now = time.time()
+        await r.hset(key, mapping={"tokens": "3", "ts": str(now)})
+        
+        # 3 tokens left, 5 hits already spent locally: all 3 charged, 2 short,
+        # and the current request is rejected
+        allowed, retry_after, shortfall = await r.eval(TOKEN_BUCKET_LUA, 1, key, 60, 1, now, 1, 5)
+        assert (allowed, shortfall) == (0, 2)
+        assert retry_after >= 1
+        assert float(await r.hget(key, "tokens")) == 0
+        
+        # With tokens left after charging the batch, the request is admitted
+        await r.hset(key, mapping={"tokens": "10", "ts": str(now)})
+        allowed, _, shortfall = await r.eval(TOKEN_BUCKET_LUA, 1, key, 60, 1, now, 1, 5)
+        assert (allowed, shortfall) == (1, 0)
+        assert float(await r.hget(key, "tokens")) == 4
+    finally:
+        await r.delete(key)
+        await r.aclose()
@@ -0,0 +1,6 @@
+"""
+Pytest configuration for the top-level tests
+Reuses the backend test setup so both test roots share one session event loop
+"""
+
+from backend.tests.conftest import event_loop  # noqa: F401
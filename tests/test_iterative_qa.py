@@ -205,8 +205,7 @@ class TestQALoopHelpers:
         assert "[assistant:question] Short response" in result
         assert len(result) <= 100
     
-    @pytest.mark.asyncio
-    async def test_parse_ai_response_question_format(self):
+    def test_parse_ai_response_question_format(self):
         """Test parsing AI response with question format"""
         raw_response = {
             "candidates": [
@@ -222,14 +221,13 @@ class TestQALoopHelpers:
             ]
         }
         
-        question, options, final_prompt = await parse_ai_response(raw_response)
+        question, options, final_prompt = parse_ai_response(raw_response)
         
         assert question == "What genre?"
         assert options == ["Fantasy", "Sci-Fi"]
         assert final_prompt is None
     
-    @pytest.mark.asyncio
-    async def test_parse_ai_response_final_prompt_format(self):
+    def test_parse_ai_response_final_prompt_format(self):
         """Test parsing AI response with final prompt format"""
         raw_response = {
             "candidates": [
@@ -245,14 +243,13 @@ class TestQALoopHelpers:
             ]
         }
         
-        question, options, final_prompt = await parse_ai_response(raw_response)
+        question, options, final_prompt = parse_ai_response(raw_response)
         
         assert question is None
         assert options is None
         assert final_prompt == "Write a fantasy story about dragons"
     
-    @pytest.mark.asyncio
-    async def test_parse_ai_response_plain_text(self):
+    def test_parse_ai_response_plain_text(self):
         """Test parsing AI response with plain text (treated as final prompt)"""
         raw_response = {
             "candidates": [
@@ -268,7 +265,7 @@ class TestQALoopHelpers:
             ]
         }
         
-        question, options, final_prompt = await parse_ai_response(raw_response)
+        question, options, final_prompt = parse_ai_response(raw_response)
         
         assert question is None
         assert options is None